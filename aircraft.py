@@ -1,19 +1,17 @@
 import sqlite3
-from tabulate import tabulate  
 
-class AircraftManager:
-    def __init__(self, connection):
-        self.conn = connection
-        self.cursor = self.conn.cursor()
+from connection import ConnectionUser
+from flight_archive import attach_history
 
+#flights of an aircraft, archived ones included (see flight_archive.py); its plan is checked by migrations.py
+AIRCRAFT_FLIGHTS_SQL = "SELECT COUNT(*) FROM all_flight WHERE aircraft_id = ?"
+
+class AircraftManager(ConnectionUser):
 #view a list of aircraft
     def view_aircraft(self):
+        from tabulate import tabulate
         try:
-            self.cursor.execute("""
-                SELECT aircraft_id, model, capacity, manufacturer, registration_number
-                FROM aircraft
-            """)
-            aircraft = self.cursor.fetchall()
+            aircraft = self.list_aircraft()
 
             if aircraft:
                 print("\n--- Aircraft List ---")
@@ -37,14 +35,10 @@ class AircraftManager:
 
 # Insert the new aircraft into the database
         try:
-            self.cursor.execute("""
-                INSERT INTO aircraft (aircraft_id, model, capacity, manufacturer, registration_number)
-                VALUES (?, ?, ?, ?, ?)
-            """, (aircraft_id, model, capacity, manufacturer, registration_number))
-            self.conn.commit()
+            self.create_aircraft(aircraft_id, model, capacity, manufacturer, registration_number)
             print("Aircraft added successfully.")
-        except sqlite3.IntegrityError:
-            print("Error: Aircraft ID already exists.")
+        except ValueError as e:
+            print(f"Error: {e}")
         except sqlite3.Error as e:
             self.conn.rollback()
             print(f"Failed to add aircraft: {e}")
@@ -62,6 +56,12 @@ class AircraftManager:
             print("Aircraft not found.")
             return
 
+# Archived flights have no foreign key to the aircraft, so every flight is checked here
+        flight_count = self.flight_count(aircraft_id)
+        if flight_count:
+            print(f"Failed to delete aircraft: aircraft is allocated to {flight_count} flights")
+            return
+
 # Confirm deletion
         confirm = input(f"Are you sure you want to delete aircraft '{aircraft_id}'? (Y/N): ").strip().upper()
         if confirm != 'Y':
@@ -71,10 +71,62 @@ class AircraftManager:
         try:
             self.cursor.execute("DELETE FROM aircraft WHERE aircraft_id = ?", (aircraft_id,))
             self.conn.commit()
+            self.reference.invalidate()
             print("Aircraft deleted successfully.")
         except sqlite3.Error as e:
             self.conn.rollback()
             print(f"Failed to delete aircraft: aircraft may be allocated to existing flights")
 
-    def close(self):
-        self.conn.close()
+# Returns every aircraft as (aircraft_id, model, capacity, manufacturer, registration_number) rows
+    def list_aircraft(self):
+        self.cursor.execute("""
+            SELECT aircraft_id, model, capacity, manufacturer, registration_number
+            FROM aircraft
+            ORDER BY aircraft_id
+        """)
+        return self.cursor.fetchall()
+
+# Adds an aircraft without prompting. Raises ValueError if the ID or capacity is not a number or the aircraft already exists.
+    def create_aircraft(self, aircraft_id, model, capacity, manufacturer, registration_number):
+#aircraft IDs are stored as integers, matching flight.aircraft_id
+        if not str(aircraft_id).isdigit():
+            raise ValueError("Invalid Aircraft ID. Please enter a number.")
+#the STRICT table would reject it anyway, but with an IntegrityError that looks like a duplicate
+        if not str(capacity).isdigit():
+            raise ValueError("Capacity must be a whole number.")
+
+        try:
+            self.cursor.execute("""
+                INSERT INTO aircraft (aircraft_id, model, capacity, manufacturer, registration_number)
+                VALUES (?, ?, ?, ?, ?)
+            """, (aircraft_id, model, capacity, manufacturer, registration_number))
+            self.conn.commit()
+            self.reference.invalidate()
+        except sqlite3.IntegrityError as e:
+            self.conn.rollback()
+            if e.sqlite_errorname in ("SQLITE_CONSTRAINT_UNIQUE", "SQLITE_CONSTRAINT_PRIMARYKEY"):
+                raise ValueError("Aircraft ID or registration number already exists.") from None
+            raise
+
+# Deletes an aircraft without prompting. Returns False if it does not exist; raises ValueError if it is allocated to flights.
+    def remove_aircraft(self, aircraft_id):
+        self.cursor.execute("SELECT 1 FROM aircraft WHERE aircraft_id = ?", (aircraft_id,))
+        if not self.cursor.fetchone():
+            return False
+        if self.flight_count(aircraft_id):
+            raise ValueError("Aircraft is allocated to existing flights.")
+
+        try:
+            self.cursor.execute("DELETE FROM aircraft WHERE aircraft_id = ?", (aircraft_id,))
+            self.conn.commit()
+            self.reference.invalidate()
+        except sqlite3.IntegrityError:
+            self.conn.rollback()
+            raise ValueError("Aircraft is allocated to existing flights.") from None
+        return True
+
+# Returns the number of flights that use an aircraft, including archived ones (see flight_archive.py)
+    def flight_count(self, aircraft_id):
+        attach_history(self.conn, self.connections.path)
+        self.cursor.execute(AIRCRAFT_FLIGHTS_SQL, (aircraft_id,))
+        return self.cursor.fetchone()[0]
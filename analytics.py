@@ -1,33 +1,83 @@
-import matplotlib.pyplot as plt  
+import glob
+import hashlib
+import os
+import shutil
+from datetime import date
 
-import matplotlib
-matplotlib.use('Agg')  
+from connection import ConnectionUser
+from flight_archive import attach_history
+from flight_dates import DATE_FORMAT, normalise_date
+from pilot_workload import MAX_DAYS_WITHOUT_REST, MAX_FLIGHTS_28_DAYS, MAX_FLIGHTS_7_DAYS, day_number, duty_window_days, load_duty_load
+from sql_profiler import SQLProfiler
 
-class Analytics:
-    def __init__(self, connection):
-        self.conn = connection
-        self.cursor = self.conn.cursor()
+REPORT_CACHE_DIR = "report_cache" #rendered charts are kept here, one file per version of the data
+REPORT_VARIANTS_KEPT = 5 #how many versions of each report the cache keeps before deleting the oldest
+PROFILE_STATEMENT_WIDTH = 70 #characters of each statement shown in the SQL profile table
 
-    # 1. Creates a report with useful graphs
+# matplotlib takes around a second to import, so it is only loaded when a report is first drawn.
+# The Agg backend is selected before pyplot is imported so that charts are saved to files without a display.
+def load_pyplot():
+    import matplotlib
+    matplotlib.use('Agg')  
+    import matplotlib.pyplot as plt
+    return plt
+
+# Returns a short fingerprint of the data a chart is drawn from. If the fingerprint has not changed, neither has the chart.
+def data_key(*chart_data):
+    return hashlib.sha256(repr(chart_data).encode()).hexdigest()[:16]
+
+class Analytics(ConnectionUser):
+    # 1. Creates a report with useful graphs. 
+    # The counts come from the flight_daily_status and route_count summary tables (see report_summaries.py),
+    # which triggers keep up to date, so the report reads one row per day and route instead of every flight.
+    # Archived flights are counted too, through the views over the live and history summaries (see flight_archive.py).
     def flight_report(self):
         print("\n--- Flight and Destination Report ---")  
-        fig, chart_details = plt.subplots(2, 2, figsize=(12, 8))
-        fig.suptitle("Flight and Destination Report", fontsize=16)
+        attach_history(self.conn, self.connections.path)
 
-        # a. Total Number of Flights 
-        self.cursor.execute("""SELECT COUNT(*) FROM flight""")
+        # a. Total Number of Flights (from route_count, which also counts flights without a departure timestamp)
+        self.cursor.execute("""SELECT COALESCE(SUM(flight_count), 0) FROM all_route_count""")
         total_flights = self.cursor.fetchone()[0]
 
-        chart_details[1, 1].axis('off')
-        chart_details[1, 1].text(0.1, 0.6, f"Total Flights: {total_flights}", fontsize=14)
-
         # b. Flights by Status
         self.cursor.execute("""
-            SELECT status, COUNT(*) 
-            FROM flight 
+            SELECT status, SUM(flight_count) 
+            FROM all_flight_daily_status 
             GROUP BY status
         """)
         status_information = self.cursor.fetchall()
+
+        # c. Flights per Day
+        self.cursor.execute("""
+            SELECT substr(flight_day, 9, 2) || '/' || substr(flight_day, 6, 2) || '/' || substr(flight_day, 1, 4), SUM(flight_count) 
+            FROM all_flight_daily_status
+            GROUP BY flight_day 
+            ORDER BY flight_day
+        """)
+        flight_dates = self.cursor.fetchall()
+
+        # d. Top 5 Routes
+        self.cursor.execute("""
+            SELECT origin_id || ' to ' || destination_id AS route, flight_count
+            FROM all_route_count
+            ORDER BY flight_count DESC
+            LIMIT 5
+        """)
+        route_information = self.cursor.fetchall()
+
+        # The chart is only drawn again if the numbers above have changed since it was last drawn
+        key = data_key(total_flights, status_information, flight_dates, route_information)
+        if self.reuse_report("flight_report", key):
+            print("Flight report is up to date: 'flight_report.png'")  
+            return "flight_report.png"
+
+        plt = load_pyplot()
+        fig, chart_details = plt.subplots(2, 2, figsize=(12, 8))
+        fig.suptitle("Flight and Destination Report", fontsize=16)
+
+        chart_details[1, 1].axis('off')
+        chart_details[1, 1].text(0.1, 0.6, f"Total Flights: {total_flights}", fontsize=14)
+
         if status_information:
             statuses, status_count = zip(*status_information)
             chart_details[0, 0].bar(statuses, status_count)
@@ -35,14 +85,6 @@ class Analytics:
             chart_details[0, 0].set_xlabel("Status")
             chart_details[0, 0].set_ylabel("Count")
 
-        # c. Flights per Day
-        self.cursor.execute("""
-            SELECT flight_date, COUNT(*) 
-            FROM flight
-            GROUP BY flight_date 
-            ORDER BY flight_date
-        """)
-        flight_dates = self.cursor.fetchall()
         if flight_dates:
             dates, flight_counts = zip(*flight_dates)
             chart_details[0, 1].plot(dates, flight_counts, marker='o')
@@ -51,15 +93,6 @@ class Analytics:
             chart_details[0, 1].set_ylabel("Number of Flights")
             chart_details[0, 1].tick_params(axis='x', rotation=45)
 
-        # d. Top 5 Routes
-        self.cursor.execute("""
-            SELECT origin_id || ' to ' || destination_id AS route, COUNT(*) AS count
-            FROM flight
-            GROUP BY origin_id, destination_id
-            ORDER BY count DESC
-            LIMIT 5
-        """)
-        route_information = self.cursor.fetchall()
         if route_information:
             route, route_count = zip(*route_information)
             chart_details[1, 0].barh(route, route_count)
@@ -68,16 +101,19 @@ class Analytics:
             chart_details[1, 0].invert_yaxis()
 
         plt.tight_layout(rect=[0, 0, 1, 0.96])
-        fig.savefig("flight_report.png")  
+        self.save_report(fig, "flight_report", key)
+        plt.close(fig)
         print("Flight report saved as 'flight_report.png'")  
+        return "flight_report.png"
 
-    # 2. Pilot Workload Report
+    # 2. Pilot Workload Report, over every flight including the archived ones
     def pilot_report(self):
         print("\n--- Pilot Workload Report ---")  
+        attach_history(self.conn, self.connections.path)
 
         self.cursor.execute("""
             SELECT pilot.pilot_id, pilot.last_name, COUNT(*) AS flight_count
-            FROM flight_pilot
+            FROM all_flight_pilot AS flight_pilot
             JOIN pilot ON flight_pilot.pilot_id = pilot.pilot_id
             GROUP BY pilot.pilot_id, pilot.last_name
         """)
@@ -85,20 +121,140 @@ class Analytics:
 
         if not pilot_details:
             print("No pilot_details available.")
-            return
+            return None
+
+        key = data_key(pilot_details)
+        if self.reuse_report("pilot_report", key):
+            print("Pilot report is up to date: 'pilot_report.png'")  
+            return "pilot_report.png"
 
         graph_label = [f"{pilot} {lastname}" for pilot, lastname, _ in pilot_details]
         counts = [count for _, _, count in pilot_details]
 
-        plt.figure(figsize=(10, 6))
+        plt = load_pyplot()
+        fig = plt.figure(figsize=(10, 6))
         plt.bar(graph_label, counts)
         plt.title("Flights per Pilot")
         plt.xlabel("Pilot ID & Last Name")
         plt.ylabel("Number of Flights")
         plt.xticks(rotation=45, ha='right')
         plt.tight_layout()
-        plt.savefig("pilot_report.png")  
+        self.save_report(fig, "pilot_report", key)
+        plt.close(fig)
         print("Pilot report saved as 'pilot_report.png'")  
+        return "pilot_report.png"
+
+    # 3. Pilot Duty Load Report: pilots over the rolling 7-day / 28-day flight limits or without a rest day for too long
+    def duty_report(self):
+        print("\n--- Pilot Duty Load Report ---")
+        day = input("Enter the date to check (DD/MM/YYYY) or press Enter for today: ").strip() or date.today().strftime(DATE_FORMAT)
+        try:
+            day = normalise_date(day)
+        except ValueError:
+            print("Invalid date format. Please enter as DD/MM/YYYY.")
+            return
+
+        flagged = self.flagged_pilots(day)
+        print(f"Limits: more than {MAX_FLIGHTS_7_DAYS} flights in 7 days, {MAX_FLIGHTS_28_DAYS} in 28 days, "
+              f"or {MAX_DAYS_WITHOUT_REST} days without a rest day")
+        if flagged:
+            from tabulate import tabulate
+            headers = ["Pilot ID", "First Name", "Last Name", "Flights (7 days)", "Flights (28 days)", "Days Since Rest Day"]
+            print(f"\nPilots over the limits on {day}:")
+            print(tabulate(flagged, headers=headers, tablefmt="grid"))
+        else:
+            print(f"No pilots are over the limits on {day}.")
+        return flagged
+
+    # Returns the pilots over any of the limits on a DD/MM/YYYY date, busiest first, as
+    # (pilot_id, first_name, last_name, 7-day flights, 28-day flights, days since rest day) rows.
+    # Cancelled flights are not counted. See pilot_workload.py for how the rolling windows are worked out.
+    # Only the days loaded for the check are looked at for a rest day, so a pilot who has not rested in all of them is
+    # shown with that number of days and a "+", e.g. "28+", as the run may have started earlier.
+    def flagged_pilots(self, day, max_7_days=MAX_FLIGHTS_7_DAYS, max_28_days=MAX_FLIGHTS_28_DAYS, max_days_without_rest=MAX_DAYS_WITHOUT_REST):
+        duty_load = load_duty_load(self.cursor, day, duty_window_days(max_days_without_rest))
+        flagged = duty_load.flagged(day, max_7_days, max_28_days, max_days_without_rest)
+        if not flagged:
+            return []
+
+        self.cursor.execute(f"""
+            SELECT pilot_id, first_name, last_name
+            FROM pilot
+            WHERE pilot_id IN ({", ".join("?" * len(flagged))})
+        """, [row[0] for row in flagged])
+        names = {pilot_id: (first_name, last_name) for pilot_id, first_name, last_name in self.cursor.fetchall()}
+        days_loaded = day_number(day) - duty_load.first_day + 1
+        return [(pilot_id, *names.get(pilot_id, ("", "")), week, month, rest if rest < days_loaded else f"{days_loaded}+")
+                for pilot_id, week, month, rest in flagged]
+
+    # 4. SQL Profile: calls, time, rows and full table scans of every statement run since profiling was switched on,
+    # the most total time first (see sql_profiler.py). Offers to switch profiling on if it is off.
+    def sql_profile(self):
+        print("\n--- SQL Profile ---")
+        profiler = self.connections.profiler
+        if profiler is None:
+            if input("SQL profiling is off. Turn it on for the rest of this session? (Y/N): ").strip().upper() == "Y":
+                self.connections.set_profiler(SQLProfiler())
+                print("Profiling is on. Use the other menus as usual, then come back here to see where the time went.")
+            return None
+
+        statements = profiler.report()
+        if not statements:
+            print("No statements have been run since profiling was switched on.")
+            return statements
+
+        from tabulate import tabulate
+        rows = [(number, stats["calls"], f"{stats['total_ms']:.1f}", f"{stats['mean_ms']:.2f}", f"{stats['p95_ms']:.2f}",
+                 stats["rows"], "yes" if stats["full_scan"] else "", stats["statement"][:PROFILE_STATEMENT_WIDTH])
+                for number, stats in enumerate(statements, start=1)]
+        print(tabulate(rows, headers=["#", "Calls", "Total ms", "Mean ms", "p95 ms", "Rows", "Full Scan", "Statement"], tablefmt="grid"))
+
+        while True:
+            choice = input("\nEnter a statement number to see its SQL and query plan, S to save the profile as JSON, "
+                           "R to reset it, O to turn profiling off, or press Enter to return: ").strip().upper()
+            if not choice:
+                break
+            elif choice == "S":
+                path = input("Enter the file name (or press Enter for sql_profile.json): ").strip() or "sql_profile.json"
+                try:
+                    profiler.dump(path)
+                    print(f"SQL profile saved as '{path}'")
+                except OSError as e:
+                    print(f"Failed to save the SQL profile: {e}")
+            elif choice == "R":
+                profiler.reset()
+                print("SQL profile cleared.")
+                break
+            elif choice == "O":
+                self.connections.set_profiler(None)
+                print("SQL profiling is off.")
+                break
+            elif choice.isdigit() and 1 <= int(choice) <= len(statements):
+                stats = statements[int(choice) - 1]
+                print(f"\n{stats['statement']}\n\nQuery plan:")
+                for detail in stats["plan"] or ["(none: not a query)"]:
+                    print(f"  {detail}")
+            else:
+                print("Invalid. Please try again.")
+        return statements
+
+    # If a chart has already been drawn for this version of the data, copies it to <name>.png and returns True
+    def reuse_report(self, name, key):
+        cached = os.path.join(REPORT_CACHE_DIR, f"{name}-{key}.png")
+        if not os.path.exists(cached):
+            return False
+
+        shutil.copyfile(cached, f"{name}.png")
+        os.utime(cached) #mark it as recently used so it is the last to be evicted
+        return True
+
+    # Saves a newly drawn chart to the cache and to <name>.png, then deletes all but the most recently used versions
+    def save_report(self, fig, name, key):
+        os.makedirs(REPORT_CACHE_DIR, exist_ok=True)
+        cached = os.path.join(REPORT_CACHE_DIR, f"{name}-{key}.png")
+        fig.savefig(cached)
+        shutil.copyfile(cached, f"{name}.png")
 
-    def close(self):
-        self.conn.close()
+        variants = sorted(glob.glob(os.path.join(REPORT_CACHE_DIR, f"{name}-*.png")), key=os.path.getmtime, reverse=True)
+        for old_variant in variants[REPORT_VARIANTS_KEPT:]:
+            os.remove(old_variant)
@@ -0,0 +1,137 @@
+import heapq
+from collections import defaultdict, deque
+from itertools import count
+
+from availability import MIN_AIRCRAFT_TURNAROUND_MINUTES, MIN_PILOT_REST_MINUTES
+from flight_dates import departure_minutes
+
+# Automatic assignment of aircraft and pilots to the flights in a scheduling period (see FlightManager.auto_assign).
+#
+# The flights are taken in departure order and each one is given the aircraft (and pilot) that has been waiting longest
+# at its origin airport and is ready to go, i.e. landed there at least the turnaround (or rest) time before departure.
+# This greedy "first ready" rule is the classic way of colouring an interval graph, with the extra condition that
+# an aircraft or pilot can only take a flight from the airport where its last flight landed, so positions stay
+# continuous and nobody is left stranded. Pilots and aircraft that have not flown yet can start anywhere.
+#
+# Flights in the period that already have an aircraft or pilot are kept and simply move that aircraft or pilot along.
+# Anything assigned before such a flight must end at that flight's origin in time for it to depart.
+# Every choice is also checked against the availability index, which covers flights outside the period.
+
+
+# One assignable flight, with its departure and arrival in minutes
+class PlannedFlight:
+    def __init__(self, flight_id, origin, destination, departure_at, block_minutes, aircraft_id, pilot_ids):
+        self.flight_id = flight_id
+        self.origin = origin
+        self.destination = destination
+        self.departure_at = departure_at
+        self.block_minutes = block_minutes
+        self.start = departure_minutes(departure_at)
+        self.end = self.start + block_minutes
+        self.aircraft_id = aircraft_id
+        self.pilot_ids = pilot_ids
+
+
+# Where each aircraft (or pilot) is and when it is next ready. Resources waiting at an airport are kept in a heap
+# ordered by the time they are ready, so the first ready one is found in O(log n).
+class ResourcePool:
+    def __init__(self, gap, is_free):
+        self.gap = gap #turnaround or rest time needed after landing
+        self.is_free = is_free #the availability index check, called as is_free(resource, departure_at, block_minutes)
+        self.version = defaultdict(int) #bumped when a resource moves, so its old heap entry can be recognised and skipped
+        self.waiting = defaultdict(list) #airport -> heap of (ready time, tie-breaker, resource, version)
+        self.unpositioned = deque() #resources with no flight yet, which can start from any airport
+        self.fixed = defaultdict(deque) #resource -> its already-assigned flights in the period, as (departure, origin)
+        self.sequence = count()
+
+#1. Puts a resource at an airport, ready to fly from the given minute
+    def place(self, resource, airport, ready):
+        self.version[resource] += 1
+        heapq.heappush(self.waiting[airport], (ready, next(self.sequence), resource, self.version[resource]))
+
+#2. Moves a resource along a flight it has been given (or already had)
+    def fly(self, resource, flight):
+        upcoming = self.fixed.get(resource)
+        if upcoming and upcoming[0][0] == flight.start and upcoming[0][1] == flight.origin:
+            upcoming.popleft()
+        self.place(resource, flight.destination, flight.end + self.gap)
+
+#3. Returns a resource that can take the flight, or None. Resources at the origin that are ready in time are tried
+#in the order they became ready, then resources that have not flown yet.
+    def choose(self, flight):
+        heap = self.waiting.get(flight.origin, [])
+        skipped = []
+        chosen = None
+        while heap and heap[0][0] <= flight.start:
+            entry = heapq.heappop(heap)
+            resource, version = entry[2], entry[3]
+            if version != self.version[resource]:
+                continue #the resource has moved since this entry was added
+            if self.can_take(resource, flight):
+                chosen = resource
+                break
+            skipped.append(entry)
+        for entry in skipped:
+            heapq.heappush(heap, entry)
+
+        if chosen is None:
+            for position, resource in enumerate(self.unpositioned):
+                if self.can_take(resource, flight):
+                    chosen = resource
+                    del self.unpositioned[position]
+                    break
+        return chosen
+
+    def can_take(self, resource, flight):
+        upcoming = self.fixed.get(resource)
+        if upcoming:
+            next_departure, next_origin = upcoming[0]
+            if flight.destination != next_origin or flight.end + self.gap > next_departure:
+                return False #it would not be back in time for the flight it already has
+        return self.is_free(resource, flight.departure_at, flight.block_minutes)
+
+
+#Works out the assignments for the flights in departure order. positions holds each aircraft's and pilot's last landing
+#before the period as {resource: (airport, arrival minute)}. Returns {flight_id: (aircraft_id or None, pilot_id or None)}
+#for the flights that were given an aircraft or a pilot.
+def plan_assignments(flights, aircraft_ids, pilot_ids, aircraft_positions, pilot_positions, availability):
+    aircraft = ResourcePool(MIN_AIRCRAFT_TURNAROUND_MINUTES, availability.aircraft_is_free)
+    pilots = ResourcePool(MIN_PILOT_REST_MINUTES, availability.pilot_is_free)
+
+    for flight in flights:
+        if flight.aircraft_id is not None:
+            aircraft.fixed[flight.aircraft_id].append((flight.start, flight.origin))
+        for pilot_id in flight.pilot_ids:
+            pilots.fixed[pilot_id].append((flight.start, flight.origin))
+
+    for pool, resources, positions in ((aircraft, aircraft_ids, aircraft_positions), (pilots, pilot_ids, pilot_positions)):
+        for resource in resources:
+            if resource in positions:
+                airport, arrival = positions[resource]
+                pool.place(resource, airport, arrival + pool.gap)
+            elif resource not in pool.fixed:
+                pool.unpositioned.append(resource) #resources whose first flight is already fixed join the pool when it departs
+
+    assignments = {}
+    for flight in flights:
+        aircraft_id = flight.aircraft_id
+        new_aircraft = None
+        if aircraft_id is None:
+            aircraft_id = new_aircraft = aircraft.choose(flight)
+        if aircraft_id is not None:
+            aircraft.fly(aircraft_id, flight)
+
+        flight_pilots = list(flight.pilot_ids)
+        new_pilot = None
+        if not flight_pilots:
+            new_pilot = pilots.choose(flight)
+            flight_pilots = [new_pilot] if new_pilot is not None else []
+        for pilot_id in flight_pilots:
+            pilots.fly(pilot_id, flight)
+
+        if new_aircraft is not None or new_pilot is not None:
+            assignments[flight.flight_id] = (new_aircraft, new_pilot)
+            #later checks against the availability index must see this flight's new aircraft and pilot
+            availability.record_flight(flight.flight_id, flight.departure_at, flight.block_minutes, aircraft_id, flight_pilots)
+
+    return assignments
@@ -0,0 +1,125 @@
+from bisect import bisect_left, insort
+from collections import defaultdict
+
+from connection import ConnectionUser
+from flight_dates import departure_minutes
+
+DEFAULT_BLOCK_MINUTES = 120 #flight length (departure to arrival) used when none is given; also the column default
+MIN_PILOT_REST_MINUTES = 120 #break a pilot needs between landing and their next departure
+MIN_AIRCRAFT_TURNAROUND_MINUTES = 45 #time an aircraft needs on the ground between landing and its next departure
+
+# Records when each pilot and aircraft is flying, as (departure, arrival) intervals in minutes.
+# Each pilot and aircraft has its own list of intervals sorted by departure, so checking whether a new flight overlaps
+# another one, or leaves too little rest or turnaround time, is a binary search (bisect) plus a look at the few
+# flights around that point, rather than a query. A pilot can fly more than once a day as long as they get the rest.
+# The index is loaded from the database when it is created (the database is always the source of truth) and
+# FlightManager keeps it up to date after every insert, update and delete. Cancelled flights are left out, as their
+# pilots and aircraft are free to fly something else.
+# Pilot and aircraft IDs are stored as text, as the managers read them from input().
+class AvailabilityIndex(ConnectionUser):
+    def __init__(self, connections):
+        super().__init__(connections)
+        self.reload()
+
+#1. Rebuilds the index from the flight and flight_pilot tables
+    def reload(self):
+        self.flights = {} #flight_id -> (start, end, aircraft_id, set of pilot IDs)
+        self.pilot_intervals = defaultdict(list) #pilot_id -> sorted [(start, end, flight_id)]
+        self.aircraft_intervals = defaultdict(list) #aircraft_id -> sorted [(start, end, flight_id)]
+        self.longest_block = 0 #used to know how far back the search for an overlapping flight has to look
+
+        rows = self.conn.execute("""
+            SELECT flight.flight_id, flight.departure_at, flight.block_minutes, flight.aircraft_id, flight_pilot.pilot_id
+            FROM flight
+            LEFT JOIN flight_pilot ON flight.flight_id = flight_pilot.flight_id
+            WHERE flight.departure_at IS NOT NULL AND flight.status != 'Cancelled'
+        """)
+        pilots_by_flight = defaultdict(set)
+        details = {}
+        for flight_id, departure_at, block_minutes, aircraft_id, pilot_id in rows:
+            details[flight_id] = (departure_at, block_minutes, aircraft_id)
+            if pilot_id is not None:
+                pilots_by_flight[flight_id].add(pilot_id)
+
+        for flight_id, (departure_at, block_minutes, aircraft_id) in details.items():
+            self.record_flight(flight_id, departure_at, block_minutes, aircraft_id, pilots_by_flight[flight_id])
+
+#2. Adds a flight, or replaces what was recorded for it before (used after inserts and updates).
+#departure_at is the 'YYYY-MM-DD HH:MM' timestamp and block_minutes the time from departure to arrival.
+#A flight whose status is Cancelled is only forgotten.
+    def record_flight(self, flight_id, departure_at, block_minutes, aircraft_id, pilot_ids, status=None):
+        self.forget_flight(flight_id)
+        if status == "Cancelled":
+            return
+
+        start = departure_minutes(departure_at)
+        end = start + int(block_minutes or DEFAULT_BLOCK_MINUTES)
+        aircraft_id = None if aircraft_id is None else str(aircraft_id)
+        pilot_ids = {str(pilot_id) for pilot_id in pilot_ids if pilot_id is not None}
+        self.flights[flight_id] = (start, end, aircraft_id, pilot_ids)
+        self.longest_block = max(self.longest_block, end - start)
+
+        for pilot_id in pilot_ids:
+            insort(self.pilot_intervals[pilot_id], (start, end, flight_id))
+        if aircraft_id is not None:
+            insort(self.aircraft_intervals[aircraft_id], (start, end, flight_id))
+
+#3. Removes a flight (used after deletes)
+    def forget_flight(self, flight_id):
+        previous = self.flights.pop(flight_id, None)
+        if previous is None:
+            return
+
+        start, end, aircraft_id, pilot_ids = previous
+        for pilot_id in pilot_ids:
+            self._discard(self.pilot_intervals, pilot_id, (start, end, flight_id))
+        if aircraft_id is not None:
+            self._discard(self.aircraft_intervals, aircraft_id, (start, end, flight_id))
+
+    def _discard(self, intervals_by_key, key, interval):
+        intervals = intervals_by_key[key]
+        position = bisect_left(intervals, interval)
+        if position < len(intervals) and intervals[position] == interval:
+            del intervals[position]
+        if not intervals:
+            del intervals_by_key[key]
+
+#Returns the ID of a flight in the list that overlaps [start, end) or is less than gap minutes away from it, or None.
+#The list is sorted by departure, so only the flights departing between (start - gap - longest block) and (end + gap)
+#can clash, and bisect finds the first of them.
+    def _conflict(self, intervals, start, end, gap, exclude_flight):
+        position = bisect_left(intervals, (start - gap - self.longest_block,))
+        while position < len(intervals) and intervals[position][0] < end + gap:
+            other_start, other_end, other_flight = intervals[position]
+            if other_flight != exclude_flight and other_end + gap > start:
+                return other_flight
+            position += 1
+        return None
+
+#4. Returns the ID of a flight that stops the pilot flying this departure (an overlap or too little rest), or None.
+#exclude_flight is the flight being updated, which cannot clash with itself.
+    def pilot_conflict(self, pilot_id, departure_at, block_minutes, exclude_flight=None):
+        start = departure_minutes(departure_at)
+        intervals = self.pilot_intervals.get(str(pilot_id), [])
+        return self._conflict(intervals, start, start + int(block_minutes), MIN_PILOT_REST_MINUTES, exclude_flight)
+
+#5. Returns the ID of a flight that stops the aircraft flying this departure (an overlap or too short a turnaround), or None
+    def aircraft_conflict(self, aircraft_id, departure_at, block_minutes, exclude_flight=None):
+        start = departure_minutes(departure_at)
+        intervals = self.aircraft_intervals.get(str(aircraft_id), [])
+        return self._conflict(intervals, start, start + int(block_minutes), MIN_AIRCRAFT_TURNAROUND_MINUTES, exclude_flight)
+
+    def pilot_is_free(self, pilot_id, departure_at, block_minutes, exclude_flight=None):
+        return self.pilot_conflict(pilot_id, departure_at, block_minutes, exclude_flight) is None
+
+    def aircraft_is_free(self, aircraft_id, departure_at, block_minutes, exclude_flight=None):
+        return self.aircraft_conflict(aircraft_id, departure_at, block_minutes, exclude_flight) is None
+
+#6. Returns the IDs of pilots / aircraft that cannot fly this departure, e.g. to leave them out of a list of choices
+    def busy_pilots(self, departure_at, block_minutes, exclude_flight=None):
+        return {pilot_id for pilot_id in self.pilot_intervals
+                if not self.pilot_is_free(pilot_id, departure_at, block_minutes, exclude_flight)}
+
+    def busy_aircraft(self, departure_at, block_minutes, exclude_flight=None):
+        return {aircraft_id for aircraft_id in self.aircraft_intervals
+                if not self.aircraft_is_free(aircraft_id, departure_at, block_minutes, exclude_flight)}
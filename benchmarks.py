@@ -0,0 +1,691 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from data_generator import FIRST_AIRCRAFT_ID, FIRST_PILOT_ID, SyntheticData, generate_database, write_csv_folder
+from flight_dates import date_range_bounds, departure_minutes
+from migrations import run_migrations
+
+PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+REGRESSION_THRESHOLD = 1.25 #a median this many times the one in the --compare file counts as a regression (suite)
+REGRESSION_MIN_MS = 1.0 #smaller differences are timer noise, however large the ratio (suite)
+
+# Performance benchmarks for the flight system. Each benchmark builds its own databases in a temporary folder with
+# data_generator.py, so flights.db is never touched. Run one with: python benchmarks.py <name> [options]
+
+#Builds a database in the original (tables.ipynb) schema with the sizes the benchmarks below have always used
+def build_legacy_database(path, flights, pilots=2000, aircraft=300, airports=100, seed=1):
+    generate_database(path, SyntheticData(flights, pilots, aircraft, airports, seed), migrate=False)
+
+
+#Returns the best time in seconds of running the query and fetching every row
+def time_query(conn, sql, params=(), repeat=3):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        conn.execute(sql, params).fetchall()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+# The joins that compare pilot and aircraft keys across tables
+JOIN_QUERIES = {
+    "flight records (view_flights)": ("""
+        SELECT flight.flight_id, flight.aircraft_id, pilot.pilot_id, pilot.first_name, pilot.last_name
+        FROM flight
+        LEFT JOIN flight_pilot ON flight.flight_id = flight_pilot.flight_id
+        LEFT JOIN pilot ON flight_pilot.pilot_id = pilot.pilot_id
+    """, ()),
+    "flights per pilot (pilot_report)": ("""
+        SELECT pilot.pilot_id, pilot.last_name, COUNT(*) AS flight_count
+        FROM flight_pilot
+        JOIN pilot ON flight_pilot.pilot_id = pilot.pilot_id
+        GROUP BY pilot.pilot_id, pilot.last_name
+    """, ()),
+    "aircraft details per flight": ("""
+        SELECT flight.flight_id, aircraft.registration_number
+        FROM flight
+        JOIN aircraft ON flight.aircraft_id = aircraft.aircraft_id
+    """, ()),
+    "one pilot's schedule (integer ID)": ("""
+        SELECT flight.flight_id, flight.flight_date
+        FROM flight
+        JOIN flight_pilot ON flight.flight_id = flight_pilot.flight_id
+        WHERE flight_pilot.pilot_id = ?
+    """, (1500,)),
+}
+
+
+#1. Times the key joins on the original mixed-type tables and again after the STRICT rebuild (migration 3).
+#Both databases have the indexes from migrations 1 and 2, so only the table types differ.
+def bench_strict_joins(args):
+    flights = args.flights
+    folder = tempfile.mkdtemp()
+    try:
+        legacy_path = os.path.join(folder, "legacy.db")
+        strict_path = os.path.join(folder, "strict.db")
+        build_legacy_database(legacy_path, flights)
+
+        conn = sqlite3.connect(legacy_path)
+        run_migrations(conn, target_version=2)
+        conn.close()
+        shutil.copy(legacy_path, strict_path)
+
+        conn = sqlite3.connect(strict_path)
+        run_migrations(conn, target_version=3)
+        conn.close()
+
+        print(f"Join timings over {flights} flights (best of 3)")
+        print(f"{'Query':<36} {'Legacy (s)':>11} {'STRICT (s)':>11} {'Speedup':>8}")
+        legacy = sqlite3.connect(legacy_path)
+        strict = sqlite3.connect(strict_path)
+        for name, (sql, params) in JOIN_QUERIES.items():
+            legacy_time = time_query(legacy, sql, params)
+            strict_time = time_query(strict, sql, params)
+            print(f"{name:<36} {legacy_time:>11.4f} {strict_time:>11.4f} {legacy_time / strict_time:>7.1f}x")
+        legacy.close()
+        strict.close()
+    finally:
+        shutil.rmtree(folder)
+
+
+# Modules that must not be imported before the user opens a menu that needs them
+HEAVY_MODULES = ("matplotlib", "numpy", "tabulate", "flight_manager", "pilot_information", "destination_manager", "aircraft", "analytics")
+
+# Run in a fresh interpreter: creates the CLI as main.py does and lists any heavy modules that were imported
+STARTUP_IMPORT_CHECK = f"""
+import sys
+from flight_system_cli import FlightSystemCLI
+FlightSystemCLI()
+print(",".join(sorted(name for name in {HEAVY_MODULES!r} if name in sys.modules)))
+"""
+
+
+#2. Times how long python main.py takes to reach the main menu (and exit straight away), and checks that no heavy module is
+#imported at start-up. Exits with status 1 if the median time is over --max-seconds or a heavy module was imported,
+#so it can be used to guard against start-up regressions.
+def bench_startup(args):
+    folder = tempfile.mkdtemp()
+    try:
+        shutil.copy(os.path.join(PACKAGE_DIR, "flights.db"), folder) #a copy, as the CLI migrates the database it opens
+        environment = dict(os.environ, PYTHONPATH=PACKAGE_DIR)
+        command = [sys.executable, os.path.join(PACKAGE_DIR, "main.py")]
+        subprocess.run(command, input="6\n", capture_output=True, text=True, cwd=folder, env=environment, check=True) #warm-up run applies migrations
+
+        timings = []
+        for _ in range(args.runs):
+            started = time.perf_counter()
+            result = subprocess.run(command, input="6\n", capture_output=True, text=True, cwd=folder, env=environment, check=True)
+            timings.append(time.perf_counter() - started)
+            assert "=== Flight Management System ===" in result.stdout
+
+        check = subprocess.run([sys.executable, "-c", STARTUP_IMPORT_CHECK], capture_output=True, text=True, cwd=folder, env=environment, check=True)
+        loaded = check.stdout.strip()
+    finally:
+        shutil.rmtree(folder)
+
+    median = statistics.median(timings)
+    print(f"Time to first menu over {args.runs} runs: median {median:.3f}s, best {min(timings):.3f}s, worst {max(timings):.3f}s")
+    print(f"Heavy modules imported at start-up: {loaded or 'none'}")
+
+    if loaded or median > args.max_seconds:
+        print(f"FAILED: start-up must stay under {args.max_seconds:.2f}s without importing {', '.join(HEAVY_MODULES)}")
+        sys.exit(1)
+
+
+#Builds a database in the original schema whose flights have no aircraft or pilots yet. Each aircraft's share of the
+#flights is generated as one rotation over the year (every leg leaves from the airport the last one landed at, with
+#at least the block and turnaround time in between), so an assignment that keeps every aircraft's position exists.
+def build_unassigned_database(path, flights, pilots=2000, aircraft=300, airports=100, seed=1):
+    build_legacy_database(path, 0, pilots, aircraft, airports, seed)
+    rng = random.Random(seed)
+    conn = sqlite3.connect(path)
+    codes = [row[0] for row in conn.execute("SELECT iata_code FROM airport")]
+
+    legs = -(-flights // aircraft)
+    average_gap = 365 * 24 * 60 // legs
+    flight_rows = []
+    for _ in range(aircraft):
+        airport = rng.choice(codes)
+        departure = datetime(2025, 1, 1) + timedelta(minutes=rng.randrange(average_gap))
+        for _ in range(min(legs, flights - len(flight_rows))):
+            destination = rng.choice(codes)
+            while destination == airport:
+                destination = rng.choice(codes)
+            flight_rows.append((None, airport, destination, None, departure.strftime("%d/%m/%Y"), departure.strftime("%H:%M"), "Scheduled"))
+            airport = destination
+            departure += timedelta(minutes=165 + rng.randrange(2 * (average_gap - 165))) #120 minute block + 45 minute turnaround + slack
+    conn.executemany("INSERT INTO flight VALUES (?, ?, ?, ?, ?, ?, ?)", flight_rows)
+    conn.commit()
+    conn.close()
+
+
+#Returns the number of aircraft or pilot assignments that break a rule: a flight that does not leave from the airport
+#the previous one landed at, or that departs less than gap minutes after the previous one landed
+def count_broken_rotations(conn, sql, gap):
+    broken = 0
+    previous = {}
+    for resource, origin, destination, departure_at, block_minutes in conn.execute(sql):
+        start = departure_minutes(departure_at)
+        if resource in previous:
+            last_destination, last_end = previous[resource]
+            if origin != last_destination or start < last_end + gap:
+                broken += 1
+        previous[resource] = (destination, start + block_minutes)
+    return broken
+
+
+#4. Times FlightManager.auto_assign over a year of unassigned flights (the request sizes are 100k flights, 2k pilots and
+#300 aircraft: python benchmarks.py assignment --flights 100000), then checks every aircraft and pilot rotation
+#for double-booking, short rest or turnaround, and position jumps.
+def bench_assignment(args):
+    from availability import MIN_AIRCRAFT_TURNAROUND_MINUTES, MIN_PILOT_REST_MINUTES
+    from connection import ConnectionFactory
+    from flight_manager import FlightManager
+
+    folder = tempfile.mkdtemp()
+    try:
+        path = os.path.join(folder, "assignment.db")
+        build_unassigned_database(path, args.flights)
+        connections = ConnectionFactory(path)
+        run_migrations(connections.get())
+
+        started = time.perf_counter()
+        manager = FlightManager(connections)
+        loaded = time.perf_counter()
+        summary = manager.auto_assign("01/01/2025", "31/12/2025")
+        finished = time.perf_counter()
+
+        conn = connections.get()
+        broken_aircraft = count_broken_rotations(conn, """
+            SELECT aircraft_id, origin_id, destination_id, departure_at, block_minutes FROM flight
+            WHERE aircraft_id IS NOT NULL ORDER BY aircraft_id, departure_at
+        """, MIN_AIRCRAFT_TURNAROUND_MINUTES)
+        broken_pilots = count_broken_rotations(conn, """
+            SELECT flight_pilot.pilot_id, flight.origin_id, flight.destination_id, flight.departure_at, flight.block_minutes
+            FROM flight_pilot JOIN flight ON flight.flight_id = flight_pilot.flight_id
+            ORDER BY flight_pilot.pilot_id, flight.departure_at
+        """, MIN_PILOT_REST_MINUTES)
+        connections.close_all()
+    finally:
+        shutil.rmtree(folder)
+
+    print(f"Auto-assignment of {summary['flights']} flights with 2000 pilots and 300 aircraft")
+    print(f"Availability index load: {loaded - started:.2f}s, assignment and write: {finished - loaded:.2f}s")
+    print(f"Aircraft assigned: {summary['aircraft_assigned']} (still without: {summary['without_aircraft']}), "
+          f"pilots assigned: {summary['pilots_assigned']} (still without: {summary['without_pilot']})")
+    print(f"Broken rotations: {broken_aircraft} aircraft, {broken_pilots} pilot")
+
+
+#Sends one request over an open keep-alive connection and returns the response status
+async def http_request(reader, writer, method, path, payload=None):
+    body = json.dumps(payload).encode() if payload is not None else b""
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nContent-Length: {len(body)}\r\n\r\n".encode() + body)
+    await writer.drain()
+
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while (line := await reader.readline()) not in (b"\r\n", b""):
+        name, _, value = line.decode().partition(":")
+        if name.lower() == "content-length":
+            length = int(value)
+    await reader.readexactly(length)
+    return status
+
+
+#Runs the load test clients: each keeps one connection open and sends its share of a mixed read/write workload.
+#Returns the latency of every request in seconds and the total time taken.
+async def service_load(port, args, pilots, aircraft, airports):
+    latencies = []
+    rng = random.Random(2)
+
+    def next_request():
+        day = (datetime(2025, 1, 1) + timedelta(days=rng.randrange(365))).strftime("%d/%m/%Y")
+        roll = rng.random()
+        if roll < 0.6:
+            return "GET", f"/flights?from={day}&to={day}", None
+        if roll < 0.8:
+            return "GET", f"/pilots/{rng.choice(pilots)}/schedule", None
+        if roll < 0.95:
+            return "GET", f"/flights/{rng.randrange(1, args.flights + 1)}", None
+        origin, destination = rng.sample(airports, 2)
+        return "POST", "/flights", {"origin_id": origin, "destination_id": destination, "flight_date": day, "flight_time": "12:00",
+                                    "pilot_id": rng.choice(pilots), "aircraft_id": rng.choice(aircraft)}
+
+    async def client(requests):
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        for _ in range(requests):
+            method, path, payload = next_request()
+            started = time.perf_counter()
+            status = await http_request(reader, writer, method, path, payload)
+            latencies.append(time.perf_counter() - started)
+            assert status < 500, f"{method} {path} failed with {status}"
+        writer.close()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client(args.requests // args.clients) for _ in range(args.clients)))
+    return latencies, time.perf_counter() - started
+
+
+#3. Load-tests the HTTP service (flight_service.py) on localhost: the service runs in its own process over a synthetic
+#database while --clients concurrent connections send a mix of date searches, pilot schedules, flight lookups and
+#bookings (5% writes). Reports requests per second and latency percentiles.
+def bench_service(args):
+    folder = tempfile.mkdtemp()
+    service = None
+    try:
+        path = os.path.join(folder, "service.db")
+        build_legacy_database(path, args.flights)
+        conn = sqlite3.connect(path)
+        run_migrations(conn)
+        pilots = [row[0] for row in conn.execute("SELECT pilot_id FROM pilot")]
+        aircraft = [row[0] for row in conn.execute("SELECT aircraft_id FROM aircraft")]
+        airports = [row[0] for row in conn.execute("SELECT iata_code FROM airport")]
+        conn.close()
+
+        service = subprocess.Popen([sys.executable, os.path.join(PACKAGE_DIR, "flight_service.py"), "--db", path, "--port", "0",
+                                    "--workers", str(args.workers)], stdout=subprocess.PIPE, text=True)
+        port = int(service.stdout.readline().rsplit(":", 1)[1])
+
+        latencies, elapsed = asyncio.run(service_load(port, args, pilots, aircraft, airports))
+    finally:
+        if service:
+            service.terminate()
+            service.wait()
+        shutil.rmtree(folder)
+
+    latencies.sort()
+    def percentile(p):
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000
+
+    print(f"{len(latencies)} requests from {args.clients} clients over {args.flights} flights, {args.workers} reader threads")
+    print(f"Throughput: {len(latencies) / elapsed:.0f} requests/sec")
+    print(f"Latency: p50 {percentile(0.50):.1f} ms, p99 {percentile(0.99):.1f} ms, max {latencies[-1] * 1000:.1f} ms")
+
+
+#Returns the earliest arrival (in minutes) at destination with at most max_legs flights, found the slow way: every flight is
+#tried in each round, and round n finds every airport that can be reached with n flights. Used to check the route index.
+def earliest_arrival_by_rounds(flights, origin, destination, earliest, latest, min_connection, max_legs):
+    ready = {origin: earliest} #airport -> earliest time a flight can leave from it
+    best = None
+    for _ in range(max_legs):
+        reached = dict(ready)
+        for flight_origin, flight_destination, start, end in flights:
+            if flight_origin in ready and ready[flight_origin] <= start <= latest:
+                if flight_destination == destination and (best is None or end < best):
+                    best = end
+                if end + min_connection < reached.get(flight_destination, end + min_connection + 1):
+                    reached[flight_destination] = end + min_connection
+        ready = reached
+    return best
+
+
+#5. Times itinerary searches on the route index over a synthetic network (--flights flights between 100 airports over
+#a year), checks the fastest result of each search against a brute-force search, and times incremental updates.
+def bench_itineraries(args):
+    from connection import ConnectionFactory
+    from flight_dates import minutes_departure
+    from route_network import MAX_ITINERARY_LEGS, MIN_CONNECTION_MINUTES, SEARCH_WINDOW_HOURS, RouteIndex
+
+    folder = tempfile.mkdtemp()
+    try:
+        path = os.path.join(folder, "itineraries.db")
+        build_legacy_database(path, args.flights)
+        connections = ConnectionFactory(path)
+        run_migrations(connections.get())
+        conn = connections.get()
+        airports = [row[0] for row in conn.execute("SELECT iata_code FROM airport")]
+        flights = [(origin, destination, departure_minutes(departure_at), departure_minutes(departure_at) + block_minutes)
+                   for origin, destination, departure_at, block_minutes in conn.execute(
+                       "SELECT origin_id, destination_id, departure_at, block_minutes FROM flight WHERE status != 'Cancelled'")]
+
+        routes = RouteIndex(connections)
+        started = time.perf_counter()
+        routes.reload()
+        load_seconds = time.perf_counter() - started
+
+        rng = random.Random(2)
+        first_day = departure_minutes("2025-01-01 00:00")
+        searches = [(*rng.sample(airports, 2), first_day + rng.randrange(360 * 24 * 60)) for _ in range(args.searches)]
+        timings = []
+        mismatches = 0
+        for number, (origin, destination, earliest) in enumerate(searches):
+            started = time.perf_counter()
+            itineraries = routes.find_itineraries(origin, destination, minutes_departure(earliest))
+            timings.append(time.perf_counter() - started)
+            if number < 20:
+                expected = earliest_arrival_by_rounds(flights, origin, destination, earliest, earliest + SEARCH_WINDOW_HOURS * 60,
+                                                      MIN_CONNECTION_MINUTES, MAX_ITINERARY_LEGS)
+                found = departure_minutes(itineraries[0]["arrival_at"]) if itineraries else None
+                mismatches += found != expected
+
+        started = time.perf_counter()
+        for flight_id in range(1, 1001):
+            routes.record_flight(flight_id, airports[0], airports[1], "2025-06-01 12:00", 90, "Scheduled")
+        update_seconds = time.perf_counter() - started
+        connections.close_all()
+    finally:
+        shutil.rmtree(folder)
+
+    timings.sort()
+    print(f"Route index over {len(flights)} flights loaded in {load_seconds:.2f}s")
+    print(f"{len(timings)} searches (up to {MAX_ITINERARY_LEGS} legs, {MIN_CONNECTION_MINUTES} minute connections): "
+          f"median {timings[len(timings) // 2] * 1000:.2f} ms, p99 {timings[int(len(timings) * 0.99)] * 1000:.2f} ms")
+    print(f"Fastest itinerary differs from the brute-force search in {mismatches} of {min(20, len(timings))} checked searches")
+    print(f"1000 incremental flight updates: {update_seconds * 1000:.1f} ms")
+
+
+#6. Times typeahead searches on the FTS5 indexes (migration 6) over --airports airports and --pilots pilots, using prefixes
+#of 1 to 5 characters taken from real names, and compares them with the LIKE scans they replace
+def bench_search(args):
+    from connection import ConnectionFactory
+    from destination_manager import DestinationManager
+    from pilot_information import PilotInformation
+
+    folder = tempfile.mkdtemp()
+    try:
+        path = os.path.join(folder, "search.db")
+        build_legacy_database(path, 0, pilots=args.pilots, airports=args.airports)
+        connections = ConnectionFactory(path)
+        conn = connections.get()
+        rng = random.Random(3)
+
+        started = time.perf_counter()
+        run_migrations(conn)
+        index_seconds = time.perf_counter() - started
+
+        cities = [row[0] for row in conn.execute("SELECT city FROM airport")]
+        names = [row[0] for row in conn.execute("SELECT last_name FROM pilot")]
+        searches = [(DestinationManager(connections).search_destinations, rng.choice(cities)[:rng.randint(1, 5)], "airport",
+                     "SELECT name, city, country, iata_code FROM airport WHERE name LIKE ?1 OR city LIKE ?1 OR country LIKE ?1 OR iata_code LIKE ?1 LIMIT 20")
+                    for _ in range(args.searches // 2)]
+        searches += [(PilotInformation(connections).search_pilots, rng.choice(names)[:rng.randint(1, 5)], "pilot",
+                      "SELECT pilot_id, first_name, last_name, license_number, nationality FROM pilot "
+                      "WHERE first_name LIKE ?1 OR last_name LIKE ?1 OR license_number LIKE ?1 OR nationality LIKE ?1 LIMIT 20")
+                     for _ in range(args.searches // 2)]
+
+        timings = {"airport": [], "pilot": []}
+        like_timings = {"airport": [], "pilot": []}
+        for search, prefix, table, like_sql in searches:
+            started = time.perf_counter()
+            search(prefix)
+            timings[table].append(time.perf_counter() - started)
+            started = time.perf_counter()
+            conn.execute(like_sql, (f"%{prefix}%",)).fetchall()
+            like_timings[table].append(time.perf_counter() - started)
+        connections.close_all()
+    finally:
+        shutil.rmtree(folder)
+
+    print(f"Search indexes over {args.airports} airports and {args.pilots} pilots built in {index_seconds:.2f}s")
+    for table in timings:
+        fts, like = sorted(timings[table]), sorted(like_timings[table])
+        print(f"{table}: FTS5 median {fts[len(fts) // 2] * 1000:.2f} ms, p99 {fts[int(len(fts) * 0.99)] * 1000:.2f} ms; "
+              f"LIKE scan median {like[len(like) // 2] * 1000:.2f} ms")
+
+
+#Runs data_loader.py in its own process and returns (seconds, peak memory in MB, output)
+def run_loader(path, folder):
+    script = ("import resource, runpy, sys; sys.argv = ['data_loader.py', '--db', sys.argv[1], '--data', sys.argv[2]]; "
+              "runpy.run_path('data_loader.py', run_name='__main__'); "
+              "print('peak', resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)")
+    started = time.perf_counter()
+    output = subprocess.run([sys.executable, "-c", script, path, folder], cwd=PACKAGE_DIR, capture_output=True, text=True, check=True).stdout
+    seconds = time.perf_counter() - started
+    peak_kb = int(output.rsplit("peak", 1)[1])
+    return seconds, peak_kb / 1024, output.rsplit("peak", 1)[0]
+
+
+#7. Loads synthetic CSV files of --flights / 10 and --flights flight rows into new databases with data_loader.py (the
+#request size is 1M: python benchmarks.py loader --flights 1000000) and reports time and peak memory of each, to show
+#that memory does not grow with the file. The large load is then repeated to check it is idempotent.
+def bench_loader(args):
+    folder = tempfile.mkdtemp()
+    try:
+        results = []
+        for flights in (args.flights // 10, args.flights):
+            data = os.path.join(folder, f"data_{flights}")
+            os.makedirs(data)
+            write_csv_folder(data, SyntheticData(flights, pilots=2000, aircraft=300, airports=100))
+            path = os.path.join(folder, f"load_{flights}.db")
+            results.append((flights, *run_loader(path, data)))
+
+        seconds, peak_mb, output = run_loader(path, data)
+        conn = sqlite3.connect(path)
+        counts = {table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0] for table in ("flight", "flight_pilot")}
+        conn.close()
+    finally:
+        shutil.rmtree(folder)
+
+    for flights, load_seconds, load_peak_mb, load_output in results:
+        print(f"{flights} flights: loaded and migrated in {load_seconds:.1f}s ({flights / load_seconds:.0f} rows/sec), peak memory {load_peak_mb:.0f} MB")
+    print(f"Loading the {args.flights} flights again: {seconds:.1f}s, peak memory {peak_mb:.0f} MB, "
+          f"{counts['flight']} flights and {counts['flight_pilot']} pilot assignments in the database")
+    print(output.strip())
+
+
+#Returns min, median, p95 and max of a list of timings in seconds, in milliseconds
+def summarise(timings):
+    timings = sorted(timings)
+    return {
+        "runs": len(timings),
+        "min_ms": round(timings[0] * 1000, 3),
+        "median_ms": round(timings[len(timings) // 2] * 1000, 3),
+        "p95_ms": round(timings[min(len(timings) - 1, int(len(timings) * 0.95))] * 1000, 3),
+        "max_ms": round(timings[-1] * 1000, 3),
+    }
+
+
+#Times action runs times. setup() is called (untimed) before each run and its result passed to action, and cleanup() is
+#called (untimed) with the action's result after each run, so that write paths leave the database as they found it.
+def time_operation(runs, action, setup=None, cleanup=None):
+    timings = []
+    for _ in range(runs):
+        state = setup() if setup else None
+        started = time.perf_counter()
+        result = action(state)
+        timings.append(time.perf_counter() - started)
+        if cleanup:
+            cleanup(result)
+    return summarise(timings)
+
+
+#Returns the (name, runs, action, setup, cleanup) of every read and write path of the four managers that the suite times.
+#Inputs are picked with a seeded random generator, so each run of the suite makes the same calls.
+def suite_operations(connections, data, folder, runs):
+    from analytics import Analytics
+    from destination_manager import DestinationManager
+    from flight_manager import FLIGHT_COLUMNS, FlightManager
+    from pilot_information import PilotInformation
+
+    flights = FlightManager(connections)
+    pilots = PilotInformation(connections)
+    destinations = DestinationManager(connections)
+    analytics = Analytics(connections)
+    conn = connections.get()
+    rng = random.Random(data.seed)
+    last_names = [row[0] for row in conn.execute("SELECT last_name FROM pilot ORDER BY pilot_id LIMIT 1000")]
+    cities = [row[0] for row in conn.execute("SELECT city FROM airport")]
+    codes = set(data.codes)
+    new_code = next(code for code in map(SyntheticData.code, range(26 ** 3)) if code not in codes)
+    repeated = min(runs, 3) #for operations that read every flight, which take too long at the larger sizes to repeat often
+
+    def day(days=0):
+        return (datetime(2025, 1, 1) + timedelta(days=rng.randrange(358) + days)).strftime("%d/%m/%Y")
+
+    def week():
+        first = rng.randrange(358)
+        return tuple((datetime(2025, 1, 1) + timedelta(days=first + days)).strftime("%d/%m/%Y") for days in (0, 6))
+
+    #schedules flights after the generated year, each on its own day so that none of them clash, and returns their IDs
+    def schedule(count, crewed=True):
+        first = datetime(2026, 1, 1) + timedelta(days=rng.randrange(200))
+        specs = [{"origin_id": origin, "destination_id": destination, "flight_date": (first + timedelta(days=number)).strftime("%d/%m/%Y"),
+                  "flight_time": "12:00", "pilot_id": FIRST_PILOT_ID if crewed else None,
+                  "aircraft_id": FIRST_AIRCRAFT_ID if crewed else None}
+                 for number, (origin, destination) in enumerate(rng.sample(data.codes, 2) for _ in range(count))]
+        results = flights.schedule_flights(specs)
+        rejected = [result["reason"] for result in results if not result["accepted"]]
+        if rejected:
+            raise RuntimeError(f"Benchmark flight rejected: {rejected[0]}")
+        return [result["flight_id"] for result in results]
+
+    def remove(flight_ids):
+        for flight_id in flight_ids:
+            flights.remove_flight(flight_id)
+
+    def assign(flight_ids):
+        flights.auto_assign("01/01/2026", "31/12/2026")
+        return flight_ids
+
+    def disrupt(flight_ids):
+        flights.apply_disruption("01/01/2026", "31/12/2026", status="Delayed", delay_minutes=30)
+        return flight_ids
+
+    return [
+        ("AvailabilityIndex.reload", repeated, lambda _: flights.availability.reload(), None, None),
+        ("RouteIndex.reload", repeated, lambda _: flights.routes.reload(), None, None),
+        ("FlightManager.get_flight", runs, lambda _: flights.get_flight(rng.randint(1, data.flights)), None, None),
+        ("FlightManager.find_flights (1 day)", runs, lambda _: flights.find_flights(*[day()] * 2), None, None),
+        ("FlightManager.find_flights (1 week, Delayed)", runs, lambda _: flights.find_flights(*week(), "Delayed"), None, None),
+        ("FlightManager.fetch_flight_page (first)", runs, lambda _: flights.fetch_flight_page(list(FLIGHT_COLUMNS)), None, None),
+        ("FlightManager.fetch_flight_page (from a date)", runs,
+         lambda _: flights.fetch_flight_page(list(FLIGHT_COLUMNS), after=(date_range_bounds(*[day()] * 2)[0], 0)), None, None),
+        ("FlightManager.find_itineraries", runs, lambda _: flights.find_itineraries(*rng.sample(data.codes, 2), day()), None, None),
+        ("FlightManager.export_flights (all)", repeated, lambda _: flights.export_flights(os.path.join(folder, "flights.csv")), None, None),
+        ("PilotInformation.pilot_schedule", runs, lambda _: pilots.pilot_schedule(FIRST_PILOT_ID + rng.randrange(data.pilots)), None, None),
+        ("PilotInformation.search_pilots", runs, lambda _: pilots.search_pilots(rng.choice(last_names)[:rng.randint(1, 5)]), None, None),
+        ("PilotInformation.export_rosters (1 week)", repeated,
+         lambda _: pilots.export_rosters(*week(), os.path.join(folder, "roster.csv")), None, None),
+        ("DestinationManager.search_destinations", runs,
+         lambda _: destinations.search_destinations(rng.choice(cities)[:rng.randint(1, 5)]), None, None),
+        ("DestinationManager.list_destinations", runs, lambda _: destinations.list_destinations(), None, None),
+        ("Analytics.flagged_pilots", repeated, lambda _: analytics.flagged_pilots(day()), None, None),
+        ("FlightManager.schedule_flights (1 flight)", runs, lambda _: schedule(1), None, remove),
+        ("FlightManager.schedule_flights (100 flights)", repeated, lambda _: schedule(100), None, remove),
+        ("FlightManager.remove_flight", runs, lambda flight_ids: remove(flight_ids), lambda: schedule(1), None),
+        ("FlightManager.auto_assign (50 new flights)", repeated, assign, lambda: schedule(50, crewed=False), remove),
+        ("FlightManager.apply_disruption (100 flights)", repeated, disrupt, lambda: schedule(100), remove),
+        ("DestinationManager.create_destination", runs,
+         lambda _: destinations.create_destination("Benchmark Airport", "Benchmark", "UK", new_code),
+         None, lambda _: destinations.remove_destination(new_code)),
+        ("DestinationManager.remove_destination", runs, lambda _: destinations.remove_destination(new_code),
+         lambda: destinations.create_destination("Benchmark Airport", "Benchmark", "UK", new_code), None),
+    ]
+
+
+#Prints how each operation's median compares with the same size and operation in a previous results file.
+#Returns the number of operations that got slower by more than REGRESSION_THRESHOLD (and REGRESSION_MIN_MS).
+def compare_results(results, previous_path):
+    with open(previous_path, encoding="utf-8") as previous_file:
+        previous = {(size["flights"], name): timing["median_ms"]
+                    for size in json.load(previous_file)["sizes"] for name, timing in size["operations"].items()}
+    regressions = 0
+    print(f"\nCompared with {previous_path} (median, regression over {REGRESSION_THRESHOLD:.2f}x):")
+    for size in results["sizes"]:
+        for name, timing in size["operations"].items():
+            before = previous.get((size["flights"], name))
+            if not before:
+                continue
+            ratio = timing["median_ms"] / before
+            slower = ratio > REGRESSION_THRESHOLD and timing["median_ms"] - before > REGRESSION_MIN_MS
+            regressions += slower
+            print(f"{size['flights']:>10} {name:<48} {before:>10.2f} -> {timing['median_ms']:>10.2f} ms {ratio:>6.2f}x"
+                  f"{'  REGRESSION' if slower else ''}")
+    return regressions
+
+
+#8. Generates a database for each of --sizes flights (python benchmarks.py suite --sizes 10000,1000000,10000000), times
+#every read and write path of FlightManager, PilotInformation, DestinationManager and Analytics on it, and writes the
+#timings to --output as JSON. With --compare, the medians are checked against an earlier results file and the exit
+#status is 1 if any got slower by more than REGRESSION_THRESHOLD. Generated databases are kept in --data-dir (if given)
+#and reused by later runs with the same size and seed, as the large ones take a while to build.
+def bench_suite(args):
+    from connection import ConnectionFactory
+
+    results = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "sqlite": sqlite3.sqlite_version,
+        "seed": args.seed,
+        "runs": args.runs,
+        "sizes": [],
+    }
+    folder = tempfile.mkdtemp()
+    try:
+        for flights in (int(size) for size in args.sizes.split(",")):
+            data = SyntheticData(flights, seed=args.seed)
+            path = os.path.join(args.data_dir or folder, f"scale_{flights}_seed{args.seed}.db")
+            generate_seconds = None
+            if not os.path.exists(path):
+                started = time.perf_counter()
+                generate_database(path, data)
+                generate_seconds = round(time.perf_counter() - started, 1)
+
+            connections = ConnectionFactory(path)
+            started = time.perf_counter()
+            operations = suite_operations(connections, data, folder, args.runs) #includes loading FlightManager's indexes
+            timings = {"FlightManager()": summarise([time.perf_counter() - started])}
+            for name, runs, action, setup, cleanup in operations:
+                timings[name] = time_operation(runs, action, setup, cleanup)
+            connections.close_all()
+
+            results["sizes"].append({"flights": flights, "pilots": data.pilots, "aircraft": data.aircraft, "airports": data.airports,
+                                     "generate_seconds": generate_seconds, "operations": timings})
+            print(f"\n{flights} flights, {data.pilots} pilots, {data.aircraft} aircraft, {data.airports} airports"
+                  f"{f' (generated in {generate_seconds}s)' if generate_seconds is not None else ''}")
+            print(f"{'Operation':<48} {'Runs':>5} {'Median ms':>10} {'p95 ms':>10} {'Max ms':>10}")
+            for name, timing in timings.items():
+                print(f"{name:<48} {timing['runs']:>5} {timing['median_ms']:>10.2f} {timing['p95_ms']:>10.2f} {timing['max_ms']:>10.2f}")
+    finally:
+        shutil.rmtree(folder)
+
+    with open(args.output, "w", encoding="utf-8") as output_file:
+        json.dump(results, output_file, indent=2)
+    print(f"\nResults written to {args.output}")
+
+    if args.compare and compare_results(results, args.compare):
+        sys.exit(1)
+
+
+BENCHMARKS = {
+    "strict_joins": bench_strict_joins,
+    "startup": bench_startup,
+    "service": bench_service,
+    "assignment": bench_assignment,
+    "itineraries": bench_itineraries,
+    "search": bench_search,
+    "loader": bench_loader,
+    "suite": bench_suite,
+}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Flight system performance benchmarks")
+    parser.add_argument("benchmark", choices=BENCHMARKS)
+    parser.add_argument("--flights", type=int, default=200_000, help="number of synthetic flights")
+    parser.add_argument("--runs", type=int, default=10, help="number of timed runs (startup, suite)")
+    parser.add_argument("--max-seconds", type=float, default=0.5, help="slowest acceptable median time to first menu (startup)")
+    parser.add_argument("--requests", type=int, default=5000, help="total number of requests sent (service)")
+    parser.add_argument("--clients", type=int, default=16, help="number of concurrent client connections (service)")
+    parser.add_argument("--workers", type=int, default=8, help="number of reader threads in the service (service)")
+    parser.add_argument("--searches", type=int, default=500, help="number of searches (itineraries, search)")
+    parser.add_argument("--airports", type=int, default=10_000, help="number of synthetic airports (search)")
+    parser.add_argument("--pilots", type=int, default=50_000, help="number of synthetic pilots (search)")
+    parser.add_argument("--sizes", default="10000,100000", help="comma-separated numbers of flights, e.g. 10000,1000000,10000000 (suite)")
+    parser.add_argument("--seed", type=int, default=1, help="random seed for the generated data (suite)")
+    parser.add_argument("--output", default="benchmark_results.json", help="JSON file the timings are written to (suite)")
+    parser.add_argument("--compare", help="earlier results file to check the timings against (suite)")
+    parser.add_argument("--data-dir", help="folder to keep the generated databases in for later runs (suite)")
+    args = parser.parse_args()
+    BENCHMARKS[args.benchmark](args)
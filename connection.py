@@ -0,0 +1,106 @@
+import os
+import sqlite3
+import threading
+
+from sql_profiler import SQL_PROFILE_VARIABLE, ProfilingConnection, SQLProfiler
+
+DATABASE_PATH = "flights.db"
+STATEMENT_CACHE_SIZE = 256 #prepared statements kept per connection (sqlite3 keeps 128 by default)
+BUSY_TIMEOUT_MS = 5000 #how long a connection waits for another writer before giving up
+
+# Settings applied to every new connection. cache_size is negative so it is read as KiB (64 MB).
+CONNECTION_PRAGMAS = (
+    ("foreign_keys", "ON"),
+    ("synchronous", "NORMAL"), #safe with WAL: a power cut can only lose the last commits, never corrupt the file
+    ("cache_size", -64000),
+    ("mmap_size", 268435456), #read the database through a 256 MB memory map instead of read() calls
+    ("temp_store", "MEMORY"),
+    ("busy_timeout", BUSY_TIMEOUT_MS),
+)
+
+# Hands out tuned connections to the flight database, one per thread, so that readers can run alongside a writer.
+# The database is switched to write-ahead logging (WAL) once, which is stored in the file itself.
+# Given an SQLProfiler (or with the FLIGHTS_SQL_PROFILE environment variable set), every statement run on the
+# connections is timed and recorded; see sql_profiler.py.
+class ConnectionFactory:
+    def __init__(self, path=DATABASE_PATH, profiler=None):
+        self.path = path
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.open_connections = []
+        self.profiler = profiler or (SQLProfiler() if os.environ.get(SQL_PROFILE_VARIABLE) else None)
+        from reference_data import ReferenceData #imported here, as reference_data.py builds on this module
+        self.reference_data = ReferenceData(self) #the airport, aircraft and pilot tables, shared by every manager
+        self.get().execute("PRAGMA journal_mode = WAL")
+
+#1. Opens a new connection with the tuned settings
+    def connect(self):
+        #each connection is only used by the thread that opened it; check_same_thread is off so close_all can close it from any thread
+        conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT_MS / 1000, cached_statements=STATEMENT_CACHE_SIZE, check_same_thread=False,
+                               factory=ProfilingConnection if self.profiler else sqlite3.Connection)
+        for pragma, value in CONNECTION_PRAGMAS:
+            conn.execute(f"PRAGMA {pragma} = {value}")
+        if self.profiler:
+            conn.profiler = self.profiler #set after the settings, so that only the managers' statements are recorded
+        return conn
+
+#2. Returns the current thread's connection, opening it on first use
+    def get(self):
+        conn = getattr(self.local, "connection", None)
+        if conn is None:
+            conn = self.connect()
+            self.local.connection = conn
+            self.local.cursor = conn.cursor()
+            with self.lock:
+                self.open_connections.append(conn)
+        return conn
+
+#3. Returns the current thread's long-lived cursor
+    def cursor(self):
+        self.get()
+        return self.local.cursor
+
+#4. Closes the current thread's connection; the next get() opens a fresh one
+    def close(self):
+        conn = getattr(self.local, "connection", None)
+        if conn is not None:
+            self.local.connection = None
+            self.local.cursor = None
+            with self.lock:
+                self.open_connections.remove(conn)
+            conn.close()
+
+#5. Closes every connection handed out by the factory, e.g. when the program exits
+    def close_all(self):
+        with self.lock:
+            connections, self.open_connections = self.open_connections, []
+        for conn in connections:
+            conn.close()
+        self.local = threading.local()
+
+#6. Starts recording every statement with the given SQLProfiler, or stops with None. The open connections are closed,
+#so the next get() on each thread opens one that is (or is not) profiled. Call it between transactions.
+    def set_profiler(self, profiler):
+        self.profiler = profiler
+        self.close_all()
+
+
+# Base for the manager classes. self.conn and self.cursor always refer to the calling thread's own connection and cursor.
+class ConnectionUser:
+    def __init__(self, connections):
+        self.connections = connections
+
+    @property
+    def conn(self):
+        return self.connections.get()
+
+    @property
+    def cursor(self):
+        return self.connections.cursor()
+
+    @property
+    def reference(self):
+        return self.connections.reference_data
+
+    def close(self):
+        self.connections.close()
@@ -0,0 +1,185 @@
+import argparse
+import csv
+import os
+import random
+import time
+from datetime import date, timedelta
+from itertools import islice
+
+from connection import ConnectionFactory
+from data_loader import LOAD_CHUNK_SIZE, TABLE_LOADS, DataLoader
+from flight_dates import DATE_FORMAT
+from migrations import run_migrations
+
+# Builds seeded synthetic databases (or Data/ CSV files) at any size, for benchmarks and for trying the system at
+# production scale:
+#   python data_generator.py --flights 1000000 --db scale_1m.db
+#   python data_generator.py --flights 10000 --csv scale_10k
+#
+# The same sizes and seed always give the same rows. Every flight goes between two different airports that exist, is
+# flown by an aircraft and a pilot that exist, and has one of the statuses the CHECK constraint allows; the rows are
+# written with foreign keys on, so a broken reference would stop the build. Flights depart at random over one year and
+# are given aircraft and pilots at random, so, as with a bulk load, a pilot or aircraft can be double-booked.
+#
+# Rows come from generators and are written in chunks, so 10M flights take no more memory than 10k. The tables are
+# filled in the original schema and the migrations run afterwards, as data_loader.py does for a new database.
+
+GENERATED_START = date(2025, 1, 1)
+GENERATED_DAYS = 365
+FIRST_AIRCRAFT_ID = 100
+FIRST_PILOT_ID = 1000
+STATUS_CHOICES = ("Scheduled", "Scheduled", "Scheduled", "Delayed", "Cancelled") #picked at random, so 60% Scheduled
+# Names are made of syllables, so that search prefixes match realistic numbers of rows (First1, First2... would all share one)
+SYLLABLES = ("al", "an", "ber", "cal", "da", "el", "fer", "go", "han", "is", "jo", "ka", "lo", "mar", "ni", "or", "pe", "ro",
+             "sa", "ton", "vi", "wen")
+COUNTRIES = ("UK", "Ireland", "France", "Spain", "Germany", "Italy", "Netherlands", "USA", "Canada", "UAE", "India", "Japan")
+AIRCRAFT_MODELS = (("Airbus A320", 180, "Airbus"), ("Boeing 737", 160, "Boeing"), ("Boeing 787", 242, "Boeing"),
+                   ("Airbus A350", 300, "Airbus"), ("Embraer E190", 100, "Embraer"))
+
+# The columns generated for each table, in the original schema (block_minutes and departure_at are added by the migrations)
+GENERATED_COLUMNS = {
+    "airport": ("iata_code", "name", "city", "country"),
+    "aircraft": ("aircraft_id", "model", "capacity", "manufacturer", "registration_number"),
+    "pilot": ("pilot_id", "first_name", "last_name", "experience_years", "date_of_birth", "nationality", "phone_number", "email",
+              "passport_number", "license_number", "first_line_of_address", "town_city", "county", "country", "postcode",
+              "work_eligibility"),
+    "flight": ("flight_id", "origin_id", "destination_id", "aircraft_id", "flight_date", "flight_time", "status"),
+    "flight_pilot": ("flight_id", "pilot_id"),
+}
+
+
+#Returns the number of pilots, aircraft and airports that go with a number of flights (2000, 300 and 100 for 200k flights)
+def scale_sizes(flights):
+    return {
+        "pilots": max(10, flights // 100),
+        "aircraft": max(2, flights * 3 // 2000),
+        "airports": min(10_000, max(10, flights // 2000)),
+    }
+
+
+# The rows of one synthetic data set. Each table has its own random stream, seeded from the seed and the table name,
+# so a table's rows do not depend on which other tables were generated first.
+class SyntheticData:
+    def __init__(self, flights, pilots=None, aircraft=None, airports=None, seed=1):
+        sizes = scale_sizes(flights)
+        self.flights = flights
+        self.pilots = sizes["pilots"] if pilots is None else pilots
+        self.aircraft = sizes["aircraft"] if aircraft is None else aircraft
+        self.airports = sizes["airports"] if airports is None else airports
+        self.seed = seed
+        if self.flights and (self.airports < 2 or not self.pilots or not self.aircraft):
+            raise ValueError("Flights need at least 2 airports, 1 pilot and 1 aircraft.")
+
+        rng = self.random("airport codes")
+        self.codes = sorted(self.code(number) for number in rng.sample(range(26 ** 3), self.airports))
+
+    def random(self, stream):
+        return random.Random(f"{self.seed}-{stream}")
+
+    @staticmethod
+    def code(number):
+        letters = ""
+        for _ in range(3):
+            number, letter = divmod(number, 26)
+            letters += chr(ord("A") + letter)
+        return letters
+
+    @staticmethod
+    def name(rng, syllables):
+        return "".join(rng.choice(SYLLABLES) for _ in range(syllables)).capitalize()
+
+#1. Returns a generator of the rows for a table, in GENERATED_COLUMNS order
+    def rows(self, table):
+        return getattr(self, f"{table}_rows")(self.random(table))
+
+    def airport_rows(self, rng):
+        for code in self.codes:
+            city = self.name(rng, 3)
+            yield code, f"{city} {rng.choice(('International', 'Airport', 'Regional'))}", city, rng.choice(COUNTRIES)
+
+    def aircraft_rows(self, rng):
+        for number in range(self.aircraft):
+            model, capacity, manufacturer = rng.choice(AIRCRAFT_MODELS)
+            yield FIRST_AIRCRAFT_ID + number, model, capacity, manufacturer, f"G-{number:05d}"
+
+    def pilot_rows(self, rng):
+        first_names = [self.name(rng, 2) for _ in range(300)]
+        last_names = [self.name(rng, 3) for _ in range(2000)]
+        for number in range(self.pilots):
+            country = rng.choice(COUNTRIES)
+            born = date(1960, 1, 1) + timedelta(days=rng.randrange(40 * 365))
+            yield (FIRST_PILOT_ID + number, rng.choice(first_names), rng.choice(last_names), rng.randrange(1, 35),
+                   born.strftime(DATE_FORMAT), country, f"07{number:09d}", f"pilot{number}@example.com", f"P{number:08d}",
+                   f"LIC{number:06d}", f"{rng.randrange(1, 200)} High Street", self.name(rng, 2), None, country,
+                   f"AB{number % 100} {number % 10}CD", "confirmed")
+
+    def flight_rows(self, rng):
+        #the date and time strings are worked out once, as formatting them for every flight would be the slowest part
+        days = [(GENERATED_START + timedelta(days=day)).strftime(DATE_FORMAT) for day in range(GENERATED_DAYS)]
+        times = [f"{minute // 60:02d}:{minute % 60:02d}" for minute in range(24 * 60)]
+        codes = self.codes
+        for flight_id in range(1, self.flights + 1):
+            origin, destination = rng.sample(codes, 2)
+            minute = rng.randrange(GENERATED_DAYS * 24 * 60)
+            yield (flight_id, origin, destination, FIRST_AIRCRAFT_ID + rng.randrange(self.aircraft), days[minute // (24 * 60)],
+                   times[minute % (24 * 60)], rng.choice(STATUS_CHOICES))
+
+    def flight_pilot_rows(self, rng):
+        for flight_id in range(1, self.flights + 1):
+            yield flight_id, FIRST_PILOT_ID + rng.randrange(self.pilots)
+
+
+#Builds a new database file from a SyntheticData, brought up to the current schema unless migrate is False (which leaves
+#it as tables.ipynb created it, e.g. to time the migrations). Raises ValueError if the file already has tables.
+def generate_database(path, data, migrate=True, chunk_size=LOAD_CHUNK_SIZE):
+    connections = ConnectionFactory(path)
+    try:
+        loader = DataLoader(connections, chunk_size)
+        if not loader.create_baseline_schema():
+            raise ValueError(f"{path} already has tables. Choose a new file.")
+        conn = loader.conn
+        with loader.load_pragmas():
+            for table in TABLE_LOADS: #parents first
+                columns = GENERATED_COLUMNS[table]
+                insert = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)})"
+                rows = data.rows(table)
+                while chunk := list(islice(rows, chunk_size)):
+                    with conn:
+                        conn.executemany(insert, chunk)
+            if migrate:
+                run_migrations(conn)
+    finally:
+        connections.close_all()
+
+
+#Writes a SyntheticData as the CSV files data_loader.py reads, into folder
+def write_csv_folder(folder, data):
+    os.makedirs(folder, exist_ok=True)
+    for table, (file_name, _, _) in TABLE_LOADS.items():
+        with open(os.path.join(folder, file_name), "w", newline="", encoding="utf-8") as csv_file:
+            writer = csv.writer(csv_file)
+            writer.writerow(GENERATED_COLUMNS[table])
+            writer.writerows(data.rows(table))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a seeded synthetic flight database or set of CSV files")
+    parser.add_argument("--flights", type=int, required=True, help="number of flights, e.g. 10000, 1000000 or 10000000")
+    parser.add_argument("--pilots", type=int, help="number of pilots (default: 1 per 100 flights)")
+    parser.add_argument("--aircraft", type=int, help="number of aircraft (default: 3 per 2000 flights)")
+    parser.add_argument("--airports", type=int, help="number of airports (default: 1 per 2000 flights, at most 10000)")
+    parser.add_argument("--seed", type=int, default=1, help="random seed (default: 1)")
+    output = parser.add_mutually_exclusive_group(required=True)
+    output.add_argument("--db", help="new database file to create")
+    output.add_argument("--csv", help="folder to write the CSV files to instead")
+    parser.add_argument("--no-migrate", action="store_true", help="leave the database in the original schema")
+    args = parser.parse_args()
+
+    data = SyntheticData(args.flights, args.pilots, args.aircraft, args.airports, args.seed)
+    started = time.perf_counter()
+    if args.db:
+        generate_database(args.db, data, migrate=not args.no_migrate)
+    else:
+        write_csv_folder(args.csv, data)
+    print(f"{data.flights} flights, {data.pilots} pilots, {data.aircraft} aircraft and {data.airports} airports written to "
+          f"{args.db or args.csv} in {time.perf_counter() - started:.1f}s")
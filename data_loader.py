@@ -0,0 +1,317 @@
+import argparse
+import contextlib
+import csv
+import os
+import re
+import sqlite3
+from datetime import datetime
+from functools import lru_cache
+
+from availability import DEFAULT_BLOCK_MINUTES
+from connection import ConnectionFactory, ConnectionUser, DATABASE_PATH
+from flight_dates import TIME_FORMAT, departure_timestamp, normalise_date
+from flight_manager import FLIGHT_STATUSES
+from migrations import run_migrations
+
+DATA_DIR = "Data"
+LOAD_CHUNK_SIZE = 50_000 #rows validated, written and committed at a time, so memory use does not grow with the file
+#Settings used during a load and the migrations after it. With the file read in chunks, the memory SQLite uses is what
+#bounds a load: the page cache (cache_size), plus whatever the memory map and in-memory temp tables reach, which grow
+#with the database. So the map is switched off and the sorts for the index builds go to temporary files.
+LOAD_PRAGMAS = (
+    ("synchronous", "OFF"), #a crash during a load can lose the last chunks, which loading again puts back
+    ("wal_autocheckpoint", 10000), #copy the WAL into the database every 10000 pages (40 MB) instead of every 1000
+    ("mmap_size", 0),
+    ("temp_store", "FILE"),
+)
+MAX_REPORTED_REJECTS = 20 #rejected rows kept with their reasons; the rest are only counted
+
+# Loads the CSV files in Data/ into the database, replacing the pandas code in tables.ipynb.
+#   python data_loader.py [--db flights.db] [--data Data]
+#
+# Each file is read as a stream with the csv module, one chunk at a time. Every row is checked and normalised on the
+# way (IATA codes upper-cased, dates as DD/MM/YYYY, times as HH:MM, IDs and counts as integers) and rows that fail are
+# reported instead of loaded. Tables are loaded parents first, so the foreign keys can be checked as rows go in.
+# Rows are upserted on their primary key, so loading the same files again updates rows rather than duplicating them.
+#
+# If the database is empty, the tables are first created as tables.ipynb created them, and the migrations run after the
+# load (they backfill departure_at, rebuild the tables as STRICT and build the summary and search tables in bulk, which
+# is quicker than keeping them up to date row by row). A database that is already migrated is loaded as it is.
+
+# The schema as first created by tables.ipynb, before any migrations
+BASELINE_SCHEMA = """
+    CREATE TABLE airport (
+        iata_code TEXT PRIMARY KEY,
+        name TEXT NOT NULL,
+        city TEXT NOT NULL,
+        country TEXT NOT NULL
+    );
+    CREATE TABLE aircraft (
+        aircraft_id TEXT PRIMARY KEY,
+        model TEXT NOT NULL,
+        capacity INTEGER NOT NULL,
+        manufacturer TEXT NOT NULL,
+        registration_number TEXT UNIQUE
+    );
+    CREATE TABLE pilot (
+        pilot_id INTEGER PRIMARY KEY,
+        first_name TEXT NOT NULL,
+        last_name TEXT NOT NULL,
+        experience_years INTEGER,
+        date_of_birth TEXT NOT NULL,
+        nationality TEXT,
+        phone_number TEXT,
+        email TEXT NOT NULL,
+        passport_number TEXT NOT NULL,
+        license_number TEXT NOT NULL,
+        first_line_of_address TEXT NOT NULL,
+        town_city TEXT,
+        county TEXT,
+        country TEXT,
+        postcode TEXT NOT NULL,
+        work_eligibility TEXT NOT NULL
+    );
+    CREATE TABLE flight (
+        flight_id INTEGER PRIMARY KEY,
+        origin_id TEXT NOT NULL,
+        destination_id TEXT NOT NULL,
+        aircraft_id TEXT,
+        flight_date TEXT NOT NULL,
+        flight_time TEXT NOT NULL,
+        status TEXT NOT NULL CHECK (status IN ('Scheduled', 'Delayed', 'Cancelled')),
+        FOREIGN KEY (origin_id) REFERENCES airport(iata_code),
+        FOREIGN KEY (destination_id) REFERENCES airport(iata_code),
+        FOREIGN KEY (aircraft_id) REFERENCES aircraft(aircraft_id)
+    );
+    CREATE TABLE flight_pilot (
+        flight_id INTEGER NOT NULL,
+        pilot_id TEXT NOT NULL,
+        PRIMARY KEY (flight_id, pilot_id),
+        FOREIGN KEY (flight_id) REFERENCES flight(flight_id),
+        FOREIGN KEY (pilot_id) REFERENCES pilot(pilot_id)
+    );
+"""
+
+
+# Field checks. Each takes the raw CSV text and returns the value to store, or raises ValueError with the reason.
+def required(value):
+    value = (value or "").strip()
+    if not value:
+        raise ValueError("is required")
+    return value
+
+def optional(value):
+    return (value or "").strip() or None
+
+def integer(value):
+    try:
+        return int(required(value))
+    except ValueError:
+        raise ValueError(f"must be a whole number, not {value!r}") from None
+
+def optional_integer(value):
+    return integer(value) if optional(value) is not None else None
+
+def iata_code(value):
+    value = required(value).upper()
+    if not re.fullmatch(r"[A-Z]{3}", value):
+        raise ValueError(f"must be a 3-letter IATA code, not {value!r}")
+    return value
+
+@lru_cache(maxsize=4096) #a file has far fewer distinct dates and times than rows, and parsing them is the slow part
+def date_value(value):
+    try:
+        return normalise_date(required(value))
+    except ValueError:
+        raise ValueError(f"must be a DD/MM/YYYY date, not {value!r}") from None
+
+@lru_cache(maxsize=4096)
+def time_value(value):
+    try:
+        return datetime.strptime(required(value), TIME_FORMAT).strftime(TIME_FORMAT)
+    except ValueError:
+        raise ValueError(f"must be an HH:MM time, not {value!r}") from None
+
+def status_value(value):
+    value = required(value).capitalize()
+    if value not in FLIGHT_STATUSES:
+        raise ValueError(f"must be one of {', '.join(FLIGHT_STATUSES)}, not {value!r}")
+    return value
+
+def block_minutes(value):
+    minutes = optional_integer(value)
+    if minutes is not None and minutes <= 0:
+        raise ValueError("must be more than 0")
+    return minutes or DEFAULT_BLOCK_MINUTES
+
+OPTIONAL_CHECKS = (optional, optional_integer, block_minutes) #columns that can be left out of a file altogether
+
+# For each table, in the order they are loaded (parents before the tables that refer to them):
+# (CSV file in the data folder, primary key columns, {column: field check}). CSV headers are matched ignoring case.
+TABLE_LOADS = {
+    "airport": ("airport_data.csv", ("iata_code",), {
+        "iata_code": iata_code, "name": required, "city": required, "country": required,
+    }),
+    "aircraft": ("aircraft_data.csv", ("aircraft_id",), {
+        "aircraft_id": integer, "model": required, "capacity": integer, "manufacturer": required, "registration_number": optional,
+    }),
+    "pilot": ("pilot_data.csv", ("pilot_id",), {
+        "pilot_id": integer, "first_name": required, "last_name": required, "experience_years": optional_integer,
+        "date_of_birth": date_value, "nationality": optional, "phone_number": optional, "email": required,
+        "passport_number": required, "license_number": required, "first_line_of_address": required, "town_city": optional,
+        "county": optional, "country": optional, "postcode": required, "work_eligibility": required,
+    }),
+    "flight": ("flight_data.csv", ("flight_id",), {
+        "flight_id": integer, "origin_id": iata_code, "destination_id": iata_code, "aircraft_id": optional_integer,
+        "flight_date": date_value, "flight_time": time_value, "status": status_value, "block_minutes": block_minutes,
+    }),
+    "flight_pilot": ("flightpilot_data.csv", ("flight_id", "pilot_id"), {
+        "flight_id": integer, "pilot_id": integer,
+    }),
+}
+
+
+class LoadResult:
+    def __init__(self, table):
+        self.table = table
+        self.loaded = 0
+        self.rejected = 0
+        self.rejects = [] #(line number, reason) for the first MAX_REPORTED_REJECTS rejected rows
+
+    def reject(self, line, reason):
+        self.rejected += 1
+        if len(self.rejects) < MAX_REPORTED_REJECTS:
+            self.rejects.append((line, reason))
+
+
+class DataLoader(ConnectionUser):
+    def __init__(self, connections, chunk_size=LOAD_CHUNK_SIZE):
+        super().__init__(connections)
+        self.chunk_size = chunk_size
+
+#1. Loads every table whose CSV file is in the folder, creating the tables first if the database is empty, then brings
+#the schema up to date. Returns a LoadResult per table loaded.
+    def load_folder(self, folder=DATA_DIR):
+        created = self.create_baseline_schema()
+        results = []
+        with self.load_pragmas():
+            for table, (file_name, _, _) in TABLE_LOADS.items():
+                path = os.path.join(folder, file_name)
+                if os.path.exists(path):
+                    results.append(self.load_file(table, path))
+
+            if created:
+                print("Building indexes, summary tables and search indexes...")
+            run_migrations(self.conn)
+        self.reference.invalidate()
+        return results
+
+#2. Creates the original tables if the database has none. Returns True if it did.
+    def create_baseline_schema(self):
+        if self.conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'flight'").fetchone():
+            return False
+        self.conn.executescript(BASELINE_SCHEMA)
+        return True
+
+#Switches the connection to the faster load settings (and foreign keys on) for the length of a with block
+    @contextlib.contextmanager
+    def load_pragmas(self):
+        previous = [(pragma, self.conn.execute(f"PRAGMA {pragma}").fetchone()[0]) for pragma, _ in LOAD_PRAGMAS]
+        for pragma, value in LOAD_PRAGMAS + (("foreign_keys", "ON"),):
+            self.conn.execute(f"PRAGMA {pragma} = {value}")
+        try:
+            yield
+        finally:
+            for pragma, value in previous:
+                self.conn.execute(f"PRAGMA {pragma} = {value}")
+
+#3. Streams one CSV file into a table, chunk by chunk, and returns its LoadResult
+    def load_file(self, table, path):
+        _, key_columns, checks = TABLE_LOADS[table]
+        table_columns = [row[1] for row in self.conn.execute(f"PRAGMA table_info({table})")]
+        columns = [column for column in checks if column in table_columns] #block_minutes only exists after migration 5
+        if table == "flight" and "departure_at" in table_columns:
+            columns.append("departure_at") #worked out from the date and time, as migration 1 will not run again
+        upsert = self.upsert_sql(table, columns, key_columns)
+
+        result = LoadResult(table)
+        with open(path, newline="", encoding="utf-8-sig") as csv_file:
+            reader = csv.reader(csv_file)
+            header = {name.strip().lower(): position for position, name in enumerate(next(reader, []))}
+            missing = [column for column, check in checks.items()
+                       if column not in header and column in table_columns and check not in OPTIONAL_CHECKS]
+            if missing:
+                raise ValueError(f"{path} has no {', '.join(missing)} column.")
+
+            chunk = []
+            for line, row in enumerate(reader, start=2):
+                if not row:
+                    continue
+                values = {}
+                try:
+                    for column, check in checks.items():
+                        position = header.get(column)
+                        values[column] = check(row[position] if position is not None and position < len(row) else None)
+                except ValueError as e:
+                    result.reject(line, f"{column} {e}")
+                    continue
+                if "departure_at" in columns:
+                    values["departure_at"] = departure_timestamp(values["flight_date"], values["flight_time"])
+                chunk.append((line, tuple(values[column] for column in columns)))
+
+                if len(chunk) >= self.chunk_size:
+                    self.write_chunk(upsert, chunk, result)
+                    chunk = []
+            if chunk:
+                self.write_chunk(upsert, chunk, result)
+        return result
+
+    def upsert_sql(self, table, columns, key_columns):
+        placeholders = ", ".join("?" for _ in columns)
+        updates = ", ".join(f"{column} = excluded.{column}" for column in columns if column not in key_columns)
+        action = f"DO UPDATE SET {updates}" if updates else "DO NOTHING"
+        return f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders}) ON CONFLICT ({', '.join(key_columns)}) {action}"
+
+#Writes a chunk with one executemany in its own transaction. If any row breaks a constraint (e.g. a flight from an
+#airport that is not loaded), the chunk is rolled back and written again row by row, so only the bad rows are rejected.
+    def write_chunk(self, upsert, chunk, result):
+        try:
+            with self.conn:
+                self.conn.executemany(upsert, [values for _, values in chunk])
+            result.loaded += len(chunk)
+            return
+        except sqlite3.IntegrityError:
+            pass
+
+        with self.conn:
+            self.conn.execute("BEGIN")
+            for line, values in chunk:
+                try:
+                    self.conn.execute("SAVEPOINT load_row")
+                    self.conn.execute(upsert, values)
+                    self.conn.execute("RELEASE load_row")
+                    result.loaded += 1
+                except sqlite3.IntegrityError as e:
+                    self.conn.execute("ROLLBACK TO load_row")
+                    self.conn.execute("RELEASE load_row")
+                    reason = str(e)
+                    if "FOREIGN KEY" in reason:
+                        reason += " (it refers to an airport, aircraft, pilot or flight that is not in the database)"
+                    result.reject(line, reason)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load the CSV files in the data folder into the flight database")
+    parser.add_argument("--db", default=DATABASE_PATH, help="database file (default: flights.db)")
+    parser.add_argument("--data", default=DATA_DIR, help="folder with the CSV files (default: Data)")
+    parser.add_argument("--chunk-size", type=int, default=LOAD_CHUNK_SIZE, help="rows written per transaction")
+    args = parser.parse_args()
+
+    connections = ConnectionFactory(args.db)
+    try:
+        for result in DataLoader(connections, args.chunk_size).load_folder(args.data):
+            print(f"{result.table}: {result.loaded} rows loaded, {result.rejected} rejected")
+            for line, reason in result.rejects:
+                print(f"    line {line}: {reason}")
+    finally:
+        connections.close_all()
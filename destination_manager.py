@@ -1,21 +1,23 @@
 # destination_manager.py
 
 import sqlite3
-from tabulate import tabulate
 
-class DestinationManager:
-    def __init__(self, connection):
-        self.conn = connection
-        self.conn.execute("PRAGMA foreign_keys = ON")
-        self.cursor = self.conn.cursor()
+from connection import ConnectionUser
+from flight_archive import attach_history
+from text_search import SEARCH_CANDIDATES, SEARCH_LIMIT, prefix_query
 
+#flights from or to an airport, archived ones included (see flight_archive.py); its plan is checked by migrations.py
+DESTINATION_FLIGHTS_SQL = """
+    SELECT COUNT(*)
+    FROM all_flight
+    WHERE origin_id = ? OR destination_id = ?
+"""
+
+class DestinationManager(ConnectionUser):
 # 1. View a list of all existing destinations, sorted by city. 
     def view_destination(self):
-        self.cursor.execute("""
-        SELECT name, city, country, iata_code
-        FROM airport
-        ORDER BY country""")
-        destination_rows = self.cursor.fetchall()
+        from tabulate import tabulate
+        destination_rows = self.list_destinations()
 
 #build table to return to user
         if destination_rows:
@@ -46,25 +48,20 @@ class DestinationManager:
                 return
         
         try:
-            self.cursor.execute("""
-                INSERT INTO airport (name, city, country, iata_code)
-                VALUES (?, ?, ?, ?)
-            """, (name, city, country, iata_code))
-            self.conn.commit()
+            self.create_destination(name, city, country, iata_code)
             print(f"\nDestination '{name}' added successfully")
 
 #The user may try to add a new destination, however it may already exist. 
 #If this happens, the user will be told. If other error messages are thrown, the user can return to the Destination menu. 
 
-        except sqlite3.IntegrityError as retry:
-            if 'UNIQUE constraint failed: airport.iata_code' in str(retry):
-                print('\nA destination with that IATA code already exists.\n')
-                input('Press Enter to return to the Destination Menu.')
-                return
-            else:
-                print(f"Database error: {retry}")
-                input('\nPress Enter to return to the Destination Menu.')
-                return
+        except ValueError as retry:
+            print(f'\n{retry}\n')
+            input('Press Enter to return to the Destination Menu.')
+            return
+        except sqlite3.Error as retry:
+            print(f"Database error: {retry}")
+            input('\nPress Enter to return to the Destination Menu.')
+            return
             
 #3. Updating existing Destination by inputting IATA code
     def update_destination(self):
@@ -107,6 +104,7 @@ class DestinationManager:
             WHERE iata_code = ?
             """, (new_name, new_city, new_country, iata_code))
             self.conn.commit()
+            self.reference.invalidate()
             print(f"\nDestination '{iata_code}' updated successfully.")
         except sqlite3.IntegrityError as e:
             print(f'Error: {e}')
@@ -132,12 +130,9 @@ class DestinationManager:
         
 #destinations cannot be deleted if they are used in existing flights. 
 
-#checks the origin and destinations of existing flights.        
-        self.cursor.execute("""
-            SELECT COUNT(*)
-            FROM flight
-            WHERE origin_id = ? OR destination_id = ?
-        """, (iata_code, iata_code))
+#checks the origin and destinations of existing flights, including archived ones.        
+        attach_history(self.conn, self.connections.path)
+        self.cursor.execute(DESTINATION_FLIGHTS_SQL, (iata_code, iata_code))
 
         flight_count = self.cursor.fetchone()[0]
 
@@ -161,6 +156,7 @@ class DestinationManager:
                     WHERE iata_code = ?
                 """, (iata_code,))
             self.conn.commit()
+            self.reference.invalidate()
             print(f"Destination {iata_code} deleted successfully.")
         except sqlite3.IntegrityError:
             print("Error: Cannot delete. The destination is likely used in other records (e.g., flights).")
@@ -169,7 +165,76 @@ class DestinationManager:
             print(f"Database error: {retry}")
             self.conn.rollback()
 
+#5. Search destinations as you type: matches the start of any word in the airport name, city, country or IATA code
+    def search_destination(self):
+        from tabulate import tabulate
+        text = input('Search by airport, city, country or IATA code (e.g. "lon" or "heath"): ').strip()
+        destination_rows = self.search_destinations(text)
+
+        if destination_rows:
+            print(tabulate(destination_rows, headers=['Airport', 'City', 'Country', 'IATA Code'], tablefmt='grid'))
+        else:
+            print('No destinations match your search.')
+        input('\nPress Enter to return to the Destination Menu.')
+
+# Returns the destinations whose words start with every word of text, best match first, as (name, city, country, iata_code)
+# rows. Uses the airport_search full-text index, so it stays quick however many airports there are.
+    def search_destinations(self, text, limit=SEARCH_LIMIT):
+        query = prefix_query(text)
+        if query is None:
+            return []
+        self.cursor.execute("""
+            SELECT airport.name, airport.city, airport.country, airport.iata_code
+            FROM (SELECT iata_code, rank FROM airport_search WHERE airport_search MATCH ? LIMIT ?) AS match
+            JOIN airport ON airport.iata_code = match.iata_code
+            ORDER BY match.rank
+            LIMIT ?
+        """, (query, SEARCH_CANDIDATES, limit))
+        return self.cursor.fetchall()
+
+# Returns every destination as (name, city, country, iata_code) rows, sorted by country
+    def list_destinations(self):
+        self.cursor.execute("""
+        SELECT name, city, country, iata_code
+        FROM airport
+        ORDER BY country""")
+        return self.cursor.fetchall()
+
+# Adds a destination without prompting. Raises ValueError if a field is missing, the IATA code is not 3 letters or it already exists.
+    def create_destination(self, name, city, country, iata_code):
+        iata_code = iata_code.strip().upper()
+        if not (name and city and country and len(iata_code) == 3):
+            raise ValueError('All fields are required, and IATA code must be 3 letters.')
+
+        try:
+            self.cursor.execute("""
+                INSERT INTO airport (name, city, country, iata_code)
+                VALUES (?, ?, ?, ?)
+            """, (name, city, country, iata_code))
+            self.conn.commit()
+            self.reference.invalidate()
+        except sqlite3.IntegrityError as retry:
+            self.conn.rollback()
+            if 'UNIQUE constraint failed: airport.iata_code' in str(retry):
+                raise ValueError('A destination with that IATA code already exists.') from None
+            raise
+
+# Deletes a destination without prompting. Returns False if it does not exist; raises ValueError if flights use it.
+    def remove_destination(self, iata_code):
+        iata_code = iata_code.strip().upper()
+        self.cursor.execute("SELECT 1 FROM airport WHERE iata_code = ?", (iata_code,))
+        if not self.cursor.fetchone():
+            return False
+
+        attach_history(self.conn, self.connections.path) #archived flights count too
+        self.cursor.execute(DESTINATION_FLIGHTS_SQL, (iata_code, iata_code))
+        flight_count = self.cursor.fetchone()[0]
+        if flight_count > 0:
+            raise ValueError(f"The destination is currently used in {flight_count} flights and cannot be deleted")
+
+        self.cursor.execute("DELETE FROM airport WHERE iata_code = ?", (iata_code,))
+        self.conn.commit()
+        self.reference.invalidate()
+        return True
 
-    def close(self):
-            self.conn.close()
         
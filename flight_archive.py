@@ -0,0 +1,238 @@
+import argparse
+import os
+import sqlite3
+import time
+from datetime import date, datetime, timedelta
+
+from connection import BUSY_TIMEOUT_MS, CONNECTION_PRAGMAS, DATABASE_PATH, ConnectionFactory
+from flight_dates import DATE_FORMAT, date_range_bounds
+
+MIN_ARCHIVE_AGE_DAYS = 28 #flights from the last 28 days stay live, as the pilot duty limits count them
+
+# Hot/cold partitioning of the flights. flights.db only keeps the flights that have not departed yet and the recent
+# ones; flights that departed before a cutoff are moved, with their flight_pilot rows, to flights_history.db:
+#   python flight_archive.py --before 01/01/2025 [--db flights.db]
+# The availability and route indexes, searches and bookings then only read the live tables. The history file has the
+# same flight and flight_pilot tables, plus its own flight_daily_status and route_count summaries of the flights it holds.
+# History foreign keys cannot point at another file, so DestinationManager and AircraftManager check all_flight (below)
+# before deleting an airport or aircraft, and flight_snapshot.py exports all_flight, so archived flights stay in it.
+#
+# Reports that cover every flight call attach_history, which attaches the history file as "history" and creates TEMP
+# views over both files: all_flight, all_flight_pilot, all_flight_daily_status and all_route_count. Without a history
+# file the views only read the live tables, so the same queries work either way.
+#
+# The move is one transaction over both files. SQLite commits the files of a transaction one after the other, in
+# the order they were attached, and with WAL it cannot make them atomic as a set. So the archiving connection opens
+# the history file as its main database (committed first, and synced at once) and attaches flights.db. A crash between
+# the two commits can only leave flights in both files, never in neither, and running the job again with the same
+# cutoff finishes the move.
+#
+# Flight IDs are never reused: new flights are numbered from live.flight_sequence (migration 9), which the job moves
+# past the highest archived ID as well. A flight whose ID is already in the history file is only treated as a copy left
+# by an interrupted run if every column matches; otherwise the job stops with an error rather than lose either flight.
+
+# The flight columns, in the same order in both files
+FLIGHT_COLUMNS = "flight_id, origin_id, destination_id, aircraft_id, flight_date, flight_time, status, departure_at, block_minutes"
+
+HISTORY_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS flight (
+        flight_id INTEGER PRIMARY KEY,
+        origin_id TEXT NOT NULL,
+        destination_id TEXT NOT NULL,
+        aircraft_id INTEGER,
+        flight_date TEXT NOT NULL,
+        flight_time TEXT NOT NULL,
+        status TEXT NOT NULL CHECK (status IN ('Scheduled', 'Delayed', 'Cancelled')),
+        departure_at TEXT,
+        block_minutes INTEGER NOT NULL CHECK (block_minutes > 0)
+    ) STRICT
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS flight_pilot (
+        flight_id INTEGER NOT NULL,
+        pilot_id INTEGER NOT NULL,
+        PRIMARY KEY (flight_id, pilot_id)
+    ) STRICT, WITHOUT ROWID
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS flight_daily_status (
+        flight_day TEXT NOT NULL,
+        status TEXT NOT NULL,
+        flight_count INTEGER NOT NULL,
+        PRIMARY KEY (flight_day, status)
+    ) STRICT, WITHOUT ROWID
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS route_count (
+        origin_id TEXT NOT NULL,
+        destination_id TEXT NOT NULL,
+        flight_count INTEGER NOT NULL,
+        PRIMARY KEY (origin_id, destination_id)
+    ) STRICT, WITHOUT ROWID
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_flight_departure_at ON flight (departure_at)",
+    "CREATE INDEX IF NOT EXISTS idx_flight_pilot_pilot ON flight_pilot (pilot_id, flight_id)",
+    #for the checks that stop an airport or aircraft with archived flights being deleted
+    "CREATE INDEX IF NOT EXISTS idx_flight_origin ON flight (origin_id)",
+    "CREATE INDEX IF NOT EXISTS idx_flight_destination ON flight (destination_id)",
+    "CREATE INDEX IF NOT EXISTS idx_flight_aircraft ON flight (aircraft_id)",
+)
+
+# For each union view: (table, columns read from each file, key columns its counts are added up by, or None)
+HISTORY_VIEWS = {
+    "all_flight": ("flight", FLIGHT_COLUMNS, None),
+    "all_flight_pilot": ("flight_pilot", "flight_id, pilot_id", None),
+    "all_flight_daily_status": ("flight_daily_status", "flight_day, status, flight_count", "flight_day, status"),
+    "all_route_count": ("route_count", "origin_id, destination_id, flight_count", "origin_id, destination_id"),
+}
+
+
+#1. Returns the history file that goes with a database, e.g. flights_history.db for flights.db
+def history_path(db_path=DATABASE_PATH):
+    base, extension = os.path.splitext(db_path)
+    return f"{base}_history{extension or '.db'}"
+
+
+#2. Moves every flight that departed before a DD/MM/YYYY date, with its pilots, from db_path into the history file, and
+#adds them to the history summaries, in one transaction. Only flights that are in the history file once it commits are
+#deleted from db_path. Returns (flights moved, flight_pilot rows moved). Raises ValueError if the date is less than
+#MIN_ARCHIVE_AGE_DAYS ago, or if a flight's ID is already in the history file with different details.
+def archive_flights(db_path=DATABASE_PATH, before_date=None, history=None):
+    if datetime.strptime(before_date, DATE_FORMAT).date() > date.today() - timedelta(days=MIN_ARCHIVE_AGE_DAYS):
+        raise ValueError(f"Only flights more than {MIN_ARCHIVE_AGE_DAYS} days old can be archived.")
+    cutoff = date_range_bounds(before_date, before_date)[0]
+
+    conn = sqlite3.connect(history or history_path(db_path), timeout=BUSY_TIMEOUT_MS / 1000)
+    try:
+        conn.execute("PRAGMA journal_mode = WAL")
+        for pragma, value in CONNECTION_PRAGMAS:
+            conn.execute(f"PRAGMA {pragma} = {value}")
+        conn.execute("PRAGMA synchronous = FULL") #the history commit must be on disk before flights.db's commit starts
+        for sql in HISTORY_SCHEMA:
+            conn.execute(sql)
+        conn.commit()
+        conn.execute("ATTACH DATABASE ? AS live", (db_path,))
+        conn.execute("PRAGMA live.cache_size = -64000")
+
+        cursor = conn.cursor()
+        try:
+            cursor.execute("BEGIN IMMEDIATE") #takes the write lock on both files
+            cursor.execute("DROP TABLE IF EXISTS temp.archived")
+            cursor.execute("""
+                CREATE TEMP TABLE archived AS
+                SELECT flight_id FROM live.flight
+                WHERE departure_at < ?
+            """, (cutoff,))
+            #an archived flight with the same ID must have the same columns and pilots, or it is a different flight
+            differs = " OR ".join(f"history.{column} IS NOT flight.{column}" for column in FLIGHT_COLUMNS.split(", ")[1:])
+            cursor.execute(f"""
+                SELECT flight.flight_id FROM live.flight AS flight
+                JOIN main.flight AS history ON history.flight_id = flight.flight_id
+                WHERE flight.flight_id IN (SELECT flight_id FROM temp.archived) AND (
+                    {differs}
+                    OR EXISTS (SELECT 1 FROM main.flight_pilot AS pilots
+                               WHERE pilots.flight_id = flight.flight_id AND NOT EXISTS (
+                                   SELECT 1 FROM live.flight_pilot
+                                   WHERE flight_pilot.flight_id = pilots.flight_id AND flight_pilot.pilot_id = pilots.pilot_id))
+                    OR EXISTS (SELECT 1 FROM live.flight_pilot AS pilots
+                               WHERE pilots.flight_id = flight.flight_id AND NOT EXISTS (
+                                   SELECT 1 FROM main.flight_pilot
+                                   WHERE flight_pilot.flight_id = pilots.flight_id AND flight_pilot.pilot_id = pilots.pilot_id))
+                )
+                ORDER BY flight.flight_id
+                LIMIT 5
+            """)
+            clashes = [row[0] for row in cursor.fetchall()]
+            if clashes:
+                raise ValueError(f"Flight IDs {', '.join(map(str, clashes))} are already in the history file as different "
+                                 "flights. Nothing was archived.")
+            #flights already copied by a run that stopped between the two commits are not counted or copied twice
+            new_flights = """
+                FROM live.flight
+                WHERE flight_id IN (SELECT flight_id FROM temp.archived) AND flight_id NOT IN (SELECT flight_id FROM main.flight)
+            """
+            cursor.execute(f"""
+                INSERT INTO main.flight_daily_status (flight_day, status, flight_count)
+                SELECT substr(departure_at, 1, 10), status, COUNT(*) {new_flights} GROUP BY 1, 2
+                ON CONFLICT (flight_day, status) DO UPDATE SET flight_count = flight_count + excluded.flight_count
+            """)
+            cursor.execute(f"""
+                INSERT INTO main.route_count (origin_id, destination_id, flight_count)
+                SELECT origin_id, destination_id, COUNT(*) {new_flights} GROUP BY 1, 2
+                ON CONFLICT (origin_id, destination_id) DO UPDATE SET flight_count = flight_count + excluded.flight_count
+            """)
+            cursor.execute(f"INSERT INTO main.flight ({FLIGHT_COLUMNS}) SELECT {FLIGHT_COLUMNS} {new_flights}")
+            cursor.execute("""
+                INSERT OR IGNORE INTO main.flight_pilot (flight_id, pilot_id)
+                SELECT flight_id, pilot_id FROM live.flight_pilot
+                WHERE flight_id IN (SELECT flight_id FROM temp.archived)
+            """)
+            pilot_rows = cursor.rowcount
+
+            #only what the history file now holds is deleted from the live tables
+            cursor.execute("""
+                DELETE FROM live.flight_pilot
+                WHERE flight_id IN (SELECT flight_id FROM temp.archived)
+                  AND EXISTS (SELECT 1 FROM main.flight_pilot AS history
+                              WHERE history.flight_id = flight_pilot.flight_id AND history.pilot_id = flight_pilot.pilot_id)
+            """)
+            cursor.execute("""
+                DELETE FROM live.flight
+                WHERE flight_id IN (SELECT flight_id FROM temp.archived)
+                  AND EXISTS (SELECT 1 FROM main.flight AS history WHERE history.flight_id = flight.flight_id)
+                  AND NOT EXISTS (SELECT 1 FROM live.flight_pilot WHERE flight_pilot.flight_id = flight.flight_id)
+            """) #the live summaries' triggers take them off
+            flights = cursor.rowcount
+            cursor.execute("""
+                UPDATE live.flight_sequence
+                SET last_flight_id = MAX(last_flight_id, (SELECT COALESCE(MAX(flight_id), 0) FROM main.flight))
+            """)
+            cursor.execute("DROP TABLE temp.archived")
+            conn.commit()
+        except (sqlite3.Error, ValueError):
+            conn.rollback()
+            raise
+    finally:
+        conn.close()
+    return flights, pilot_rows
+
+
+#3. Attaches the history file of db_path to a connection, if there is one, and (re)creates the TEMP union views over
+#the live tables and the history. Cheap to call before every report: nothing changes unless the history file has
+#appeared since the views were made. Call it outside a transaction, as ATTACH cannot run inside one.
+def attach_history(connection, db_path=DATABASE_PATH):
+    attached = any(row[1] == "history" for row in connection.execute("PRAGMA database_list"))
+    path = history_path(db_path)
+    if not attached and os.path.exists(path):
+        connection.execute("ATTACH DATABASE ? AS history", (path,))
+        attached = True
+
+    views = dict(connection.execute("SELECT name, sql FROM temp.sqlite_master WHERE type = 'view'").fetchall())
+    schemas = ("main", "history") if attached else ("main",)
+    for view, (table, columns, keys) in HISTORY_VIEWS.items():
+        if view in views and ("history." in views[view]) == attached:
+            continue
+        tables = " UNION ALL ".join(f"SELECT {columns} FROM {schema}.{table}" for schema in schemas)
+        if keys:
+            tables = f"SELECT {keys}, SUM(flight_count) AS flight_count FROM ({tables}) GROUP BY {keys}"
+        connection.execute(f"DROP VIEW IF EXISTS temp.{view}")
+        connection.execute(f"CREATE TEMP VIEW {view} AS {tables}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Move flights that departed before a date into the history database")
+    parser.add_argument("--before", required=True, help="archive flights departing before this date (DD/MM/YYYY)")
+    parser.add_argument("--db", default=DATABASE_PATH, help="database file (default: flights.db)")
+    parser.add_argument("--history", help="history file (default: the database name with _history added)")
+    args = parser.parse_args()
+
+    from migrations import run_migrations
+    connections = ConnectionFactory(args.db)
+    run_migrations(connections.get()) #the history tables have the current flight columns
+    connections.close_all()
+
+    started = time.perf_counter()
+    flights, pilot_rows = archive_flights(args.db, args.before, args.history)
+    print(f"{flights} flights and {pilot_rows} pilot assignments moved to {args.history or history_path(args.db)} "
+          f"in {time.perf_counter() - started:.1f}s")
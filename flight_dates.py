@@ -0,0 +1,32 @@
+from datetime import datetime, timedelta
+
+# Flight dates are entered and shown as DD/MM/YYYY with a 24h HH:MM time.
+# The flight.departure_at column stores the same moment as 'YYYY-MM-DD HH:MM' so that it sorts by calendar order.
+DATE_FORMAT = "%d/%m/%Y"
+TIME_FORMAT = "%H:%M"
+DEPARTURE_FORMAT = "%Y-%m-%d %H:%M"
+
+#1. Returns the date in the stored DD/MM/YYYY format (e.g. 1/7/2025 becomes 01/07/2025). Raises ValueError if invalid.
+def normalise_date(flight_date):
+    return datetime.strptime(flight_date, DATE_FORMAT).strftime(DATE_FORMAT)
+
+#2. Returns the sortable departure timestamp for a flight date and time. Raises ValueError if either is invalid.
+def departure_timestamp(flight_date, flight_time):
+    departure = datetime.strptime(f"{flight_date} {flight_time}", f"{DATE_FORMAT} {TIME_FORMAT}")
+    return departure.strftime(DEPARTURE_FORMAT)
+
+#3. Returns the departure_at bounds [start, end) that cover every day from start_date to end_date inclusive
+def date_range_bounds(start_date, end_date):
+    start = datetime.strptime(start_date, DATE_FORMAT)
+    end = datetime.strptime(end_date, DATE_FORMAT) + timedelta(days=1)
+    return start.strftime(DEPARTURE_FORMAT), end.strftime(DEPARTURE_FORMAT)
+
+#4. Returns a departure timestamp as whole minutes since 1970-01-01 00:00, for working out the time between flights.
+#departure_at always comes from the database or departure_timestamp, so it is read with fromisoformat, which is
+#many times quicker than strptime when the indexes take in thousands of flights at once.
+def departure_minutes(departure_at):
+    return (datetime.fromisoformat(departure_at) - datetime(1970, 1, 1)) // timedelta(minutes=1)
+
+#5. Returns the departure timestamp for a number of minutes since 1970-01-01 00:00 (the reverse of departure_minutes)
+def minutes_departure(minutes):
+    return (datetime(1970, 1, 1) + timedelta(minutes=minutes)).strftime(DEPARTURE_FORMAT)
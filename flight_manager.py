@@ -1,57 +1,160 @@
+import csv
+import json
 import sqlite3
-from tabulate import tabulate
-from datetime import datetime
 
-class FlightManager:
-    def __init__(self, connection):
-        self.conn = connection
-        self.conn.execute("PRAGMA foreign_keys = ON")
-        self.cursor = self.conn.cursor()
+from availability import AvailabilityIndex, DEFAULT_BLOCK_MINUTES, MIN_AIRCRAFT_TURNAROUND_MINUTES, MIN_PILOT_REST_MINUTES
+from connection import ConnectionUser
+from flight_dates import departure_minutes, departure_timestamp, date_range_bounds, normalise_date
+from reference_data import record_id
+from route_network import MAX_ITINERARY_LEGS, MIN_CONNECTION_MINUTES, SEARCH_WINDOW_HOURS, RouteIndex
+
+FLIGHT_STATUSES = ("Scheduled", "Delayed", "Cancelled") #the values allowed by the CHECK constraint on flight.status
+FLIGHT_PAGE_SIZE = 20 #number of flights shown on each page of the flight records
+EXPORT_BATCH_SIZE = 1000 #number of rows read from the database at a time when exporting
+
+# Flight record columns, with the user-friendly titles used as table headings
+FLIGHT_COLUMNS = {
+    "flight.flight_id": "Flight ID",
+    "flight.origin_id": "Origin Airport",
+    "flight.destination_id": "Destination Airport",
+    "flight.aircraft_id": "Aircraft ID",
+    "flight.flight_date": "Date",
+    "flight.flight_time": "Time",
+    "flight.status": "Status",
+    "pilot.pilot_id": "Pilot ID",
+    "pilot.first_name": "Pilot First Name",
+    "pilot.last_name": "Pilot Last Name"
+}
+
+# The filtered flight queries the screens and APIs run most. Their query plans are checked by migrations.hot_queries,
+# so they are kept here rather than written inline. {conditions} comes from flight_conditions.
+FLIGHT_SEARCH_SQL = """
+    SELECT flight_id, origin_id, destination_id, flight_date, flight_time, status
+    FROM flight
+    WHERE {conditions}
+    ORDER BY departure_at, flight_id
+"""
+FLIGHTS_BY_STATUS_SQL = """
+    SELECT flight_id, origin_id, destination_id, flight_date, flight_time, status
+    FROM flight
+    WHERE status = ?
+    ORDER BY departure_at
+"""
+DAY_PILOTS_SQL = """
+    SELECT flight.flight_id, flight_pilot.pilot_id, flight.flight_time
+    FROM flight_pilot
+    JOIN flight ON flight_pilot.flight_id = flight.flight_id
+    WHERE flight.flight_date = ?
+"""
+#the pilots are a correlated subquery: GROUP BY flight_id made SQLite walk the whole table in flight_id order
+PERIOD_FLIGHTS_SQL = """
+    SELECT flight.flight_id, flight.origin_id, flight.destination_id, flight.departure_at, flight.block_minutes, flight.aircraft_id,
+        (SELECT group_concat(flight_pilot.pilot_id) FROM flight_pilot WHERE flight_pilot.flight_id = flight.flight_id)
+    FROM flight
+    WHERE flight.departure_at >= ? AND flight.departure_at < ? AND flight.status != 'Cancelled'
+    ORDER BY flight.departure_at, flight.flight_id
+"""
+FLIGHT_PILOTS_SQL = """
+    SELECT flight_pilot.flight_id, flight_pilot.pilot_id
+    FROM flight
+    JOIN flight_pilot ON flight.flight_id = flight_pilot.flight_id
+    WHERE {conditions}
+"""
+
+
+#Returns (conditions, params) matching the flights departing from range_start up to range_end, optionally only those
+#with a status, from or to an airport, flown by an aircraft, or not cancelled
+def flight_conditions(range_start, range_end, status=None, airport=None, aircraft_id=None, not_cancelled=False):
+    conditions = ["departure_at >= ?", "departure_at < ?"]
+    params = [range_start, range_end]
+    if not_cancelled:
+        conditions.append("status != 'Cancelled'")
+    if status:
+        conditions.append("status = ?")
+        params.append(status)
+    if airport:
+        conditions.append("(origin_id = ? OR destination_id = ?)")
+        params.extend([airport, airport])
+    if aircraft_id is not None:
+        conditions.append("aircraft_id = ?")
+        params.append(aircraft_id)
+    return " AND ".join(conditions), params
+
+
+class FlightManager(ConnectionUser):
+    def __init__(self, connections):
+        super().__init__(connections)
+        self.availability = AvailabilityIndex(connections) #which pilots and aircraft are busy on each date
+        self.routes = RouteIndex(connections) #departures by airport, for itinerary searches
 
 
 #1. Allows the user to view flight by flight ID
     def search_by_flight_id(self):
+        from tabulate import tabulate
         flight_id = input("Enter Flight ID: ").strip()
-        self.cursor.execute("""
-            SELECT flight_id, origin_id, destination_id, flight_date, flight_time, status
-            FROM flight WHERE flight_id = ?
-        """, (flight_id,))
-        result = self.cursor.fetchone()
+        result = self.get_flight(flight_id)
         if result:
             print("\nFlight Found:")
             print(tabulate([result], headers=["ID", "Origin", "Destination", "Date", "Time", "Status"], tablefmt="pretty"))
         else:
             print("No flight found with that ID.")
 
-#2. Allows the user to view flights by date
+# Returns one flight as (flight_id, origin, destination, date, time, status), or None if there is no such flight
+    def get_flight(self, flight_id):
+        self.cursor.execute("""
+            SELECT flight_id, origin_id, destination_id, flight_date, flight_time, status
+            FROM flight WHERE flight_id = ?
+        """, (flight_id,))
+        return self.cursor.fetchone()
+
+#2. Allows the user to view flights departing over a range of dates, optionally filtered by status and airport
     def search_by_date(self):
-        search_date = input("Enter flight start date for the period you wish to view (DD/MM/YYYY): ").strip()
+        from tabulate import tabulate
+        start_date = input("Enter flight start date for the period you wish to view (DD/MM/YYYY): ").strip()
+        end_date = input("Enter flight end date for the period (DD/MM/YYYY) or press Enter for a single day: ").strip() or start_date
 
-#check that the date is in the correct format. 
+#check that the dates are in the correct format. 
         try:
-            datetime.strptime(search_date, "%d/%m/%Y")
+            start_date = normalise_date(start_date)
+            end_date = normalise_date(end_date)
         except ValueError:
             print("Invalid date format. Please enter as DD/MM/YYYY.")
             return
-                
-#find flights with that date and order the table by flight_id. 
-        self.cursor.execute("""
-            SELECT flight_id, origin_id, destination_id, flight_date, flight_time, status
-            FROM flight
-            WHERE flight_date = ?
-            ORDER BY flight_time
-            """, (search_date,))
-        
-#create a table with the flights on the provided date.         
-        results = self.cursor.fetchall()
+
+        status_options = {
+        "1": "Scheduled",
+        "2": "Delayed",
+        "3": "Cancelled"
+        }
+        status_choice = input("Filter by status? 1. Scheduled / 2. Delayed / 3. Cancelled (or press Enter for all): ").strip()
+        if status_choice and status_choice not in status_options:
+            print("Invalid status choice. Please enter 1, 2, or 3.")
+            return
+        status = status_options.get(status_choice)
+
+        airport = input("Filter by origin or destination IATA code (or press Enter for all): ").strip().upper() or None
+
+        results = self.find_flights(start_date, end_date, status, airport)
+
+#create a table with the flights in the provided period.         
         if results:
-            print(f"\nFlights on {search_date}:")
+            period = start_date if start_date == end_date else f"{start_date} to {end_date}"
+            print(f"\nFlights on {period}:")
             print(tabulate(results, headers=["ID", "Origin", "Destination", "Date", "Time", "Status"], tablefmt="pretty"))
         else:
-            print("No flights found on that date.")
+            print("No flights found in that period.")
+
+# Returns the flights departing between two DD/MM/YYYY dates (inclusive) in departure order. 
+# The range is matched on the indexed departure_at column, so only the flights in the period are read.
+    def find_flights(self, start_date, end_date, status=None, airport=None):
+        range_start, range_end = date_range_bounds(start_date, end_date)
+        conditions, params = flight_conditions(range_start, range_end, status=status, airport=airport)
+        self.cursor.execute(FLIGHT_SEARCH_SQL.format(conditions=conditions), params)
+        return self.cursor.fetchall()
 
 #3. Allows the user to view flights by status
     def search_by_status(self):
+        from tabulate import tabulate
 
         status_options = {
         "1": "Scheduled",
@@ -72,12 +175,7 @@ class FlightManager:
 
         selected_status = status_options[choice]
 
-        self.cursor.execute("""
-            SELECT flight_id, origin_id, destination_id, flight_date, flight_time, status
-            FROM flight
-                WHERE status = ?
-                ORDER BY flight_date, flight_time
-        """, (selected_status,))
+        self.cursor.execute(FLIGHTS_BY_STATUS_SQL, (selected_status,))
 
         results = self.cursor.fetchall()
         if results:
@@ -87,21 +185,11 @@ class FlightManager:
             print(f"No flights found with status '{selected_status}'.")
 
 
-#4. Lists all flights, allowing user to filter by column heading. This includes flight information and pilot information. 
+#4. Lists all flights a page at a time, allowing user to filter by column heading. This includes flight information and pilot information. 
     def view_flights(self):
+        from tabulate import tabulate
 # Rename all column headings into user-friendly titles 
-        column_map = {
-            "flight.flight_id": "Flight ID",
-            "flight.origin_id": "Origin Airport",
-            "flight.destination_id": "Destination Airport",
-            "flight.aircraft_id": "Aircraft ID",
-            "flight.flight_date": "Date",
-            "flight.flight_time": "Time",
-            "flight.status": "Status",
-            "pilot.pilot_id": "Pilot ID",
-            "pilot.first_name": "Pilot First Name",
-            "pilot.last_name": "Pilot Last Name"        
-        }
+        column_map = FLIGHT_COLUMNS
 
         all_columns = list(column_map.keys()) #stores the actual database column names (i.e. the keys)
         display_names = list(column_map.values()) #stores the names to be displayed (i.e. the values)
@@ -133,55 +221,80 @@ class FlightManager:
             selected_columns = all_columns #if the user presses enter, show all actual database columns names
             selected_labels = display_names # show all user-friendly column labels 
 
-# Build the SQL query with aliases for user-friendly headers
-        select_clause = ", ".join(f"{col} AS '{column_map[col]}'" for col in selected_columns) #maps each database column 
-
-#This creates the final SQL statement tha will be eventually used. 
-        view_query = f"""
-            SELECT {select_clause} 
-            FROM flight
-            LEFT JOIN flight_pilot ON flight.flight_id = flight_pilot.flight_id
-            LEFT JOIN pilot ON flight_pilot.pilot_id = pilot.pilot_id
-        """
-
+# Show the flights one page at a time. Each page starts from the departure time and flight ID where the last one ended,
+# so only the flights on the page are read, however many flights there are.
         try:
-            self.cursor.execute(view_query) #executes query 
-            matching_records = self.cursor.fetchall() #retrieves the matching records from teh query 
+            page, first_key, last_key = self.fetch_flight_page(selected_columns)
+            if not page:
+                print("No flight records found.")
+                return
 
-            if matching_records:
+            while True:
             #displays results in a grid with user-friendly headers
                 print("\n--- Flight Information ---")
-                print(tabulate(matching_records, headers=selected_labels, tablefmt="grid"))
+                print(tabulate(page, headers=selected_labels, tablefmt="grid"))
 
-            else:
-                print("No flight records found.")
+                move = input("\nEnter N for the next page, P for the previous page, or press Enter to return: ").strip().upper()
+                if move == "N":
+                    new_page = self.fetch_flight_page(selected_columns, after=last_key)
+                elif move == "P":
+                    new_page = self.fetch_flight_page(selected_columns, before=first_key)
+                else:
+                    break
+
+                if new_page[0]:
+                    page, first_key, last_key = new_page
+                else:
+                    print("There are no more flights in that direction.")
         except sqlite3.Error as e:
             print(f"Unable to fetch flight data. Please try again.: {e}") #if there is a n invalid query, this error message is shown.            
 
+# Returns one page of flight records for the given columns, as (rows, first key, last key). 
+# A key is the (departure_at, flight_id) of a flight; pass after= the last key for the next page or before= the first key for the previous one.
+    def fetch_flight_page(self, columns, after=None, before=None, page_size=FLIGHT_PAGE_SIZE):
+        select_clause = ", ".join(f"{col} AS '{FLIGHT_COLUMNS[col]}'" for col in columns) #maps each database column 
+
+        if after:
+            page_filter, page_order, params = "WHERE (departure_at, flight_id) > (?, ?)", "ASC", [*after, page_size]
+        elif before:
+            page_filter, page_order, params = "WHERE (departure_at, flight_id) < (?, ?)", "DESC", [*before, page_size]
+        else:
+            page_filter, page_order, params = "", "ASC", [page_size]
+
+#The page of flights is chosen first so that a flight with several pilots is never split across two pages
+        self.cursor.execute(f"""
+            SELECT {select_clause}, flight.departure_at, flight.flight_id
+            FROM (
+                SELECT * FROM flight
+                {page_filter}
+                ORDER BY departure_at {page_order}, flight_id {page_order}
+                LIMIT ?
+            ) AS flight
+            LEFT JOIN flight_pilot ON flight.flight_id = flight_pilot.flight_id
+            LEFT JOIN pilot ON flight_pilot.pilot_id = pilot.pilot_id
+            ORDER BY flight.departure_at, flight.flight_id
+        """, params)
+        rows = self.cursor.fetchall()
+        if not rows:
+            return [], None, None
+
+        return [row[:-2] for row in rows], tuple(rows[0][-2:]), tuple(rows[-1][-2:])
+
 
 #5. Adds new flight
     def add_new_flight(self):
+        from tabulate import tabulate
         print("\n=== Add New Flight ===")
 
  # Get and validate origin airport
         origin_id = input("Enter origin IATA code: ").upper()
-        self.cursor.execute("""
-            SELECT name 
-            FROM Airport
-                WHERE iata_code = ?
-        """, (origin_id,))
-        if not self.cursor.fetchone():
+        if not self.reference.airport(origin_id):
             print("Origin IATA code not found in records.")
             return
 
         # Get and validate destination airport
         destination_id = input("Enter destination IATA code: ").upper()
-        self.cursor.execute("""
-            SELECT name 
-            FROM airport 
-                WHERE iata_code = ?
-        """, (destination_id,))
-        if not self.cursor.fetchone():
+        if not self.reference.airport(destination_id):
             print("Destination IATA code not found in records.")
             return
 
@@ -189,11 +302,19 @@ class FlightManager:
         date_input = input("Enter departure date (DD/MM/YYYY): ")
         flight_time = input("Enter departure time (HH:MM in 24h format): ")
         try:
-            datetime.strptime(date_input, "%d/%m/%Y")  # checks the date is formatted correctly 
-            datetime.strptime(flight_time, "%H:%M")  #checks the time is formatted correctly 
+            date_input = normalise_date(date_input)  # checks the date is formatted correctly and stores it as DD/MM/YYYY
+            departure_at = departure_timestamp(date_input, flight_time)  #checks the time is formatted correctly 
         except ValueError:
             print("Invalid date/time format.")
             return
+        flight_time = departure_at[11:] #stored as HH:MM, e.g. 9:00 becomes 09:00, so it always matches departure_at
+
+# Get the block time, which is used to check that the pilot and aircraft are not needed elsewhere at the same time
+        block_minutes = input(f"Enter block time in minutes (or press Enter for {DEFAULT_BLOCK_MINUTES}): ").strip() or str(DEFAULT_BLOCK_MINUTES)
+        if not block_minutes.isdigit() or int(block_minutes) == 0:
+            print("Invalid block time. Please enter a whole number of minutes.")
+            return
+        block_minutes = int(block_minutes)
 
 # Get flight status
         status_options = {
@@ -221,12 +342,7 @@ class FlightManager:
  # This code identifies any pilots with flights on the date requested. These pilots are removed from the list.    
  # This first lists the pilots who currently have flights on the date provided by the user.     
 
-            self.cursor.execute("""
-                SELECT flight.flight_id, flight_pilot.pilot_id, flight.flight_time
-                FROM flight_pilot
-                JOIN flight ON flight_pilot.flight_id = flight.flight_id
-                WHERE flight.flight_date = ?
-                """, (date_input,))
+            self.cursor.execute(DAY_PILOTS_SQL, (date_input,))
 
             day_flights = self.cursor.fetchall()
             print("Flights found on that day:")
@@ -236,19 +352,9 @@ class FlightManager:
             else:
                 print("There are no flights currently scheduled on this date.")
 
-# Secondly a list shows the pilots are available for the flight on this date.
-            self.cursor.execute("""
-                SELECT pilot_id, first_name, last_name
-                FROM pilot
-                WHERE pilot_id NOT IN (
-                    SELECT pilot_id
-                    FROM flight_pilot
-                    JOIN flight ON flight_pilot.flight_id = flight.flight_id
-                     WHERE flight.flight_date  = ?          
-                )
-                """, (date_input,))
-
-            pilots = self.cursor.fetchall()
+# Secondly a list shows the pilots who are available for this flight: not flying, and rested, at the departure time.
+            busy_pilots = self.availability.busy_pilots(departure_at, block_minutes)
+            pilots = [(pilot_id, *names) for pilot_id, names in self.reference.current().pilots.items() if str(pilot_id) not in busy_pilots]
             if pilots:
                 print("\nAvailable Pilots:")
                 print(tabulate(pilots, headers=["Pilot ID", "First Name", "Last Name"], tablefmt="pretty"))
@@ -258,29 +364,29 @@ class FlightManager:
             
                # Get pilot ID. Always ask for the pilot_id, regardless of whether the user views the list or not. 
         pilot_id = input("Enter  pilot ID to assign to flight: ").strip()
-        self.cursor.execute("SELECT first_name, last_name FROM Pilot WHERE pilot_id = ?", (pilot_id,))
-        pilot = self.cursor.fetchone()
+        pilot = self.reference.pilot(pilot_id)
         if not pilot:
             print("Pilot ID not found in records.")
             return
+
+        conflict = self.availability.pilot_conflict(pilot_id, departure_at, block_minutes)
+        if conflict is not None:
+            print(f"This pilot is assigned to flight {conflict}, which overlaps this flight or leaves less than {MIN_PILOT_REST_MINUTES} minutes rest.")
+            return
         
 # Get aircraft ID
 #reqeust ID from the user. If it doesn't match an aircraft_id in the aircraft table, error message is returned. The User is asked to select a validated aircraft_ID from a list. 
         print("\n--- Available Aircraft ---")       
 
-# Create a list of available aircraft for the user to choose from on the given date. If no aircraft are available, the user will be notified. Assumption:oOne flight per aircraft is available per day. 
-        self.cursor.execute("""
-            SELECT aircraft_id, registration_number, capacity, model
-            FROM aircraft 
-            WHERE aircraft_id NOT IN (
-                SELECT aircraft_id
-                FROM flight
-                WHERE flight_date  = ?          
-                )
-            """, (date_input,)) 
-        available_plane = self.cursor.fetchall()
+# Create a list of available aircraft for the user to choose from at the departure time. If no aircraft are available, the user will be notified. 
+# An aircraft can fly several flights a day, as long as it has the turnaround time between them.
+        busy_aircraft = self.availability.busy_aircraft(departure_at, block_minutes)
+        available_plane = [(aircraft_id, registration_number, capacity, model)
+                           for aircraft_id, (model, capacity, _, registration_number) in self.reference.current().aircraft.items()
+                           if str(aircraft_id) not in busy_aircraft]
+        available_ids = {str(plane[0]) for plane in available_plane} #the retry loop below checks against this set
 
-# It may be that all aircraft are allocated to flights on the date provided. This catches them.
+# It may be that all aircraft are allocated to flights at the time provided. This catches them.
         if not available_plane:
             print("Either all aircraft are being used, or your selected aircraft is being used for another flight on this day. Please make another selection")
             input("Press enter to return to the menu")
@@ -294,17 +400,7 @@ class FlightManager:
         while True:
             try:
                 selected_id = int(input("Enter the Aircraft ID you want to use: ").strip())
-                self.cursor.execute("""
-                    SELECT aircraft_id 
-                    FROM aircraft 
-                    WHERE aircraft_id = ?
-                        AND aircraft_id NOT IN(
-                            SELECT aircraft_id
-                            FROM flight
-                            WHERE flight_date = ?
-                                    )
-                """, (selected_id, date_input))
-                if self.cursor.fetchone():
+                if str(selected_id) in available_ids:
                     aircraft_id = selected_id
                     break
                 else:
@@ -320,9 +416,9 @@ class FlightManager:
         try:
         # inserts new flight information into flight table
             self.cursor.execute("""
-                INSERT INTO flight (origin_id, destination_id, aircraft_id, flight_date, flight_time, status) 
-                VALUES (?, ?, ?, ?, ?, ?)
-            """, (origin_id, destination_id, aircraft_id, date_input, flight_time, status)) 
+                INSERT INTO flight (flight_id, origin_id, destination_id, aircraft_id, flight_date, flight_time, departure_at, block_minutes, status) 
+                VALUES ((SELECT last_flight_id + 1 FROM flight_sequence), ?, ?, ?, ?, ?, ?, ?, ?)
+            """, (origin_id, destination_id, aircraft_id, date_input, flight_time, departure_at, block_minutes, status)) 
             flight_id = self.cursor.lastrowid
 
 # inserts pilot infromation into pilot table
@@ -333,8 +429,10 @@ class FlightManager:
             """, (flight_id, pilot_id))
 
             self.conn.commit()
+            self.availability.record_flight(flight_id, departure_at, block_minutes, aircraft_id, [pilot_id], status)
+            self.routes.record_flight(flight_id, origin_id, destination_id, departure_at, block_minutes, status)
             print(f"\nFlight {flight_id} added with pilot {pilot_id} ({pilot[0]} {pilot[1]}).")
-            print(" Reminder: If this flight leaves Heathrow, please add the return flight now as we do not want pilots stranded overseas. Please ensure that the pilot has a sufficient break before the return flight. ")
+            print(f" Reminder: If this flight leaves Heathrow, please add the return flight now as we do not want pilots stranded overseas. The pilot needs at least {MIN_PILOT_REST_MINUTES} minutes rest after landing before the return flight. ")
             input("\nPlease press enter to return to the menu")
 
         except sqlite3.Error as e:
@@ -347,7 +445,8 @@ class FlightManager:
         flight_id = input("Enter the Flight ID to update: ").strip()
 
         self.cursor.execute("""
-            SELECT flight.*, pilot.pilot_id, pilot.first_name, pilot.last_name
+            SELECT flight.flight_id, flight.origin_id, flight.destination_id, flight.aircraft_id, flight.flight_date, flight.flight_time, flight.status,
+                pilot.pilot_id, pilot.first_name, pilot.last_name, flight.departure_at, flight.block_minutes
             FROM flight
             LEFT JOIN flight_pilot ON flight.flight_id = flight_pilot.flight_id
             LEFT JOIN pilot ON flight_pilot.pilot_id = pilot.pilot_id
@@ -367,23 +466,44 @@ class FlightManager:
         new_destination = input("Enter new Destination IATA code (or press Enter to keep current): ").strip().upper() or flight_data[2]
         
         while True:
-            new_aircraft_id = input("Enter new Aircraft ID (or press Enter to keep current): ").strip() or str(flight_data[3])
+            new_aircraft_id = input("Enter new Aircraft ID (or press Enter to keep current): ").strip() or flight_data[3]
+            if new_aircraft_id is None: #the flight has no aircraft yet, and stays unassigned
+                break
+            new_aircraft_id = record_id(new_aircraft_id)
+            if new_aircraft_id is None:
+                print("Please enter a valid numeric ID.")
+                continue
 
-#Check if the selected aircraft is already scheduled for use on the same date
-            self.cursor.execute("""
-                SELECT COUNT(*) FROM flight
-                WHERE aircraft_id = ? AND flight_date = ? AND flight_id != ?
-            """, (new_aircraft_id, flight_data[4], flight_id))
-            aircraft_conflict = self.cursor.fetchone()[0] > 0
+#Check if the selected aircraft is already in use (or turning around) at the flight's current time
+            aircraft_conflict = not self.availability.aircraft_is_free(new_aircraft_id, flight_data[10], flight_data[11], exclude_flight=flight_data[0])
 
             if aircraft_conflict:
-                print("Aircraft conflict: This aircraft is already assigned to another flight on this date.")
+                print("Aircraft conflict: This aircraft is already assigned to another flight at this time.")
             else:
                 break 
             
 
         new_date = input("Enter new Flight Date (DD/MM/YYYY) (or press Enter to keep current): ").strip() or flight_data[4]
         new_time = input("Enter new Flight Time (HH:MM) (or press Enter to keep current): ").strip() or flight_data[5]
+        new_block_minutes = input("Enter new block time in minutes (or press Enter to keep current): ").strip() or str(flight_data[11])
+
+#check the date, time and block time are formatted correctly and work out the new departure timestamp
+        try:
+            new_date = normalise_date(new_date)
+            new_departure_at = departure_timestamp(new_date, new_time)
+            new_time = new_departure_at[11:] #stored as HH:MM, matching departure_at
+            new_block_minutes = int(new_block_minutes)
+            if new_block_minutes <= 0:
+                raise ValueError
+        except ValueError:
+            print("Invalid date/time or block time.")
+            return
+
+#the aircraft was checked against the current time above, so check it again as the flight may have moved or got longer
+        if new_aircraft_id is not None and not self.availability.aircraft_is_free(new_aircraft_id, new_departure_at, new_block_minutes, exclude_flight=flight_data[0]):
+            print(f"Aircraft conflict: This aircraft is already assigned to another flight at the new time, or has less than {MIN_AIRCRAFT_TURNAROUND_MINUTES} minutes turnaround.")
+            return
+
         new_status = input("Do you want to update the Status? (Y/N): ").strip().upper()
         
         if new_status == 'Y':        
@@ -404,55 +524,36 @@ class FlightManager:
 
         # Check if pilot update is needed
         change_pilot = input("Do you want to update the pilot? (Y/N): ").strip().upper()
-        new_pilot_id = str(flight_data[7]) #set's default to existing pilot
+        new_pilot_id = flight_data[7] #set's default to existing pilot, or None if the flight has no pilot
 
         if change_pilot == 'Y':
-            new_pilot_id = input("Enter new Pilot ID: ").strip()
+            new_pilot_id = record_id(input("Enter new Pilot ID: "))
             
 #checks that the pilot exists in the database
-            self.cursor.execute("""
-                SELECT first_name, last_name 
-                FROM pilot 
-                WHERE pilot_id = ?
-            """, (new_pilot_id,))
-            pilot_record = self.cursor.fetchone()
+            pilot_record = self.reference.pilot(new_pilot_id)
 
             if not pilot_record:
                 print("Pilot not found.")
                 return
             
-# Checks that there are no conflict with pilot on same date
+# Checks that the pilot is not flying, or resting after another flight, at the new time
 
-        if new_pilot_id:
-            self.cursor.execute("""
-                SELECT COUNT(*) 
-                FROM flight_pilot
-                JOIN flight ON flight.flight_id = flight_pilot.flight_id
-                WHERE flight.flight_date = ? AND flight_pilot.pilot_id = ? AND flight.flight_id != ?
-            """, (new_date, new_pilot_id, flight_id))
-            conflict_pilot = self.cursor.fetchone()[0] > 0
+        if new_pilot_id is not None:
+            conflict_pilot = not self.availability.pilot_is_free(new_pilot_id, new_departure_at, new_block_minutes, exclude_flight=flight_data[0])
 
             if conflict_pilot:
-                print("This pilot is assigned to another flight on this date. Please see a list of available pilots below")
-# Provides a list of available pilots on this date
-                self.cursor.execute("""
-                    SELECT pilot_id, first_name, last_name 
-                    FROM pilot
-                    WHERE pilot_id NOT IN (
-                        SELECT pilot_id 
-                        FROM flight_pilot 
-                        JOIN flight ON flight.flight_id = flight_pilot.flight_id 
-                        WHERE flight.flight_date = ?
-                    )
-                """, (new_date,))
-                available_pilots = self.cursor.fetchall()
+                print(f"This pilot is assigned to another flight at this time, or would have less than {MIN_PILOT_REST_MINUTES} minutes rest. Please see a list of available pilots below")
+# Provides a list of available pilots at this time
+                busy_pilots = self.availability.busy_pilots(new_departure_at, new_block_minutes, exclude_flight=flight_data[0])
+                available_pilots = [(pilot_id, *names) for pilot_id, names in self.reference.current().pilots.items()
+                                    if str(pilot_id) not in busy_pilots]
 
                 if available_pilots:
                     for pilot in available_pilots:
                         print(f"{pilot[0]}: {pilot[1]} {pilot[2]}")
 
                 else:
-                    print("No available pilots on this date.")
+                    print("No available pilots at this time.")
                     input("Press Enter to return to the menu.")
 
                 while True:
@@ -470,20 +571,16 @@ class FlightManager:
                     
                     else:
                         print("Invalid Pilot ID. Please choose one from the list.")
-        else:
-            print("No pilots available on this date. Please press enter to return to the menu.")
-            input()
-            return
                     
 # Update the flight record
         try:
             self.cursor.execute("""
                 UPDATE flight
-                SET origin_id = ?, destination_id = ?, aircraft_id = ?, flight_date = ?, flight_time = ?, status = ?
+                SET origin_id = ?, destination_id = ?, aircraft_id = ?, flight_date = ?, flight_time = ?, departure_at = ?, block_minutes = ?, status = ?
                 WHERE flight_id = ?
-            """, (new_origin, new_destination, new_aircraft_id, new_date, new_time, new_status, flight_id))
+            """, (new_origin, new_destination, new_aircraft_id, new_date, new_time, new_departure_at, new_block_minutes, new_status, flight_id))
 
-            if new_pilot_id:
+            if new_pilot_id is not None:
                 self.cursor.execute("""
                     DELETE FROM flight_pilot 
                     WHERE flight_id = ?
@@ -495,6 +592,9 @@ class FlightManager:
                 
 
             self.conn.commit()
+            self.availability.record_flight(flight_data[0], new_departure_at, new_block_minutes, new_aircraft_id,
+                                            [] if new_pilot_id is None else [new_pilot_id], new_status)
+            self.routes.record_flight(flight_data[0], new_origin, new_destination, new_departure_at, new_block_minutes, new_status)
             print("Flight updated successfully.")
             input("\nPlease press enter to return to the menu")
 
@@ -526,24 +626,447 @@ class FlightManager:
             return
 
         try:
+            self.remove_flight(flight[0])
+            print(f"Flight ID {flight_id} deleted successfully.")
+
+        except sqlite3.Error as e:
+            self.conn.rollback()
+            print(f"Failed to delete flight: {e}")
+
+# Deletes a flight and its pilot assignments without prompting. Returns False if there is no such flight.
+    def remove_flight(self, flight_id):
 # Delete related pilot assignment first (if any)
-            self.cursor.execute("""
-                DELETE FROM flight_pilot 
-                    WHERE flight_id = ?
-            """, (flight_id,))
-            
-            # Delete the flight record
-            self.cursor.execute("""
-                DELETE FROM flight
-                    WHERE flight_id = ?
-            """, (flight_id,))
+        self.cursor.execute("""
+            DELETE FROM flight_pilot 
+                WHERE flight_id = ?
+        """, (flight_id,))
+        
+        # Delete the flight record
+        self.cursor.execute("""
+            DELETE FROM flight
+                WHERE flight_id = ?
+        """, (flight_id,))
+        if self.cursor.rowcount == 0:
+            self.conn.rollback()
+            return False
+
+        self.conn.commit()
+        self.availability.forget_flight(int(flight_id))
+        self.routes.forget_flight(int(flight_id))
+        return True
+
+#8. Schedules a batch of flights without prompting. 
+# Each spec is a dict with origin_id, destination_id, flight_date (DD/MM/YYYY), flight_time (HH:MM), status, pilot_id and aircraft_id,
+# and optionally block_minutes. pilot_id and aircraft_id may be left blank, e.g. for a timetable that auto_assign will crew later. The whole batch is validated in memory (airports, pilots, aircraft, and pilot rest and aircraft
+# turnaround against the availability index, including clashes inside the batch) and the accepted flights are inserted
+# with executemany in a single transaction.
+# Returns one result per spec, in order: {"row", "accepted", "flight_id", "reason"}.
+    def schedule_flights(self, specs):
+        airports, aircraft, pilots = self.reference.current()
+
+        results = []
+        accepted = [] #(result, validated flight) pairs waiting to be inserted
+
+#Accepted rows are recorded in the availability index straight away under a temporary negative ID, so that later rows
+#of the batch are checked against them too. They are replaced by the real flight IDs once the insert has committed.
+        for row, spec in enumerate(specs):
+            result = {"row": row, "accepted": False, "flight_id": None, "reason": None}
+            results.append(result)
+            try:
+                flight = self._validate_flight_spec(spec, airports, pilots, aircraft)
+            except ValueError as e:
+                result["reason"] = str(e)
+                continue
+
+            self.availability.record_flight(-(row + 1), flight["departure_at"], flight["block_minutes"], flight["aircraft_id"], [flight["pilot_id"]],
+                                            flight["status"])
+            accepted.append((result, flight))
+
+        for result, _ in accepted:
+            self.availability.forget_flight(-(result["row"] + 1))
+        if not accepted:
+            return results
+
+        try:
+            if not self.conn.in_transaction:
+                self.cursor.execute("BEGIN IMMEDIATE") #take the write lock before reading the highest flight ID
+
+            #numbered after every flight ever added, including archived ones (migration 9)
+            self.cursor.execute("SELECT last_flight_id FROM flight_sequence")
+            next_id = self.cursor.fetchone()[0] + 1
+            for flight_id, (result, flight) in enumerate(accepted, start=next_id):
+                flight["flight_id"] = flight_id
+
+            self.cursor.executemany("""
+                INSERT INTO flight (flight_id, origin_id, destination_id, aircraft_id, flight_date, flight_time, departure_at, block_minutes, status)
+                VALUES (:flight_id, :origin_id, :destination_id, :aircraft_id, :flight_date, :flight_time, :departure_at, :block_minutes, :status)
+            """, [flight for _, flight in accepted])
+            self.cursor.executemany("""
+                INSERT INTO flight_pilot (flight_id, pilot_id)
+                VALUES (:flight_id, :pilot_id)
+            """, [flight for _, flight in accepted if flight["pilot_id"] is not None])
 
             self.conn.commit()
-            print(f"Flight ID {flight_id} deleted successfully.")
+        except sqlite3.Error as e:
+            self.conn.rollback()
+            for result, _ in accepted:
+                result["reason"] = f"Database rejection: {e}"
+            return results
+
+        for result, flight in accepted:
+            self.availability.record_flight(flight["flight_id"], flight["departure_at"], flight["block_minutes"], flight["aircraft_id"], [flight["pilot_id"]],
+                                            flight["status"])
+            self.routes.record_flight(flight["flight_id"], flight["origin_id"], flight["destination_id"], flight["departure_at"], flight["block_minutes"], flight["status"])
+            result["accepted"] = True
+            result["flight_id"] = flight["flight_id"]
+        return results
+
+# Checks one flight spec for schedule_flights and returns it with normalised values. Raises ValueError with the reason if it is rejected.
+    def _validate_flight_spec(self, spec, airports, pilots, aircraft):
+        origin_id = str(spec.get("origin_id") or "").strip().upper()
+        destination_id = str(spec.get("destination_id") or "").strip().upper()
+        flight_time = str(spec.get("flight_time") or "").strip()
+        status = spec.get("status") or "Scheduled"
+        pilot_id = str(spec.get("pilot_id") or "").strip()
+        aircraft_id = str(spec.get("aircraft_id") or "").strip()
+
+        #converted to int once, so the insert and the availability checks use the same IDs as the reference data
+        if pilot_id and record_id(pilot_id) is None:
+            raise ValueError("Pilot ID must be a number.")
+        if aircraft_id and record_id(aircraft_id) is None:
+            raise ValueError("Aircraft ID must be a number.")
+        pilot_id = record_id(pilot_id) if pilot_id else None
+        aircraft_id = record_id(aircraft_id) if aircraft_id else None
+
+        if origin_id not in airports:
+            raise ValueError("Origin IATA code not found in records.")
+        if destination_id not in airports:
+            raise ValueError("Destination IATA code not found in records.")
+        try:
+            flight_date = normalise_date(str(spec.get("flight_date") or "").strip())
+            departure_at = departure_timestamp(flight_date, flight_time)
+        except ValueError:
+            raise ValueError("Invalid date/time format.") from None
+        flight_time = departure_at[11:] #stored as HH:MM, matching departure_at
+        try:
+            block_minutes = spec.get("block_minutes")
+            block_minutes = DEFAULT_BLOCK_MINUTES if block_minutes in (None, "") else int(block_minutes)
+            if block_minutes <= 0:
+                raise ValueError
+        except (TypeError, ValueError):
+            raise ValueError("Invalid block time. Please give a whole number of minutes.") from None
+        if status not in FLIGHT_STATUSES:
+            raise ValueError(f"Invalid status. Please use one of: {', '.join(FLIGHT_STATUSES)}.")
+        if pilot_id is not None and pilot_id not in pilots:
+            raise ValueError("Pilot ID not found in records.")
+        if aircraft_id is not None and aircraft_id not in aircraft:
+            raise ValueError("Aircraft ID not found in records.")
+        if pilot_id is not None and not self.availability.pilot_is_free(pilot_id, departure_at, block_minutes):
+            raise ValueError(f"This pilot is assigned to another flight at this time, or would have less than {MIN_PILOT_REST_MINUTES} minutes rest.")
+        if aircraft_id is not None and not self.availability.aircraft_is_free(aircraft_id, departure_at, block_minutes):
+            raise ValueError(f"This aircraft is assigned to another flight at this time, or would have less than {MIN_AIRCRAFT_TURNAROUND_MINUTES} minutes turnaround.")
+
+        return {
+            "origin_id": origin_id,
+            "destination_id": destination_id,
+            "aircraft_id": aircraft_id,
+            "flight_date": flight_date,
+            "flight_time": flight_time,
+            "departure_at": departure_at,
+            "block_minutes": block_minutes,
+            "status": status,
+            "pilot_id": pilot_id,
+        }
+
+#9. Exports every flight record to a CSV or JSON Lines file
+    def export_flight_records(self):
+        file_format = input("Enter the export format (CSV / JSONL): ").strip().lower()
+        if file_format not in ("csv", "jsonl"):
+            print("Invalid format. Please enter CSV or JSONL.")
+            return
+
+        path = input(f"Enter the file name (or press Enter for flights.{file_format}): ").strip() or f"flights.{file_format}"
+
+        try:
+            exported = self.export_flights(path, file_format)
+            print(f"{exported} flight records exported to '{path}'.")
+        except (OSError, sqlite3.Error) as e:
+            print(f"Failed to export flights: {e}")
+
+# Streams every flight record (with its pilot) into a CSV or JSON Lines file in departure order and returns the number of rows written.
+# Rows are read with fetchmany and written straight out, so memory use does not grow with the number of flights.
+    def export_flights(self, path, file_format="csv", batch_size=EXPORT_BATCH_SIZE):
+        field_names = [col.split(".")[1] for col in FLIGHT_COLUMNS]
+        export_cursor = self.conn.cursor() #a separate cursor so the export is not disturbed by other queries
+        export_cursor.execute(f"""
+            SELECT {", ".join(FLIGHT_COLUMNS)}
+            FROM flight
+            LEFT JOIN flight_pilot ON flight.flight_id = flight_pilot.flight_id
+            LEFT JOIN pilot ON flight_pilot.pilot_id = pilot.pilot_id
+            ORDER BY flight.departure_at, flight.flight_id
+        """)
+
+        exported = 0
+        with open(path, "w", newline="", encoding="utf-8") as export_file:
+            if file_format == "csv":
+                writer = csv.writer(export_file)
+                writer.writerow(field_names)
+            while True:
+                rows = export_cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                if file_format == "csv":
+                    writer.writerows(rows)
+                else:
+                    export_file.writelines(json.dumps(dict(zip(field_names, row))) + "\n" for row in rows)
+                exported += len(rows)
+
+        export_cursor.close()
+        return exported
 
+#10. Asks for a period and automatically assigns aircraft and pilots to the flights in it that do not have them
+    def auto_assign_flights(self):
+        start_date = input("Enter the first date of the period to assign (DD/MM/YYYY): ").strip()
+        end_date = input("Enter the last date of the period (DD/MM/YYYY) or press Enter for a single day: ").strip() or start_date
+        try:
+            start_date = normalise_date(start_date)
+            end_date = normalise_date(end_date)
+        except ValueError:
+            print("Invalid date format. Please enter as DD/MM/YYYY.")
+            return
+
+        try:
+            summary = self.auto_assign(start_date, end_date)
         except sqlite3.Error as e:
+            print(f"Failed to assign flights: {e}")
+            return
+
+        print(f"\n{summary['flights']} flights checked between {start_date} and {end_date}.")
+        print(f"Aircraft assigned to {summary['aircraft_assigned']} flights and pilots to {summary['pilots_assigned']} flights.")
+        if summary["without_aircraft"] or summary["without_pilot"]:
+            print(f"{summary['without_aircraft']} flights are still without an aircraft and {summary['without_pilot']} without a pilot: "
+                  "no aircraft or pilot was at the origin airport in time. Please assign these by hand.")
+
+# Assigns aircraft and pilots to every flight departing between two DD/MM/YYYY dates (inclusive) that is missing one,
+# without double-booking and keeping each aircraft's and pilot's airport continuous (see assignment.py).
+# Cancelled flights are skipped. Everything is read and written inside one write transaction.
+# Returns counts: {"flights", "aircraft_assigned", "pilots_assigned", "without_aircraft", "without_pilot"}.
+    def auto_assign(self, start_date, end_date):
+        from assignment import PlannedFlight, plan_assignments
+        range_start, range_end = date_range_bounds(start_date, end_date)
+
+        try:
+            if not self.conn.in_transaction:
+                self.cursor.execute("BEGIN IMMEDIATE") #nobody else can assign these flights while the plan is made
+
+            self.cursor.execute(PERIOD_FLIGHTS_SQL, (range_start, range_end))
+            flights = [PlannedFlight(flight_id, origin, destination, departure_at, block_minutes, aircraft_id,
+                                     [int(pilot_id) for pilot_id in pilot_ids.split(",")] if pilot_ids else [])
+                       for flight_id, origin, destination, departure_at, block_minutes, aircraft_id, pilot_ids in self.cursor.fetchall()]
+
+#where each aircraft and pilot last landed before the period (SQLite returns the other columns from the row with the MAX)
+            self.cursor.execute("""
+                SELECT aircraft_id, destination_id, MAX(departure_at), block_minutes
+                FROM flight
+                WHERE aircraft_id IS NOT NULL AND departure_at < ? AND status != 'Cancelled'
+                GROUP BY aircraft_id
+            """, (range_start,))
+            aircraft_positions = {aircraft_id: (airport, departure_minutes(departure_at) + block_minutes)
+                                  for aircraft_id, airport, departure_at, block_minutes in self.cursor.fetchall()}
+            self.cursor.execute("""
+                SELECT flight_pilot.pilot_id, flight.destination_id, MAX(flight.departure_at), flight.block_minutes
+                FROM flight_pilot
+                JOIN flight ON flight.flight_id = flight_pilot.flight_id
+                WHERE flight.departure_at < ? AND flight.status != 'Cancelled'
+                GROUP BY flight_pilot.pilot_id
+            """, (range_start,))
+            pilot_positions = {pilot_id: (airport, departure_minutes(departure_at) + block_minutes)
+                               for pilot_id, airport, departure_at, block_minutes in self.cursor.fetchall()}
+
+            reference = self.reference.current()
+            aircraft_ids = list(reference.aircraft)
+            pilot_ids = list(reference.pilots)
+
+            assignments = plan_assignments(flights, aircraft_ids, pilot_ids, aircraft_positions, pilot_positions, self.availability)
+
+            self.cursor.executemany("UPDATE flight SET aircraft_id = ? WHERE flight_id = ? AND aircraft_id IS NULL",
+                                    [(aircraft_id, flight_id) for flight_id, (aircraft_id, _) in assignments.items() if aircraft_id is not None])
+            self.cursor.executemany("INSERT INTO flight_pilot (flight_id, pilot_id) VALUES (?, ?)",
+                                    [(flight_id, pilot_id) for flight_id, (_, pilot_id) in assignments.items() if pilot_id is not None])
+            self.conn.commit()
+        except sqlite3.Error:
             self.conn.rollback()
-            print(f"Failed to delete flight: {e}")
+            self.availability.reload() #the plan was recorded in the index as it was made, so put it back as the database is
+            raise
+
+        aircraft_assigned = sum(1 for aircraft_id, _ in assignments.values() if aircraft_id is not None)
+        pilots_assigned = sum(1 for _, pilot_id in assignments.values() if pilot_id is not None)
+        return {
+            "flights": len(flights),
+            "aircraft_assigned": aircraft_assigned,
+            "pilots_assigned": pilots_assigned,
+            "without_aircraft": sum(1 for flight in flights if flight.aircraft_id is None) - aircraft_assigned,
+            "without_pilot": sum(1 for flight in flights if not flight.pilot_ids) - pilots_assigned,
+        }
+
+#11. Asks for two airports and a departure date and shows the fastest connecting itineraries between them
+    def search_itineraries(self):
+        from tabulate import tabulate
+        origin = input("Enter the origin IATA code: ").strip().upper()
+        destination = input("Enter the destination IATA code: ").strip().upper()
+        flight_date = input("Enter the earliest departure date (DD/MM/YYYY): ").strip()
+        flight_time = input("Enter the earliest departure time (HH:MM) or press Enter for 00:00: ").strip() or "00:00"
+        min_connection = input(f"Minimum connection time in minutes (press Enter for {MIN_CONNECTION_MINUTES}): ").strip() or MIN_CONNECTION_MINUTES
+        max_legs = input(f"Most flights in an itinerary (press Enter for {MAX_ITINERARY_LEGS}): ").strip() or MAX_ITINERARY_LEGS
+
+        try:
+            itineraries = self.find_itineraries(origin, destination, flight_date, flight_time, int(min_connection), int(max_legs))
+        except ValueError as e:
+            print(e)
+            return
+
+        if not itineraries:
+            print(f"No itineraries found from {origin} to {destination} in the {SEARCH_WINDOW_HOURS} hours after {flight_date} {flight_time}.")
+            return
+        for number, itinerary in enumerate(itineraries, start=1):
+            hours, minutes = divmod(itinerary["duration_minutes"], 60)
+            print(f"\nOption {number}: {itinerary['legs']} flight(s), departs {itinerary['departure_at']}, arrives {itinerary['arrival_at']} ({hours}h {minutes:02d}m)")
+            print(tabulate([list(leg.values()) for leg in itinerary["flights"]],
+                           headers=["Flight ID", "Origin", "Destination", "Departs", "Arrives"], tablefmt="pretty"))
+
+# Returns the fastest itineraries from origin to destination leaving on or after a DD/MM/YYYY date and HH:MM time,
+# searched on the in-memory route index (see route_network.py). Raises ValueError for unknown airports or invalid input.
+    def find_itineraries(self, origin, destination, flight_date, flight_time="00:00",
+                         min_connection=MIN_CONNECTION_MINUTES, max_legs=MAX_ITINERARY_LEGS):
+        try:
+            earliest_departure = departure_timestamp(flight_date, flight_time)
+        except ValueError:
+            raise ValueError("Invalid date or time. Please enter the date as DD/MM/YYYY and the time as HH:MM.") from None
+        if min_connection < 0 or max_legs < 1:
+            raise ValueError("The connection time cannot be negative and an itinerary needs at least one flight.")
+
+        airports = self.reference.current().airports
+        for airport in (origin, destination):
+            if airport not in airports:
+                raise ValueError(f"Unknown airport: {airport}")
+
+        return self.routes.find_itineraries(origin, destination, earliest_departure, min_connection, max_legs)
+
+#12. Delays or cancels every flight matching a filter at once, e.g. when weather closes an airport
+    def disrupt_flights(self):
+        from tabulate import tabulate
+        start_date = input("Enter the first departure date affected (DD/MM/YYYY): ").strip()
+        end_date = input("Enter the last date (DD/MM/YYYY) or press Enter for a single day: ").strip() or start_date
+        airport = input("Only flights from or to this IATA code (or press Enter for any airport): ").strip().upper() or None
+        aircraft_id = input("Only flights flown by this Aircraft ID (or press Enter for any aircraft): ").strip() or None
+        action = input("1. Delay   2. Cancel\nEnter choice (1 / 2): ").strip()
+        if action not in ("1", "2"):
+            print("Invalid. Please enter either 1 / 2")
+            return
+
+        delay_minutes = 0
+        if action == "1":
+            delay_minutes = input("Move the departures by how many minutes? (or press Enter to only mark them Delayed): ").strip() or "0"
+            if not delay_minutes.lstrip("-").isdigit():
+                print("Please enter a whole number of minutes.")
+                return
+            delay_minutes = int(delay_minutes)
+        status = "Delayed" if action == "1" else "Cancelled"
+
+        try:
+            start_date = normalise_date(start_date)
+            end_date = normalise_date(end_date)
+        except ValueError:
+            print("Invalid date format. Please enter as DD/MM/YYYY.")
+            return
+        confirm = input(f"{status} every flight between {start_date} and {end_date} that matches? (Y/N): ").strip().upper()
+        if confirm != 'Y':
+            print("No flights changed.")
+            return
+
+        try:
+            disruption = self.apply_disruption(start_date, end_date, airport, aircraft_id, status, delay_minutes)
+        except (ValueError, sqlite3.Error) as e:
+            print(f"Failed to change the flights: {e}")
+            return
+
+        if not disruption["flights"]:
+            print("No flights matched.")
+            return
+        print(tabulate([flight[:6] for flight in disruption["flights"]],
+                       headers=["ID", "Origin", "Destination", "Date", "Time", "Status"], tablefmt="pretty"))
+        print(f"\n{len(disruption['flights'])} flights changed. Pilots to inform:")
+        print(tabulate(disruption["pilots"], headers=["Pilot ID", "First Name", "Last Name"], tablefmt="pretty"))
+
+# Changes every flight departing between two DD/MM/YYYY dates (inclusive), optionally only those from or to an airport
+# and/or flown by one aircraft, in a single UPDATE ... RETURNING inside one write transaction. Cancelled flights are
+# left as they are. status, if given, becomes every flight's status; delay_minutes moves each departure (a negative
+# number brings it forward). The availability and route indexes are brought up to date from the returned rows.
+# Returns {"flights": [(flight_id, origin_id, destination_id, flight_date, flight_time, status, [pilot IDs])] in
+# departure order, "pilots": [(pilot_id, first_name, last_name)] of every pilot on those flights}.
+    def apply_disruption(self, start_date, end_date, airport=None, aircraft_id=None, status=None, delay_minutes=0):
+        if status is not None and status not in FLIGHT_STATUSES:
+            raise ValueError(f"Invalid status. Please use one of: {', '.join(FLIGHT_STATUSES)}.")
+        if status is None and not delay_minutes:
+            raise ValueError("Give a new status, a delay, or both.")
+        range_start, range_end = date_range_bounds(start_date, end_date)
+
+        where, params = flight_conditions(range_start, range_end, airport=airport, aircraft_id=aircraft_id, not_cancelled=True)
+
+        changes = []
+        change_params = []
+        if status is not None:
+            changes.append("status = ?")
+            change_params.append(status)
+        if delay_minutes:
+            #every SET expression sees the row as it was, so all three columns move from the old departure
+            shift = f"{int(delay_minutes):+d} minutes"
+            changes.extend(["departure_at = strftime('%Y-%m-%d %H:%M', departure_at, ?)",
+                            "flight_date = strftime('%d/%m/%Y', departure_at, ?)",
+                            "flight_time = strftime('%H:%M', departure_at, ?)"])
+            change_params.extend([shift, shift, shift])
+
+        try:
+            if not self.conn.in_transaction:
+                self.cursor.execute("BEGIN IMMEDIATE") #the pilots read first are still on the same flights when they change
+
+            self.cursor.execute(FLIGHT_PILOTS_SQL.format(conditions=where), params)
+            pilots_by_flight = {}
+            for flight_id, pilot_id in self.cursor.fetchall():
+                pilots_by_flight.setdefault(flight_id, []).append(pilot_id)
+
+            self.cursor.execute(f"""
+                UPDATE flight
+                SET {", ".join(changes)}
+                WHERE {where}
+                RETURNING flight_id, origin_id, destination_id, flight_date, flight_time, status, departure_at, block_minutes, aircraft_id
+            """, change_params + params)
+            changed = sorted(self.cursor.fetchall(), key=lambda flight: (flight[6], flight[0]))
+            self.conn.commit()
+        except sqlite3.Error:
+            self.conn.rollback()
+            raise
+
+        for flight_id, origin_id, destination_id, _, _, new_status, departure_at, block_minutes, aircraft_id in changed:
+            if new_status == "Cancelled":
+                self.availability.forget_flight(flight_id) #the pilots and aircraft are free again
+            elif delay_minutes:
+                self.availability.record_flight(flight_id, departure_at, block_minutes, aircraft_id, pilots_by_flight.get(flight_id, []))
+            self.routes.record_flight(flight_id, origin_id, destination_id, departure_at, block_minutes, new_status)
+
+        pilot_names = self.reference.current().pilots
+        pilot_ids = sorted({pilot_id for flight in changed for pilot_id in pilots_by_flight.get(flight[0], [])})
+        return {
+            "flights": [(*flight[:6], pilots_by_flight.get(flight[0], [])) for flight in changed],
+            "pilots": [(pilot_id, *pilot_names.get(pilot_id, (None, None))) for pilot_id in pilot_ids],
+        }
 
-    def close(self):
-        self.conn.close()
\ No newline at end of file
+# Moves the flights that departed before a DD/MM/YYYY date into the history database (see flight_archive.py), then
+# reloads the availability and route indexes, which only hold live flights. Returns (flights, flight_pilot rows) moved.
+    def archive_flights(self, before_date, history=None):
+        from flight_archive import archive_flights
+        moved = archive_flights(self.connections.path, before_date, history)
+        self.availability.reload()
+        if self.routes.departures is not None:
+            self.routes.reload()
+        return moved
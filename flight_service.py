@@ -0,0 +1,316 @@
+import argparse
+import asyncio
+import json
+import logging
+import re
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from urllib.parse import parse_qs, urlsplit
+
+from aircraft import AircraftManager
+from connection import ConnectionFactory, DATABASE_PATH
+from destination_manager import DestinationManager
+from flight_dates import normalise_date
+from flight_manager import FlightManager
+from migrations import run_migrations
+from pilot_information import PilotInformation
+from route_network import MAX_ITINERARY_LEGS, MIN_CONNECTION_MINUTES
+from text_search import SEARCH_LIMIT
+
+# A local HTTP/JSON service so several dispatch desks can use the flight system at once:
+#   python flight_service.py [--host 127.0.0.1] [--port 8080] [--db flights.db] [--workers 8]
+#
+#   GET    /flights?from=DD/MM/YYYY&to=DD/MM/YYYY&status=&airport=   flights departing in a date range
+#   GET    /flights/<id>                                              one flight
+#   POST   /flights                                                   schedule one flight (object) or a batch (list of objects)
+#   POST   /flights/disruptions                                       delay or cancel every matching flight: {"from", "to",
+#                                                                     "airport", "aircraft_id", "status", "delay_minutes"}
+#   DELETE /flights/<id>
+#   GET    /itineraries?origin=&destination=&date=DD/MM/YYYY&time=HH:MM&min_connection=&max_legs=   connecting flights
+#   GET    /pilots?q=                                                 GET /pilots/<id>/schedule (q: typeahead search)
+#   GET    /destinations?q=                                           POST /destinations, DELETE /destinations/<IATA code>
+#   GET    /aircraft                                                  POST /aircraft, DELETE /aircraft/<id>
+#
+# Requests are read by one asyncio event loop. The SQLite work runs in a bounded pool of reader threads, each with
+# its own connection (WAL lets them read while a write is in progress), and every write runs on a single writer thread,
+# so writes are serialized and the in-memory availability index is only ever changed by one thread.
+
+SERVICE_WORKERS = 8 #reader threads, and so the most SQLite queries that run at the same time
+MAX_BODY_BYTES = 1_048_576 #largest request body accepted (1 MB)
+
+log = logging.getLogger("flight_service") #unexpected handler errors are logged here (to stderr unless configured)
+
+FLIGHT_FIELDS = ["flight_id", "origin_id", "destination_id", "flight_date", "flight_time", "status"]
+DISRUPTION_FIELDS = FLIGHT_FIELDS + ["pilot_ids"]
+SCHEDULE_FIELDS = ["flight_id", "flight_date", "flight_time", "origin_id", "destination_id", "status"]
+PILOT_FIELDS = ["pilot_id", "first_name", "last_name", "experience_years"]
+PILOT_MATCH_FIELDS = ["pilot_id", "first_name", "last_name", "license_number", "nationality"]
+DESTINATION_FIELDS = ["name", "city", "country", "iata_code"]
+AIRCRAFT_FIELDS = ["aircraft_id", "model", "capacity", "manufacturer", "registration_number"]
+
+
+def records(fields, rows):
+    return [dict(zip(fields, row)) for row in rows]
+
+
+class FlightService:
+    def __init__(self, db_path=DATABASE_PATH, workers=SERVICE_WORKERS):
+        self.connections = ConnectionFactory(db_path)
+        run_migrations(self.connections.get())
+        self.readers = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="flight-reader")
+        self.writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="flight-writer")
+
+        #the managers are shared by every thread; ConnectionUser gives each thread its own connection
+        self.flight_manager = FlightManager(self.connections)
+        self.pilot_info = PilotInformation(self.connections)
+        self.destination_manager = DestinationManager(self.connections)
+        self.aircraft_manager = AircraftManager(self.connections)
+
+        # (method, path pattern, handler, whether it writes)
+        self.routes = [
+            ("GET", r"/flights", self.search_flights, False),
+            ("POST", r"/flights", self.add_flights, True),
+            ("POST", r"/flights/disruptions", self.disrupt_flights, True),
+            ("GET", r"/flights/(\d+)", self.get_flight, False),
+            ("DELETE", r"/flights/(\d+)", self.delete_flight, True),
+            ("GET", r"/itineraries", self.find_itineraries, False),
+            ("GET", r"/pilots", self.list_pilots, False),
+            ("GET", r"/pilots/(\d+)/schedule", self.pilot_schedule, False),
+            ("GET", r"/destinations", self.list_destinations, False),
+            ("POST", r"/destinations", self.add_destination, True),
+            ("DELETE", r"/destinations/([A-Za-z]{3})", self.delete_destination, True),
+            ("GET", r"/aircraft", self.list_aircraft, False),
+            ("POST", r"/aircraft", self.add_aircraft, True),
+            ("DELETE", r"/aircraft/(\d+)", self.delete_aircraft, True),
+        ]
+        self.routes = [(method, re.compile(pattern), handler, writes) for method, pattern, handler, writes in self.routes]
+
+#1. Starts listening and returns the asyncio server (port 0 picks a free port)
+    async def start(self, host="127.0.0.1", port=8080):
+        return await asyncio.start_server(self.handle_connection, host, port)
+
+#2. Serves requests until the process is stopped
+    async def serve(self, host="127.0.0.1", port=8080):
+        server = await self.start(host, port)
+        host, port = server.sockets[0].getsockname()[:2]
+        print(f"Serving on http://{host}:{port}", flush=True)
+        async with server:
+            await server.serve_forever()
+
+    def close(self):
+        self.readers.shutdown()
+        self.writer.shutdown()
+        self.connections.close_all()
+
+#3. Reads HTTP/1.1 requests from one client connection and answers them in order, keeping the connection open between requests
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                try:
+                    method, target, version = request_line.decode("latin-1").split()
+                    length = int(headers.get("content-length") or 0)
+                except ValueError:
+                    await self.send(writer, HTTPStatus.BAD_REQUEST, {"error": "Malformed request."}, keep_alive=False)
+                    break
+                if length > MAX_BODY_BYTES:
+                    await self.send(writer, HTTPStatus.REQUEST_ENTITY_TOO_LARGE, {"error": "Request body is too large."}, keep_alive=False)
+                    break
+                body = await reader.readexactly(length) if length else b""
+
+                connection = headers.get("connection", "").lower()
+                keep_alive = connection == "keep-alive" or (version == "HTTP/1.1" and connection != "close")
+
+                status, payload = await self.dispatch(method, target, body)
+                await self.send(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def send(self, writer, status, payload, keep_alive=True):
+        body = json.dumps(payload).encode()
+        writer.write(
+            f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode("latin-1") + body
+        )
+        await writer.drain()
+
+#4. Finds the handler for a request and runs it on a reader thread, or on the writer thread if it changes the database.
+#Handlers return (status, payload). ValueError (which includes bad JSON), KeyError and TypeError mean the request was
+#invalid and give 400; any other error is logged and gives 500, so the client always gets a response.
+    async def dispatch(self, method, target, body):
+        url = urlsplit(target)
+        path_matched = False
+        for route_method, pattern, handler, writes in self.routes:
+            match = pattern.fullmatch(url.path.rstrip("/") or "/")
+            if not match:
+                continue
+            path_matched = True
+            if route_method == method:
+                break
+        else:
+            if path_matched:
+                return HTTPStatus.METHOD_NOT_ALLOWED, {"error": f"{method} is not supported for {url.path}."}
+            return HTTPStatus.NOT_FOUND, {"error": f"No such resource: {url.path}"}
+
+        try:
+            query = {name: values[-1] for name, values in parse_qs(url.query).items()}
+            data = json.loads(body) if body else None
+            executor = self.writer if writes else self.readers
+            return await asyncio.get_running_loop().run_in_executor(executor, handler, *match.groups(), query, data)
+        except ValueError as e:
+            return HTTPStatus.BAD_REQUEST, {"error": str(e)}
+        except KeyError as e:
+            return HTTPStatus.BAD_REQUEST, {"error": f"Missing field: {e}."}
+        except TypeError as e:
+            return HTTPStatus.BAD_REQUEST, {"error": f"Invalid request: {e}"}
+        except sqlite3.Error as e:
+            return HTTPStatus.INTERNAL_SERVER_ERROR, {"error": f"Database error: {e}"}
+        except Exception:
+            log.exception("Error handling %s %s", method, target)
+            return HTTPStatus.INTERNAL_SERVER_ERROR, {"error": "Internal server error."}
+
+#5. Request handlers. These run on the database threads.
+    def search_flights(self, query, data):
+        if "from" not in query:
+            raise ValueError("The 'from' date is required (DD/MM/YYYY).")
+        try:
+            start_date = normalise_date(query["from"])
+            end_date = normalise_date(query.get("to") or query["from"])
+        except ValueError:
+            raise ValueError("Invalid date format. Please enter as DD/MM/YYYY.") from None
+        airport = query["airport"].upper() if query.get("airport") else None
+        rows = self.flight_manager.find_flights(start_date, end_date, query.get("status"), airport)
+        return HTTPStatus.OK, records(FLIGHT_FIELDS, rows)
+
+    def get_flight(self, flight_id, query, data):
+        flight = self.flight_manager.get_flight(int(flight_id))
+        if not flight:
+            return HTTPStatus.NOT_FOUND, {"error": "No flight found with that ID."}
+        return HTTPStatus.OK, dict(zip(FLIGHT_FIELDS, flight))
+
+    def add_flights(self, query, data):
+        if isinstance(data, list) and all(isinstance(spec, dict) for spec in data):
+            return HTTPStatus.OK, self.flight_manager.schedule_flights(data)
+        if not isinstance(data, dict):
+            raise ValueError("Send a flight object or a list of flight objects.")
+
+        result = self.flight_manager.schedule_flights([data])[0]
+        if not result["accepted"]:
+            raise ValueError(result["reason"])
+        return HTTPStatus.CREATED, result
+
+    def disrupt_flights(self, query, data):
+        if not isinstance(data, dict) or not data.get("from"):
+            raise ValueError("Send a JSON object with at least the 'from' date (DD/MM/YYYY).")
+        try:
+            start_date = normalise_date(data["from"])
+            end_date = normalise_date(data.get("to") or data["from"])
+        except ValueError:
+            raise ValueError("Invalid date format. Please enter as DD/MM/YYYY.") from None
+        airport = data["airport"].upper() if data.get("airport") else None
+        disruption = self.flight_manager.apply_disruption(start_date, end_date, airport, data.get("aircraft_id"), data.get("status"),
+                                                          int(data.get("delay_minutes") or 0))
+        return HTTPStatus.OK, {
+            "flights": [dict(zip(DISRUPTION_FIELDS, flight)) for flight in disruption["flights"]],
+            "pilots": records(PILOT_FIELDS[:3], disruption["pilots"]),
+        }
+
+    def delete_flight(self, flight_id, query, data):
+        if not self.flight_manager.remove_flight(int(flight_id)):
+            return HTTPStatus.NOT_FOUND, {"error": "Flight not found."}
+        return HTTPStatus.OK, {"deleted": int(flight_id)}
+
+    def find_itineraries(self, query, data):
+        if not query.get("origin") or not query.get("destination") or not query.get("date"):
+            raise ValueError("origin, destination and date (DD/MM/YYYY) are required.")
+        itineraries = self.flight_manager.find_itineraries(
+            query["origin"].upper(), query["destination"].upper(), query["date"], query.get("time") or "00:00",
+            int(query.get("min_connection") or MIN_CONNECTION_MINUTES), int(query.get("max_legs") or MAX_ITINERARY_LEGS))
+        return HTTPStatus.OK, itineraries
+
+    def list_pilots(self, query, data):
+        if "q" in query:
+            return HTTPStatus.OK, records(PILOT_MATCH_FIELDS, self.pilot_info.search_pilots(query["q"], self.limit(query)))
+        return HTTPStatus.OK, records(PILOT_FIELDS, self.pilot_info.list_pilots())
+
+    def pilot_schedule(self, pilot_id, query, data):
+        if not self.pilot_info.find_pilot(int(pilot_id)):
+            return HTTPStatus.NOT_FOUND, {"error": "Pilot not found."}
+        return HTTPStatus.OK, records(SCHEDULE_FIELDS, self.pilot_info.pilot_schedule(int(pilot_id)))
+
+    def list_destinations(self, query, data):
+        if "q" in query:
+            return HTTPStatus.OK, records(DESTINATION_FIELDS, self.destination_manager.search_destinations(query["q"], self.limit(query)))
+        return HTTPStatus.OK, records(DESTINATION_FIELDS, self.destination_manager.list_destinations())
+
+    def add_destination(self, query, data):
+        destination = self.fields(data, DESTINATION_FIELDS)
+        destination[3] = str(destination[3]).strip().upper()
+        self.destination_manager.create_destination(*destination)
+        return HTTPStatus.CREATED, dict(zip(DESTINATION_FIELDS, destination))
+
+    def delete_destination(self, iata_code, query, data):
+        if not self.destination_manager.remove_destination(iata_code):
+            return HTTPStatus.NOT_FOUND, {"error": "Destination not found."}
+        return HTTPStatus.OK, {"deleted": iata_code.upper()}
+
+    def list_aircraft(self, query, data):
+        return HTTPStatus.OK, records(AIRCRAFT_FIELDS, self.aircraft_manager.list_aircraft())
+
+    def add_aircraft(self, query, data):
+        aircraft = self.fields(data, AIRCRAFT_FIELDS)
+        self.aircraft_manager.create_aircraft(*aircraft)
+        return HTTPStatus.CREATED, dict(zip(AIRCRAFT_FIELDS, aircraft))
+
+    def delete_aircraft(self, aircraft_id, query, data):
+        if not self.aircraft_manager.remove_aircraft(int(aircraft_id)):
+            return HTTPStatus.NOT_FOUND, {"error": "Aircraft not found."}
+        return HTTPStatus.OK, {"deleted": int(aircraft_id)}
+
+#Returns the limit query parameter of a search, or the default
+    def limit(self, query):
+        return int(query.get("limit") or SEARCH_LIMIT)
+
+#Returns the values of the named fields from a JSON object body, in order. Raises ValueError if any is missing.
+    def fields(self, data, names):
+        if not isinstance(data, dict):
+            raise ValueError(f"Send a JSON object with {', '.join(names)}.")
+        missing = [name for name in names if data.get(name) in (None, "")]
+        if missing:
+            raise ValueError(f"Missing fields: {', '.join(missing)}.")
+        return [data[name] for name in names]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Flight system HTTP/JSON service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080, help="port to listen on (0 picks a free one)")
+    parser.add_argument("--db", default=DATABASE_PATH, help="database file (default: flights.db)")
+    parser.add_argument("--workers", type=int, default=SERVICE_WORKERS, help="number of reader threads")
+    args = parser.parse_args()
+
+    service = FlightService(args.db, args.workers)
+    try:
+        asyncio.run(service.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.close()
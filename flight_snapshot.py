@@ -0,0 +1,191 @@
+import argparse
+import json
+import os
+
+import numpy as np
+
+from connection import ConnectionFactory, ConnectionUser, DATABASE_PATH
+from flight_archive import attach_history
+
+SNAPSHOT_DIR = "flight_snapshot" #one .npy file per column, plus manifest.json
+SNAPSHOT_BATCH_SIZE = 50_000 #rows read from the database at a time during a refresh
+
+# The flight history as columnar NumPy arrays on disk, for analysis that would be too slow through Python tuples.
+# Text columns are dictionary-encoded: airports, statuses and aircraft are stored as small integer codes, and the
+# manifest holds the list each code indexes into. departure is minutes since 1970 (numpy datetime64[m] as int64).
+# Flights are stored in flight_id order, and their pilots in separate pilot_flight_id / pilot_id columns.
+#
+# A refresh only reads flights with a flight_id above the highest one already exported. Flights already in the snapshot
+# are not re-read, so later status changes and deletes only show up after a rebuild (refresh(rebuild=True)).
+# Flights are read through the all_flight and all_flight_pilot views (see flight_archive.py), so archiving flights
+# neither removes them from the snapshot nor forces a rebuild.
+FLIGHT_ARRAYS = {
+    "flight_id": np.int64,
+    "departure": np.int64,
+    "origin": np.int16,
+    "destination": np.int16,
+    "status": np.int8,
+    "aircraft": np.int16, #-1 when the flight has no aircraft
+}
+PILOT_ARRAYS = {
+    "pilot_flight_id": np.int64,
+    "pilot_id": np.int32,
+}
+DICTIONARIES = ("airport", "status", "aircraft")
+
+
+#Loads a snapshot with every column memory-mapped read-only, so only the pages a calculation touches are read from disk
+def load_snapshot(folder=SNAPSHOT_DIR):
+    return Snapshot(folder)
+
+
+class Snapshot:
+    def __init__(self, folder=SNAPSHOT_DIR, empty=False):
+        self.folder = folder
+        manifest_path = os.path.join(folder, "manifest.json")
+        if os.path.exists(manifest_path) and not empty:
+            with open(manifest_path, encoding="utf-8") as manifest_file:
+                self.manifest = json.load(manifest_file)
+        else:
+            self.manifest = {"last_flight_id": 0, "flights": 0, "pilots": 0, "dictionaries": {name: [] for name in DICTIONARIES}}
+
+        self.columns = {}
+        for names, rows in ((FLIGHT_ARRAYS, self.manifest["flights"]), (PILOT_ARRAYS, self.manifest["pilots"])):
+            for name, dtype in names.items():
+                path = os.path.join(folder, f"{name}.npy")
+                #a column file can be longer than the manifest says if a refresh was interrupted, so it is cut to length
+                self.columns[name] = np.load(path, mmap_mode="r")[:rows] if rows else np.empty(0, dtype)
+
+    @property
+    def last_flight_id(self):
+        return self.manifest["last_flight_id"]
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    def __len__(self):
+        return self.manifest["flights"]
+
+#Returns the values that the codes of a dictionary-encoded column stand for, e.g. decode("airport", snapshot["origin"])
+    def decode(self, dictionary, codes):
+        values = np.array(self.manifest["dictionaries"][dictionary], dtype=object)
+        return values[np.asarray(codes)]
+
+#Returns the departure column as numpy datetime64 values
+    def departures(self):
+        return np.asarray(self.columns["departure"]).astype("datetime64[m]")
+
+
+class FlightSnapshot(ConnectionUser):
+    def __init__(self, connections, folder=SNAPSHOT_DIR):
+        super().__init__(connections)
+        self.folder = folder
+
+#1. Adds every flight with a flight_id above the highest one already exported to the snapshot, or exports everything
+#again if rebuild is True or flights have been deleted since the last refresh. Returns the number of flights added.
+    def refresh(self, rebuild=False):
+        os.makedirs(self.folder, exist_ok=True)
+        snapshot = Snapshot(self.folder)
+        attach_history(self.conn, self.connections.path)
+
+        #live flights are read first: the archive job commits the history file before the live one, so a flight it is
+        #moving is then seen in both files (and the counts differ, forcing a rebuild next time) but never in neither
+        self.cursor.execute("BEGIN") #both tables are read from the same version of the database
+        try:
+            self.cursor.execute("SELECT COUNT(*) FROM all_flight WHERE flight_id <= ?", (snapshot.last_flight_id,))
+            if rebuild or self.cursor.fetchone()[0] != len(snapshot):
+                snapshot = Snapshot(self.folder, empty=True) #start again from nothing
+
+            self.cursor.execute("SELECT COALESCE(MAX(flight_id), 0) FROM all_flight")
+            max_flight_id = self.cursor.fetchone()[0]
+            flights = self.read_flights(snapshot, max_flight_id)
+            pilots = self.read_pilots(snapshot, max_flight_id)
+        finally:
+            self.conn.rollback() #nothing was written; this just ends the read transaction
+
+        self.write(snapshot, flights, pilots, max(max_flight_id, snapshot.last_flight_id))
+        return len(flights["flight_id"])
+
+#Reads and encodes the new flights in batches
+    def read_flights(self, snapshot, max_flight_id):
+        dictionaries = snapshot.manifest["dictionaries"]
+        codes = {name: {value: code for code, value in enumerate(dictionaries[name])} for name in DICTIONARIES}
+
+        def encode(dictionary, value):
+            if value is None:
+                return -1
+            code = codes[dictionary].get(value)
+            if code is None:
+                code = codes[dictionary][value] = len(dictionaries[dictionary])
+                dictionaries[dictionary].append(value)
+            return code
+
+        batches = {name: [] for name in FLIGHT_ARRAYS}
+        export_cursor = self.conn.cursor()
+        export_cursor.execute("""
+            SELECT flight_id, departure_at, origin_id, destination_id, status, aircraft_id
+            FROM all_flight
+            WHERE flight_id > ? AND flight_id <= ?
+            ORDER BY flight_id
+        """, (snapshot.last_flight_id, max_flight_id))
+        while rows := export_cursor.fetchmany(SNAPSHOT_BATCH_SIZE):
+            flight_ids, departures, origins, destinations, statuses, aircraft = zip(*rows)
+            batches["flight_id"].append(np.array(flight_ids, dtype=np.int64))
+            batches["departure"].append(np.array(departures, dtype="datetime64[m]").astype(np.int64))
+            batches["origin"].append(np.array([encode("airport", code) for code in origins], dtype=np.int16))
+            batches["destination"].append(np.array([encode("airport", code) for code in destinations], dtype=np.int16))
+            batches["status"].append(np.array([encode("status", status) for status in statuses], dtype=np.int8))
+            batches["aircraft"].append(np.array([encode("aircraft", aircraft_id) for aircraft_id in aircraft], dtype=np.int16))
+        export_cursor.close()
+
+        return {name: np.concatenate(batches[name]) if batches[name] else np.empty(0, dtype) for name, dtype in FLIGHT_ARRAYS.items()}
+
+#Reads the pilots of the new flights, in (flight_id, pilot_id) order, which is flight_pilot's primary key order
+    def read_pilots(self, snapshot, max_flight_id):
+        export_cursor = self.conn.cursor()
+        export_cursor.execute("""
+            SELECT flight_id, pilot_id
+            FROM all_flight_pilot
+            WHERE flight_id > ? AND flight_id <= ?
+            ORDER BY flight_id, pilot_id
+        """, (snapshot.last_flight_id, max_flight_id))
+        pairs = np.array(export_cursor.fetchall(), dtype=np.int64).reshape(-1, 2)
+        export_cursor.close()
+        return {"pilot_flight_id": pairs[:, 0], "pilot_id": pairs[:, 1].astype(np.int32)}
+
+#Appends the new rows to each column file, then writes the manifest. Each column is written to a temporary file that
+#replaces the old one, and the manifest is replaced last, so an interrupted incremental refresh leaves the previous
+#snapshot readable (the old rows are copied unchanged and the manifest still has the old lengths).
+    def write(self, snapshot, flights, pilots, last_flight_id):
+        for names, new_rows in ((FLIGHT_ARRAYS, flights), (PILOT_ARRAYS, pilots)):
+            for name, dtype in names.items():
+                old = snapshot.columns[name]
+                path = os.path.join(self.folder, f"{name}.npy")
+                column = np.lib.format.open_memmap(f"{path}.tmp", mode="w+", dtype=dtype, shape=(len(old) + len(new_rows[name]),))
+                column[:len(old)] = old
+                column[len(old):] = new_rows[name]
+                column.flush()
+                del column, old
+                snapshot.columns[name] = None #release the memory map so the file can be replaced on Windows
+                os.replace(f"{path}.tmp", path)
+
+        manifest = dict(snapshot.manifest, last_flight_id=last_flight_id,
+                        flights=snapshot.manifest["flights"] + len(flights["flight_id"]),
+                        pilots=snapshot.manifest["pilots"] + len(pilots["pilot_id"]))
+        manifest_path = os.path.join(self.folder, "manifest.json")
+        with open(f"{manifest_path}.tmp", "w", encoding="utf-8") as manifest_file:
+            json.dump(manifest, manifest_file)
+        os.replace(f"{manifest_path}.tmp", manifest_path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export the flight history to a columnar NumPy snapshot")
+    parser.add_argument("--db", default=DATABASE_PATH, help="database file (default: flights.db)")
+    parser.add_argument("--folder", default=SNAPSHOT_DIR, help="snapshot folder (default: flight_snapshot)")
+    parser.add_argument("--rebuild", action="store_true", help="export every flight again instead of only new ones")
+    args = parser.parse_args()
+
+    connections = ConnectionFactory(args.db)
+    added = FlightSnapshot(connections, args.folder).refresh(rebuild=args.rebuild)
+    connections.close_all()
+    print(f"{added} flights added to the snapshot in '{args.folder}'.")
@@ -1,23 +1,40 @@
-import sqlite3
+from functools import cached_property
 
-from pilot_information import PilotInformation
-from flight_manager import FlightManager 
-from destination_manager import DestinationManager
-from aircraft import AircraftManager
-from analytics import Analytics
+from connection import ConnectionFactory
+from migrations import run_migrations
 
 class FlightSystemCLI:
     def __init__(self):
-        self.conn = sqlite3.connect("flights.db") 
+        self.connections = ConnectionFactory("flights.db") #tuned connections, one per thread
+        run_migrations(self.connections.get()) #bring older databases up to the current schema before anything reads them
 
-#pass a connection to each management class 
+#Each management class is imported and created (with the connection factory) the first time its menu is used,
+#so the main menu appears without waiting for modules the user may never open.
+    @cached_property
+    def pilot_info(self):
+        from pilot_information import PilotInformation
+        return PilotInformation(self.connections)
+
+    @cached_property
+    def flight_manager(self):
+        from flight_manager import FlightManager
+        return FlightManager(self.connections)
+
+    @cached_property
+    def destination_manager(self):
+        from destination_manager import DestinationManager
+        return DestinationManager(self.connections)
+
+    @cached_property
+    def aircraft_manager(self):
+        from aircraft import AircraftManager
+        return AircraftManager(self.connections)
+
+    @cached_property
+    def analytics(self):
+        from analytics import Analytics
+        return Analytics(self.connections)
 
-        self.pilot_info = PilotInformation(self.conn)
-        self.flight_manager = FlightManager(self.conn)
-        self.destination_manager = DestinationManager(self.conn)
-        self.aircraft_manager = AircraftManager(self.conn)
-        self.analytics = Analytics(self.conn)
-        
 
     def run(self):
         while True:
@@ -54,7 +71,8 @@ class FlightSystemCLI:
             print("2. Add a New Destination")
             print("3. Update a Destination")
             print("4. Delete a Destination")
-            print("5. Return to Main Menu")
+            print("5. Search Destinations")
+            print("6. Return to Main Menu")
 
             choice = input("Select the number and press Enter: ")
             if choice == '1':
@@ -68,6 +86,8 @@ class FlightSystemCLI:
             elif choice == '4':
                 print("on hold")
             elif choice == '5':
+                self.destination_manager.search_destination()
+            elif choice == '6':
                 break
             else:
                 print("Invalid. Please try again.")
@@ -79,7 +99,9 @@ class FlightSystemCLI:
             print("\n--- Pilot Information Menu ---")
             print("1. Pilot Information")
             print("2. Pilot Schedule")
-            print("3. Return to Main Menu")
+            print("3. Search Pilots")
+            print("4. Export Rosters")
+            print("5. Return to Main Menu")
 
             choice = input("Select the number and press Enter: ")
             if choice == '1':
@@ -87,6 +109,10 @@ class FlightSystemCLI:
             elif choice == '2':
                 self.pilot_info.view_pilot_schedule()
             elif choice == '3':
+                self.pilot_info.search_pilot()
+            elif choice == '4':
+                self.pilot_info.export_roster()
+            elif choice == '5':
                 break
             else:
                 print("Invalid. Please try again.")
@@ -99,7 +125,9 @@ class FlightSystemCLI:
             print("2. View Flights by Criteria")
             print("3. Update a Flight")
             print("4. Delete a Flight")
-            print("5. Return to Flights Menu")
+            print("5. Auto-assign Pilots and Aircraft for a Period")
+            print("6. Delay or Cancel Flights in Bulk")
+            print("7. Return to Flights Menu")
 
             choice = input("Select the number and press Enter: ")
             if choice == '1':
@@ -111,6 +139,10 @@ class FlightSystemCLI:
             elif choice == '4':
                 self.flight_manager.delete_flight()
             elif choice == '5':
+                self.flight_manager.auto_assign_flights()
+            elif choice == '6':
+                self.flight_manager.disrupt_flights()
+            elif choice == '7':
                 print("Return to Flights Menu")
                 break
             else:
@@ -120,10 +152,12 @@ class FlightSystemCLI:
         while True:
             print("\n--- Retrieve Flight ---")
             print("1. By Flight ID")
-            print("2. By Date")
+            print("2. By Date Range")
             print("3. By Status")
             print("4. Flight Records: Choose Columns to Display")
-            print("5. Return to Flights Menu")
+            print("5. Export Flight Records (CSV / JSONL)")
+            print("6. Connecting Itineraries Between Two Airports")
+            print("7. Return to Flights Menu")
 
             choice = input("Choose a search method and press Enter: ").strip()
 
@@ -136,6 +170,10 @@ class FlightSystemCLI:
             elif choice == '4':
                 self.flight_manager.view_flights()
             elif choice == '5':
+                self.flight_manager.export_flight_records()
+            elif choice == '6':
+                self.flight_manager.search_itineraries()
+            elif choice == '7':
                 break
             else:
                 print("Invalid. Please try again.")
@@ -168,7 +206,9 @@ class FlightSystemCLI:
                 print("\n--- Reports ---")
                 print("1. Flight and Destination Report")
                 print("2. Pilot Workload Report")
-                print("3. Return to Main Menu")
+                print("3. Pilot Duty Load Report")
+                print("4. SQL Profile")
+                print("5. Return to Main Menu")
 
                 choice = input("Choose a search method and press Enter: ").strip()
 
@@ -177,11 +217,15 @@ class FlightSystemCLI:
                 elif choice == '2':
                     self.analytics.pilot_report()
                 elif choice == '3':
+                    self.analytics.duty_report()
+                elif choice == '4':
+                    self.analytics.sql_profile()
+                elif choice == '5':
                     break
                 else:
                     print("Invalid. Please try again.")
 
     def close(self):
-        self.conn.close()
+        self.connections.close_all()
 
   
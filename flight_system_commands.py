@@ -0,0 +1,350 @@
+import argparse
+import contextlib
+import csv
+import json
+import shlex
+import sqlite3
+import sys
+from datetime import date
+from functools import cached_property
+
+from connection import ConnectionFactory, DATABASE_PATH
+from flight_archive import history_path
+from flight_dates import DATE_FORMAT, normalise_date
+from flight_manager import FLIGHT_STATUSES
+from migrations import run_migrations
+from route_network import MAX_ITINERARY_LEGS, MIN_CONNECTION_MINUTES
+from sql_profiler import SQLProfiler
+from text_search import SEARCH_LIMIT
+
+# Non-interactive commands for scripts and automation, alongside the interactive menu in flight_system_cli.py:
+#   python main.py flights search --from 01/07/2025 --to 31/07/2025 --status Delayed
+#   python main.py flights add --origin LHR --destination CDG --date 01/09/2025 --time 10:00 --pilot 1243 --aircraft 101
+#   python main.py flights import schedule.csv
+#   python main.py flights assign --from 01/09/2025 --to 30/09/2025
+#   python main.py flights disrupt --from 01/09/2025 --to 02/09/2025 --airport LHR --delay 90
+#   python main.py flights archive --before 01/01/2025
+#   python main.py flights connections --origin LHR --destination SYD --date 01/09/2025 --max-legs 3
+#   python main.py --format csv pilots schedule 1243
+#   python main.py pilots search "ali smi"
+#   python main.py pilots roster --from 01/09/2025 --to 07/09/2025 --output rosters --per-pilot
+#   python main.py destinations search heath
+#   python main.py report flight
+#   python main.py report duty --date 31/07/2025 --max-7-days 5
+#   python main.py batch < commands.txt
+#   python main.py --profile profile.json flights search --from 01/07/2025 (time every SQL statement, see sql_profiler.py)
+# Each command writes its result to stdout as JSON (default) or CSV. Messages the managers print go to stderr.
+# In batch mode, every line read from stdin is one command and they all run in a single session (one connection, one
+# migration check); JSON results are written one per line.
+
+FLIGHT_FIELDS = ["flight_id", "origin_id", "destination_id", "flight_date", "flight_time", "status"]
+SCHEDULE_FIELDS = ["flight_id", "flight_date", "flight_time", "origin_id", "destination_id", "status"]
+DUTY_FIELDS = ["pilot_id", "first_name", "last_name", "flights_7_days", "flights_28_days", "days_since_rest"]
+RESULT_FIELDS = ["row", "accepted", "flight_id", "reason"]
+DISRUPTION_FIELDS = FLIGHT_FIELDS + ["pilot_ids"]
+LEG_FIELDS = ["option", "legs", "duration_minutes", "flight_id", "origin_id", "destination_id", "departure_at", "arrival_at"]
+PILOT_MATCH_FIELDS = ["pilot_id", "first_name", "last_name", "license_number", "nationality"]
+DESTINATION_FIELDS = ["name", "city", "country", "iata_code"]
+SPEC_FIELDS = ["origin_id", "destination_id", "flight_date", "flight_time", "status", "pilot_id", "aircraft_id", "block_minutes"]
+
+
+class FlightSystemCommands:
+    def __init__(self, db_path=DATABASE_PATH, output=sys.stdout, profiler=None):
+        self.connections = ConnectionFactory(db_path, profiler)
+        run_migrations(self.connections.get())
+        self.output = output
+        self.parser = build_parser()
+
+    @cached_property
+    def flight_manager(self):
+        from flight_manager import FlightManager
+        return FlightManager(self.connections)
+
+    @cached_property
+    def pilot_info(self):
+        from pilot_information import PilotInformation
+        return PilotInformation(self.connections)
+
+    @cached_property
+    def destination_manager(self):
+        from destination_manager import DestinationManager
+        return DestinationManager(self.connections)
+
+    @cached_property
+    def analytics(self):
+        from analytics import Analytics
+        return Analytics(self.connections)
+
+#1. Runs one parsed command and writes its result. Returns True if it succeeded.
+#A database error (e.g. the database is locked) fails this command only, so a batch carries on with the next one.
+    def execute(self, args, command_text=""):
+        try:
+            with contextlib.redirect_stdout(sys.stderr): #keep manager messages out of the machine-readable output
+                columns, rows = args.handler(self, args)
+        except (ValueError, OSError) as e:
+            self.write_error(command_text, str(e), args.format)
+            return False
+        except sqlite3.Error as e:
+            conn = self.connections.get()
+            if conn.in_transaction:
+                conn.rollback()
+            self.write_error(command_text, f"Database error: {e}", args.format)
+            return False
+
+        self.write_result(command_text, columns, rows, args.format)
+        return True
+
+#2. Runs every command read from lines (e.g. stdin) in this session. Returns the number of commands that failed.
+    def run_batch(self, lines, default_format):
+        failed = 0
+        for line in lines:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            try:
+                args = self.parser.parse_args(["--format", default_format, *shlex.split(line)])
+                if args.command == "batch":
+                    raise ValueError("batch cannot be used inside a batch")
+            except (SystemExit, ValueError) as e:
+                self.write_error(line, str(e) if isinstance(e, ValueError) else "invalid command", default_format)
+                failed += 1
+                continue
+
+            if not self.execute(args, line):
+                failed += 1
+        return failed
+
+    def write_result(self, command_text, columns, rows, output_format):
+        if output_format == "csv":
+            writer = csv.writer(self.output)
+            writer.writerow(columns)
+            writer.writerows(rows)
+        else:
+            records = [dict(zip(columns, row)) for row in rows]
+            self.output.write(json.dumps({"command": command_text, "rows": records}) + "\n")
+        self.output.flush()
+
+    def write_error(self, command_text, message, output_format):
+        if output_format == "csv":
+            csv.writer(self.output).writerows([["error"], [message]])
+        else:
+            self.output.write(json.dumps({"command": command_text, "error": message}) + "\n")
+        self.output.flush()
+
+#3. Command handlers. Each returns (column names, rows) or raises ValueError with a message for the user.
+    def search_flights(self, args):
+        start_date, end_date = self.date_range(args)
+        airport = args.airport.upper() if args.airport else None
+        return FLIGHT_FIELDS, self.flight_manager.find_flights(start_date, end_date, args.status, airport)
+
+    def assign_flights(self, args):
+        start_date, end_date = self.date_range(args)
+        summary = self.flight_manager.auto_assign(start_date, end_date)
+        return list(summary), [list(summary.values())]
+
+#one row per changed flight, with the IDs of its pilots separated by spaces
+    def disrupt_flights(self, args):
+        start_date, end_date = self.date_range(args)
+        airport = args.airport.upper() if args.airport else None
+        status = "Cancelled" if args.cancel else "Delayed"
+        disruption = self.flight_manager.apply_disruption(start_date, end_date, airport, args.aircraft, status, args.delay or 0)
+        return DISRUPTION_FIELDS, [[*flight[:6], " ".join(map(str, flight[6]))] for flight in disruption["flights"]]
+
+    def archive_flights(self, args):
+        try:
+            before_date = normalise_date(args.before)
+        except ValueError:
+            raise ValueError("Invalid date format. Please enter as DD/MM/YYYY.") from None
+        flights, pilot_rows = self.flight_manager.archive_flights(before_date, args.history)
+        return ["flights", "pilot_rows", "history"], [[flights, pilot_rows, args.history or history_path(self.connections.path)]]
+
+#one row per flight of each itinerary, numbered by option
+    def itineraries(self, args):
+        itineraries = self.flight_manager.find_itineraries(args.origin.upper(), args.destination.upper(), args.date, args.time,
+                                                           args.min_connection, args.max_legs)
+        rows = []
+        for option, itinerary in enumerate(itineraries, start=1):
+            for leg in itinerary["flights"]:
+                rows.append([option, itinerary["legs"], itinerary["duration_minutes"], *leg.values()])
+        return LEG_FIELDS, rows
+
+    def date_range(self, args):
+        try:
+            return normalise_date(args.start_date), normalise_date(args.end_date or args.start_date)
+        except ValueError:
+            raise ValueError("Invalid date format. Please enter as DD/MM/YYYY.") from None
+
+    def add_flight(self, args):
+        spec = {
+            "origin_id": args.origin,
+            "destination_id": args.destination,
+            "flight_date": args.date,
+            "flight_time": args.time,
+            "status": args.status,
+            "pilot_id": args.pilot,
+            "aircraft_id": args.aircraft,
+            "block_minutes": args.block_minutes,
+        }
+        columns, rows = self.schedule([spec])
+        if not rows[0][1]:
+            raise ValueError(rows[0][3])
+        return columns, rows
+
+    def import_flights(self, args):
+        with open(args.path, newline="", encoding="utf-8") as spec_file:
+            if args.path.lower().endswith(".csv"):
+                specs = list(csv.DictReader(spec_file))
+            else:
+                specs = [json.loads(line) for line in spec_file if line.strip()]
+        return self.schedule(specs)
+
+    def schedule(self, specs):
+        results = self.flight_manager.schedule_flights(specs)
+        return RESULT_FIELDS, [[result[field] for field in RESULT_FIELDS] for result in results]
+
+    def pilot_schedule(self, args):
+        return SCHEDULE_FIELDS, self.pilot_info.pilot_schedule(args.pilot_id)
+
+    def export_rosters(self, args):
+        start_date, end_date = self.date_range(args)
+        pilots, flights = self.pilot_info.export_rosters(start_date, end_date, args.output, args.file_format, args.per_pilot)
+        return ["pilots", "flights", "path"], [[pilots, flights, args.output]]
+
+    def search_pilots(self, args):
+        return PILOT_MATCH_FIELDS, self.pilot_info.search_pilots(args.text, args.limit)
+
+    def search_destinations(self, args):
+        return DESTINATION_FIELDS, self.destination_manager.search_destinations(args.text, args.limit)
+
+    def report(self, args):
+        if args.report == "duty":
+            return self.duty_report(args)
+        if args.report == "flight":
+            path = self.analytics.flight_report()
+        else:
+            path = self.analytics.pilot_report()
+        return ["report", "path"], [[args.report, path]]
+
+    def duty_report(self, args):
+        from pilot_workload import MAX_DAYS_WITHOUT_REST, MAX_FLIGHTS_28_DAYS, MAX_FLIGHTS_7_DAYS
+        try:
+            day = normalise_date(args.date) if args.date else date.today().strftime(DATE_FORMAT)
+        except ValueError:
+            raise ValueError("Invalid date format. Please enter as DD/MM/YYYY.") from None
+        limits = (
+            MAX_FLIGHTS_7_DAYS if args.max_7_days is None else args.max_7_days,
+            MAX_FLIGHTS_28_DAYS if args.max_28_days is None else args.max_28_days,
+            MAX_DAYS_WITHOUT_REST if args.max_days_without_rest is None else args.max_days_without_rest,
+        )
+        return DUTY_FIELDS, self.analytics.flagged_pilots(day, *limits)
+
+
+#Builds the argument parser for main.py's subcommands
+def build_parser():
+    parser = argparse.ArgumentParser(prog="main.py", description="Flight Management System. Run without arguments for the interactive menu.")
+    parser.add_argument("--db", default=DATABASE_PATH, help="database file (default: flights.db)")
+    parser.add_argument("--format", choices=["json", "csv"], default="json", help="output format (default: json)")
+    parser.add_argument("--profile", metavar="PATH", help="time every SQL statement and write the profile to this JSON file")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    flights = commands.add_parser("flights", help="search and add flights").add_subparsers(dest="action", required=True)
+
+    search = flights.add_parser("search", help="flights departing in a date range")
+    search.add_argument("--from", dest="start_date", required=True, help="first date (DD/MM/YYYY)")
+    search.add_argument("--to", dest="end_date", help="last date (DD/MM/YYYY), default: the --from date")
+    search.add_argument("--status", choices=FLIGHT_STATUSES)
+    search.add_argument("--airport", help="origin or destination IATA code")
+    search.set_defaults(handler=FlightSystemCommands.search_flights)
+
+    add = flights.add_parser("add", help="schedule one flight")
+    add.add_argument("--origin", required=True, help="origin IATA code")
+    add.add_argument("--destination", required=True, help="destination IATA code")
+    add.add_argument("--date", required=True, help="departure date (DD/MM/YYYY)")
+    add.add_argument("--time", required=True, help="departure time (HH:MM)")
+    add.add_argument("--status", choices=FLIGHT_STATUSES, default="Scheduled")
+    add.add_argument("--pilot", help="pilot ID (leave out to assign one later with flights assign)")
+    add.add_argument("--aircraft", help="aircraft ID (leave out to assign one later with flights assign)")
+    add.add_argument("--block-minutes", type=int, help="minutes from departure to arrival (default: 120)")
+    add.set_defaults(handler=FlightSystemCommands.add_flight)
+
+    import_ = flights.add_parser("import", help="schedule every flight in a CSV or JSON Lines file in one transaction")
+    import_.add_argument("path", help=f"file with the columns {', '.join(SPEC_FIELDS)}")
+    import_.set_defaults(handler=FlightSystemCommands.import_flights)
+
+    assign = flights.add_parser("assign", help="give aircraft and pilots to the flights in a date range that have none")
+    assign.add_argument("--from", dest="start_date", required=True, help="first date (DD/MM/YYYY)")
+    assign.add_argument("--to", dest="end_date", help="last date (DD/MM/YYYY), default: the --from date")
+    assign.set_defaults(handler=FlightSystemCommands.assign_flights)
+
+    disrupt = flights.add_parser("disrupt", help="delay or cancel every flight in a date range, e.g. from or to a closed airport")
+    disrupt.add_argument("--from", dest="start_date", required=True, help="first date (DD/MM/YYYY)")
+    disrupt.add_argument("--to", dest="end_date", help="last date (DD/MM/YYYY), default: the --from date")
+    disrupt.add_argument("--airport", help="only flights from or to this IATA code")
+    disrupt.add_argument("--aircraft", type=int, help="only flights flown by this aircraft ID")
+    disruption = disrupt.add_mutually_exclusive_group(required=True)
+    disruption.add_argument("--delay", type=int, metavar="MINUTES", help="mark the flights Delayed and move their departures by MINUTES (0 to only mark them)")
+    disruption.add_argument("--cancel", action="store_true", help="cancel the flights")
+    disrupt.set_defaults(handler=FlightSystemCommands.disrupt_flights)
+
+    archive = flights.add_parser("archive", help="move flights that departed before a date into the history database")
+    archive.add_argument("--before", required=True, help="archive flights departing before this date (DD/MM/YYYY)")
+    archive.add_argument("--history", help="history file (default: the database name with _history added)")
+    archive.set_defaults(handler=FlightSystemCommands.archive_flights)
+
+    connections = flights.add_parser("connections", help="fastest itineraries between two airports, with connecting flights")
+    connections.add_argument("--origin", required=True, help="origin IATA code")
+    connections.add_argument("--destination", required=True, help="destination IATA code")
+    connections.add_argument("--date", required=True, help="earliest departure date (DD/MM/YYYY)")
+    connections.add_argument("--time", default="00:00", help="earliest departure time (HH:MM), default: 00:00")
+    connections.add_argument("--min-connection", type=int, default=MIN_CONNECTION_MINUTES, help=f"minutes between flights (default: {MIN_CONNECTION_MINUTES})")
+    connections.add_argument("--max-legs", type=int, default=MAX_ITINERARY_LEGS, help=f"most flights in an itinerary (default: {MAX_ITINERARY_LEGS})")
+    connections.set_defaults(handler=FlightSystemCommands.itineraries)
+
+    pilots = commands.add_parser("pilots", help="pilot schedules, search and rosters").add_subparsers(dest="action", required=True)
+    schedule = pilots.add_parser("schedule", help="a pilot's flights in departure order")
+    schedule.add_argument("pilot_id", type=int)
+    schedule.set_defaults(handler=FlightSystemCommands.pilot_schedule)
+
+    pilot_search = pilots.add_parser("search", help="pilots whose name, licence number or nationality start with the words given")
+    pilot_search.add_argument("text")
+    pilot_search.add_argument("--limit", type=int, default=SEARCH_LIMIT, help=f"most matches returned (default: {SEARCH_LIMIT})")
+    pilot_search.set_defaults(handler=FlightSystemCommands.search_pilots)
+
+    roster = pilots.add_parser("roster", help="export every pilot's schedule for a date range in one pass")
+    roster.add_argument("--from", dest="start_date", required=True, help="first date (DD/MM/YYYY)")
+    roster.add_argument("--to", dest="end_date", help="last date (DD/MM/YYYY), default: the --from date")
+    roster.add_argument("--output", required=True, help="file to write, or folder with --per-pilot")
+    roster.add_argument("--per-pilot", action="store_true", help="write one roster_<pilot_id> file per pilot")
+    roster.add_argument("--file-format", choices=["csv", "jsonl"], default="csv", help="roster file format (default: csv)")
+    roster.set_defaults(handler=FlightSystemCommands.export_rosters)
+
+    destinations = commands.add_parser("destinations", help="destination search").add_subparsers(dest="action", required=True)
+    destination_search = destinations.add_parser("search", help="airports whose name, city, country or IATA code start with the words given")
+    destination_search.add_argument("text")
+    destination_search.add_argument("--limit", type=int, default=SEARCH_LIMIT, help=f"most matches returned (default: {SEARCH_LIMIT})")
+    destination_search.set_defaults(handler=FlightSystemCommands.search_destinations)
+
+    report = commands.add_parser("report", help="draw a report chart and print its file name, or list pilots over the duty limits")
+    report.add_argument("report", choices=["flight", "pilot", "duty"])
+    report.add_argument("--date", help="duty: the date to check (DD/MM/YYYY), default: today")
+    report.add_argument("--max-7-days", type=int, help="duty: most flights allowed in 7 days")
+    report.add_argument("--max-28-days", type=int, help="duty: most flights allowed in 28 days")
+    report.add_argument("--max-days-without-rest", type=int, help="duty: most consecutive days with flights")
+    report.set_defaults(handler=FlightSystemCommands.report)
+
+    commands.add_parser("batch", help="read one command per line from stdin and run them all in one session")
+    return parser
+
+
+#Entry point used by main.py when it is given arguments. Returns the process exit code.
+def main(argv):
+    args = build_parser().parse_args(argv)
+    commands = FlightSystemCommands(args.db, profiler=SQLProfiler() if args.profile else None)
+    try:
+        if args.command == "batch":
+            return 1 if commands.run_batch(sys.stdin, args.format) else 0
+        return 0 if commands.execute(args, shlex.join(argv)) else 1
+    finally:
+        commands.connections.close_all() #closing finishes the profiled calls still in progress
+        if args.profile:
+            commands.connections.profiler.dump(args.profile)
@@ -1,4 +1,6 @@
 
+import sys
+
 from flight_system_cli import FlightSystemCLI
 
 # This Class creates an app object that initializes and runs the FlightSystemCLI class, starting the menu system when the script is executed directly.
@@ -9,6 +11,11 @@ class MainApp:
     def run(self):
         self.cli.run()
 
+# With arguments (e.g. "python main.py flights search --from 01/07/2025"), one scripted command is run instead of the menu.
+# See flight_system_commands.py for the commands.
 if __name__ == "__main__":
+    if sys.argv[1:]:
+        from flight_system_commands import main
+        sys.exit(main(sys.argv[1:]))
     app = MainApp()
     app.run()
\ No newline at end of file
@@ -0,0 +1,376 @@
+import sqlite3
+
+from flight_dates import departure_timestamp
+from reference_data import REFERENCE_TABLES
+from report_summaries import rebuild_summaries
+from text_search import SEARCH_INDEXES, rebuild_search_index, rebuild_search_indexes
+
+BACKFILL_BATCH_SIZE = 50_000 #flights read and updated at a time by migration 1
+
+# Schema changes made after the tables were first created in tables.ipynb.
+# Each migration runs once, in order, inside its own transaction. The number of migrations already applied
+# is stored in the database header with PRAGMA user_version.
+
+#1. Adds a sortable departure timestamp (YYYY-MM-DD HH:MM) to every flight, plus an index for date-range searches
+def add_departure_timestamp(cursor):
+    cursor.execute("ALTER TABLE flight ADD COLUMN departure_at TEXT")
+
+    #filled in batches of flight IDs, so a large flight table is never held in memory at once
+    last_flight_id = None
+    while True:
+        cursor.execute("""
+            SELECT flight_id, flight_date, flight_time FROM flight
+            WHERE ? IS NULL OR flight_id > ?
+            ORDER BY flight_id
+            LIMIT ?
+        """, (last_flight_id, last_flight_id, BACKFILL_BATCH_SIZE))
+        rows = cursor.fetchall()
+        if not rows:
+            break
+        last_flight_id = rows[-1][0]
+
+        backfill = []
+        for flight_id, flight_date, flight_time in rows:
+            try:
+                backfill.append((departure_timestamp(flight_date, flight_time), flight_id))
+            except (TypeError, ValueError):
+                continue #badly formatted rows are left without a timestamp rather than stopping the migration
+        cursor.executemany("UPDATE flight SET departure_at = ? WHERE flight_id = ?", backfill)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_flight_departure_at ON flight (departure_at)")
+
+#2. Adds secondary indexes for the availability checks, status search, pilot schedules and destination deletes
+def add_hot_query_indexes(cursor):
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_flight_date_aircraft ON flight (flight_date, aircraft_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_flight_status_departure ON flight (status, departure_at)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_flight_origin_departure ON flight (origin_id, departure_at)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_flight_destination_departure ON flight (destination_id, departure_at)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_flight_pilot_pilot ON flight_pilot (pilot_id, flight_id)")
+
+# The tables rebuilt as STRICT tables by migration 3, with matching key types: aircraft_id and pilot_id are INTEGER everywhere
+STRICT_TABLES = {
+    "airport": """
+        CREATE TABLE new_airport (
+            iata_code TEXT PRIMARY KEY,
+            name TEXT NOT NULL,
+            city TEXT NOT NULL,
+            country TEXT NOT NULL
+        ) STRICT
+    """,
+    "aircraft": """
+        CREATE TABLE new_aircraft (
+            aircraft_id INTEGER PRIMARY KEY,
+            model TEXT NOT NULL,
+            capacity INTEGER NOT NULL,
+            manufacturer TEXT NOT NULL,
+            registration_number TEXT UNIQUE
+        ) STRICT
+    """,
+    "pilot": """
+        CREATE TABLE new_pilot (
+            pilot_id INTEGER PRIMARY KEY,
+            first_name TEXT NOT NULL,
+            last_name TEXT NOT NULL,
+            experience_years INTEGER,
+            date_of_birth TEXT NOT NULL,
+            nationality TEXT,
+            phone_number TEXT,
+            email TEXT NOT NULL,
+            passport_number TEXT NOT NULL,
+            license_number TEXT NOT NULL,
+            first_line_of_address TEXT NOT NULL,
+            town_city TEXT,
+            county TEXT,
+            country TEXT,
+            postcode TEXT NOT NULL,
+            work_eligibility TEXT NOT NULL
+        ) STRICT
+    """,
+    "flight": """
+        CREATE TABLE new_flight (
+            flight_id INTEGER PRIMARY KEY,
+            origin_id TEXT NOT NULL,
+            destination_id TEXT NOT NULL,
+            aircraft_id INTEGER,
+            flight_date TEXT NOT NULL,
+            flight_time TEXT NOT NULL,
+            status TEXT NOT NULL CHECK (status IN ('Scheduled', 'Delayed', 'Cancelled')),
+            departure_at TEXT,
+            FOREIGN KEY (origin_id) REFERENCES airport(iata_code),
+            FOREIGN KEY (destination_id) REFERENCES airport(iata_code),
+            FOREIGN KEY (aircraft_id) REFERENCES aircraft(aircraft_id)
+        ) STRICT
+    """,
+    "flight_pilot": """
+        CREATE TABLE new_flight_pilot (
+            flight_id INTEGER NOT NULL,
+            pilot_id INTEGER NOT NULL,
+            PRIMARY KEY (flight_id, pilot_id),
+            FOREIGN KEY (flight_id) REFERENCES flight(flight_id),
+            FOREIGN KEY (pilot_id) REFERENCES pilot(pilot_id)
+        ) STRICT, WITHOUT ROWID
+    """,
+}
+
+#3. Rebuilds the five tables as STRICT tables with the same key types on both sides of every join.
+# Each table is copied into a new table, swapped in under the old name, and its indexes are recreated.
+# Values that cannot be stored losslessly in the new types (e.g. a non-numeric aircraft ID) stop the migration.
+def rebuild_strict_tables(cursor):
+    for table, create_sql in STRICT_TABLES.items():
+        cursor.execute("""
+            SELECT sql FROM sqlite_master
+            WHERE tbl_name = ? AND type IN ('index', 'trigger') AND sql IS NOT NULL
+        """, (table,))
+        dependants = [row[0] for row in cursor.fetchall()]
+
+        cursor.execute(create_sql)
+        columns = ", ".join(row[1] for row in cursor.execute(f"PRAGMA table_info(new_{table})").fetchall())
+        cursor.execute(f"INSERT INTO new_{table} ({columns}) SELECT {columns} FROM {table}")
+        cursor.execute(f"DROP TABLE {table}")
+        cursor.execute(f"ALTER TABLE new_{table} RENAME TO {table}")
+
+        for sql in dependants:
+            cursor.execute(sql)
+
+#4. Adds summary tables for the flight report (daily counts by status, and flights per route), kept up to date by triggers
+#on every insert, update and delete of a flight, then fills them from the existing flights. Flights that migration 1 left
+#without a departure timestamp are only counted per route, as they have no day.
+def add_report_summaries(cursor):
+    cursor.execute("""
+        CREATE TABLE flight_daily_status (
+            flight_day TEXT NOT NULL,
+            status TEXT NOT NULL,
+            flight_count INTEGER NOT NULL,
+            PRIMARY KEY (flight_day, status)
+        ) STRICT, WITHOUT ROWID
+    """)
+    cursor.execute("""
+        CREATE TABLE route_count (
+            origin_id TEXT NOT NULL,
+            destination_id TEXT NOT NULL,
+            flight_count INTEGER NOT NULL,
+            PRIMARY KEY (origin_id, destination_id)
+        ) STRICT, WITHOUT ROWID
+    """)
+
+    add_counts = """
+        INSERT INTO flight_daily_status (flight_day, status, flight_count)
+        SELECT substr(NEW.departure_at, 1, 10), NEW.status, 1 WHERE NEW.departure_at IS NOT NULL
+        ON CONFLICT (flight_day, status) DO UPDATE SET flight_count = flight_count + 1;
+        INSERT INTO route_count (origin_id, destination_id, flight_count)
+        VALUES (NEW.origin_id, NEW.destination_id, 1)
+        ON CONFLICT (origin_id, destination_id) DO UPDATE SET flight_count = flight_count + 1;
+    """
+    remove_counts = """
+        UPDATE flight_daily_status SET flight_count = flight_count - 1
+        WHERE flight_day = substr(OLD.departure_at, 1, 10) AND status = OLD.status;
+        DELETE FROM flight_daily_status
+        WHERE flight_day = substr(OLD.departure_at, 1, 10) AND status = OLD.status AND flight_count <= 0;
+        UPDATE route_count SET flight_count = flight_count - 1
+        WHERE origin_id = OLD.origin_id AND destination_id = OLD.destination_id;
+        DELETE FROM route_count
+        WHERE origin_id = OLD.origin_id AND destination_id = OLD.destination_id AND flight_count <= 0;
+    """
+    cursor.execute(f"CREATE TRIGGER flight_summary_insert AFTER INSERT ON flight BEGIN {add_counts} END")
+    cursor.execute(f"CREATE TRIGGER flight_summary_delete AFTER DELETE ON flight BEGIN {remove_counts} END")
+    cursor.execute(f"""
+        CREATE TRIGGER flight_summary_update AFTER UPDATE OF departure_at, status, origin_id, destination_id ON flight
+        BEGIN {remove_counts} {add_counts} END
+    """)
+
+    rebuild_summaries(cursor)
+
+#5. Adds each flight's block time (minutes from departure to arrival), used to check pilot rest and aircraft turnaround.
+#Existing flights get the default of 120 minutes (availability.DEFAULT_BLOCK_MINUTES).
+def add_block_minutes(cursor):
+    cursor.execute("ALTER TABLE flight ADD COLUMN block_minutes INTEGER NOT NULL DEFAULT 120 CHECK (block_minutes > 0)")
+
+#Creates the FTS5 index and the triggers on its source table that keep it in sync (see SEARCH_INDEXES in text_search.py).
+#A regular index finds the row to remove by matching its key column, then checking the key is exactly equal.
+def create_search_index(cursor, index):
+    table, key, columns, weights, external = SEARCH_INDEXES[index]
+    column_list = ", ".join(columns)
+    content = f"content='{table}', content_rowid='{key}', " if external else ""
+    cursor.execute(f"""
+        CREATE VIRTUAL TABLE {index} USING fts5(
+            {column_list}, {content}prefix='1 2 3', tokenize='unicode61 remove_diacritics 2'
+        )
+    """)
+    #the weights are stored in the index, so ORDER BY rank sorts by the weighted bm25 score
+    cursor.execute(f"INSERT INTO {index} ({index}, rank) VALUES ('rank', 'bm25({', '.join(map(str, weights))})')")
+
+    new_values = ", ".join(f"NEW.{column}" for column in columns)
+    old_values = ", ".join(f"OLD.{column}" for column in columns)
+    if external:
+        add_row = f"INSERT INTO {index} (rowid, {column_list}) VALUES (NEW.{key}, {new_values});"
+        remove_row = f"INSERT INTO {index} ({index}, rowid, {column_list}) VALUES ('delete', OLD.{key}, {old_values});"
+    else:
+        add_row = f"INSERT INTO {index} ({column_list}) VALUES ({new_values});"
+        remove_row = f"""
+            DELETE FROM {index} WHERE rowid IN (
+                SELECT rowid FROM {index} WHERE {key} MATCH '"' || replace(OLD.{key}, '"', '""') || '"'
+            ) AND {key} = OLD.{key};
+        """
+    cursor.execute(f"CREATE TRIGGER {index}_insert AFTER INSERT ON {table} BEGIN {add_row} END")
+    cursor.execute(f"CREATE TRIGGER {index}_delete AFTER DELETE ON {table} BEGIN {remove_row} END")
+    cursor.execute(f"CREATE TRIGGER {index}_update AFTER UPDATE OF {column_list} ON {table} BEGIN {remove_row} {add_row} END")
+
+#6. Adds FTS5 full-text indexes over airport and pilot for prefix searches (see text_search.py), kept in sync by triggers
+#on each table, then fills them from the existing rows
+def add_search_indexes(cursor):
+    for index in SEARCH_INDEXES:
+        create_search_index(cursor, index)
+    rebuild_search_indexes(cursor)
+
+#7. Adds a one-row counter of the changes made to airport, aircraft and pilot, kept up to date by triggers on each table,
+#so the reference-data cache (see reference_data.py) can tell whether those tables changed without reading them
+def add_reference_changes(cursor):
+    cursor.execute("CREATE TABLE reference_changes (changes INTEGER NOT NULL) STRICT")
+    cursor.execute("INSERT INTO reference_changes (changes) VALUES (0)")
+    for table in REFERENCE_TABLES:
+        for event in ("INSERT", "UPDATE", "DELETE"):
+            cursor.execute(f"""
+                CREATE TRIGGER {table}_{event.lower()}_changes AFTER {event} ON {table}
+                BEGIN UPDATE reference_changes SET changes = changes + 1; END
+            """)
+
+#8. Adds an index on each aircraft's flights in departure order, for delaying or cancelling one aircraft's flights in bulk
+def add_aircraft_departure_index(cursor):
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_flight_aircraft_departure ON flight (aircraft_id, departure_at)")
+
+#9. Adds a one-row record of the highest flight ID ever used, kept up to date by a trigger on every new flight, so new
+#flights are numbered after it. MAX(flight_id) is not enough once flights are archived (see flight_archive.py): it goes
+#down, and new flights would be given the IDs of flights in the history file.
+def add_flight_sequence(cursor):
+    cursor.execute("CREATE TABLE flight_sequence (last_flight_id INTEGER NOT NULL) STRICT")
+    cursor.execute("INSERT INTO flight_sequence (last_flight_id) SELECT COALESCE(MAX(flight_id), 0) FROM flight")
+    cursor.execute("""
+        CREATE TRIGGER flight_sequence_insert AFTER INSERT ON flight
+        WHEN NEW.flight_id > (SELECT last_flight_id FROM flight_sequence)
+        BEGIN UPDATE flight_sequence SET last_flight_id = NEW.flight_id; END
+    """)
+
+#10. Recreates airport_search as a regular FTS5 table matched to airport by iata_code. Migration 6 made it an
+#external-content table keyed by airport's implicit rowid, which a VACUUM can renumber (airport has a TEXT primary key),
+#after which searches returned the wrong airports.
+def rekey_airport_search(cursor):
+    for event in ("insert", "delete", "update"):
+        cursor.execute(f"DROP TRIGGER IF EXISTS airport_search_{event}")
+    cursor.execute("DROP TABLE IF EXISTS airport_search")
+    create_search_index(cursor, "airport_search")
+    rebuild_search_index(cursor, "airport_search")
+
+
+MIGRATIONS = [
+    add_departure_timestamp,
+    add_hot_query_indexes,
+    rebuild_strict_tables,
+    add_report_summaries,
+    add_block_minutes,
+    add_search_indexes,
+    add_reference_changes,
+    add_aircraft_departure_index,
+    add_flight_sequence,
+    rekey_airport_search,
+]
+
+# The filtered queries the managers run, with sample parameters. None of them should need a full scan of flight or
+# flight_pilot once the migrations have run. The SQL is imported from the modules that run it, so the check always
+# covers the current queries; they are imported when the check runs, as the CLI runs the migrations at start-up.
+# Queries that read every flight on purpose (reloading the in-memory indexes, exports, the pilot workload report and
+# each pilot's position before an auto-assign period) are not listed.
+def hot_queries():
+    from aircraft import AIRCRAFT_FLIGHTS_SQL
+    from destination_manager import DESTINATION_FLIGHTS_SQL
+    from flight_manager import (DAY_PILOTS_SQL, FLIGHT_PILOTS_SQL, FLIGHT_SEARCH_SQL, FLIGHTS_BY_STATUS_SQL, PERIOD_FLIGHTS_SQL,
+                                flight_conditions)
+    from pilot_information import PILOT_SCHEDULE_SQL
+    from pilot_workload import DUTY_LOAD_SQL
+
+    month = ("2025-01-01 00:00", "2025-02-01 00:00")
+    searched, search_params = flight_conditions(*month, status="Delayed", airport="LHR")
+    disrupted, disrupt_params = flight_conditions(*month, airport="LHR", not_cancelled=True)
+    grounded, grounded_params = flight_conditions(*month, aircraft_id=101, not_cancelled=True)
+    return {
+        "flights by date range": (FLIGHT_SEARCH_SQL.format(conditions=flight_conditions(*month)[0]), month),
+        "flights by date range, status and airport": (FLIGHT_SEARCH_SQL.format(conditions=searched), search_params),
+        "flights by status": (FLIGHTS_BY_STATUS_SQL, ("Delayed",)),
+        "pilots flying on a date": (DAY_PILOTS_SQL, ("01/01/2025",)),
+        "flights to assign in a period": (PERIOD_FLIGHTS_SQL, month),
+        "pilots of flights to disrupt at an airport": (FLIGHT_PILOTS_SQL.format(conditions=disrupted), disrupt_params),
+        "pilots of flights to disrupt for an aircraft": (FLIGHT_PILOTS_SQL.format(conditions=grounded), grounded_params),
+        "pilot schedule": (PILOT_SCHEDULE_SQL, (1243,)),
+        "pilot duty load": (DUTY_LOAD_SQL, month),
+        "flights using a destination": (DESTINATION_FLIGHTS_SQL, ("LHR", "LHR")),
+        "flights using an aircraft": (AIRCRAFT_FLIGHTS_SQL, (101,)),
+    }
+
+SCANNED_TABLES = ("flight", "flight_pilot")
+
+
+def schema_version(connection):
+    return connection.execute("PRAGMA user_version").fetchone()[0]
+
+
+#Applies any migrations the database has not seen yet (up to target_version, default all) and returns the resulting schema version.
+#Foreign keys are switched off while tables are rebuilt (it cannot be changed inside a transaction), and each migration
+#only commits if PRAGMA foreign_key_check finds nothing broken.
+def run_migrations(connection, target_version=None):
+    version = schema_version(connection)
+    if target_version is None:
+        target_version = len(MIGRATIONS)
+    if version >= target_version:
+        return version
+    if connection.in_transaction:
+        connection.commit()
+
+    cursor = connection.cursor()
+    foreign_keys = cursor.execute("PRAGMA foreign_keys").fetchone()[0]
+    cursor.execute("PRAGMA foreign_keys = OFF")
+    try:
+        for number, migration in enumerate(MIGRATIONS[version:target_version], start=version + 1):
+            try:
+                cursor.execute("BEGIN")
+                migration(cursor)
+                broken = cursor.execute("PRAGMA foreign_key_check").fetchall()
+                if broken:
+                    raise sqlite3.IntegrityError(f"Migration {number} would leave {len(broken)} broken foreign keys, e.g. {broken[0]}")
+                cursor.execute(f"PRAGMA user_version = {number}")
+                connection.commit()
+            except sqlite3.Error:
+                connection.rollback()
+                raise
+            version = number
+    finally:
+        cursor.execute(f"PRAGMA foreign_keys = {'ON' if foreign_keys else 'OFF'}")
+
+    return version
+
+
+#Returns (query name, plan detail) for every hot query whose plan still scans the whole flight or flight_pilot table,
+#in the database or in its history file (see flight_archive.py), which is attached for the queries that read all_flight
+def find_full_scans(connection):
+    from flight_archive import attach_history
+    attach_history(connection, connection.execute("PRAGMA database_list").fetchone()[2])
+
+    full_scans = []
+    for name, (sql, params) in hot_queries().items():
+        for _, _, _, detail in connection.execute(f"EXPLAIN QUERY PLAN {sql}", params):
+            words = detail.split()
+            #tables are named main.flight or history.flight once another database is attached
+            if len(words) > 1 and words[0] == "SCAN" and words[1].split(".")[-1] in SCANNED_TABLES:
+                full_scans.append((name, detail))
+    return full_scans
+
+
+#Asserts that the indexes are in place, i.e. no hot query reports a SCAN of flight or flight_pilot
+def check_query_plans(connection):
+    full_scans = find_full_scans(connection)
+    assert not full_scans, "Hot queries still scan whole tables: " + "; ".join(f"{name}: {detail}" for name, detail in full_scans)
+
+
+if __name__ == "__main__":
+    conn = sqlite3.connect("flights.db")
+    print(f"flights.db is at schema version {run_migrations(conn)}")
+    check_query_plans(conn)
+    print("Query plan check passed: no hot query scans flight or flight_pilot.")
+    conn.close()
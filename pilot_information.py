@@ -1,14 +1,27 @@
-
-from tabulate import tabulate
-
-class PilotInformation:
-    def __init__(self, connection):
-        self.conn = connection
-        self.conn.execute("PRAGMA foreign_keys = ON")
-        self.cursor = self.conn.cursor()
-
+import csv
+import json
+import os
+import sqlite3
+
+from connection import ConnectionUser
+from flight_dates import date_range_bounds, normalise_date
+from flight_manager import EXPORT_BATCH_SIZE
+from text_search import SEARCH_CANDIDATES, SEARCH_LIMIT, prefix_query
+
+# A pilot's flights in departure order; its plan is checked by migrations.py
+PILOT_SCHEDULE_SQL = """
+    SELECT flight.flight_id, flight.flight_date, flight.flight_time, flight.origin_id, flight.destination_id, flight.status
+    FROM flight
+    JOIN flight_pilot ON flight.flight_id = flight_pilot.flight_id
+    WHERE flight_pilot.pilot_id = ?
+    ORDER BY flight.departure_at
+"""
+ROSTER_FIELDS = ["pilot_id", "first_name", "last_name", "flight_id", "flight_date", "flight_time", "origin_id", "destination_id", "status", "block_minutes"]
+
+class PilotInformation(ConnectionUser):
 #1. calls all pilot records, allowing user select columns
     def view_pilots(self):
+        from tabulate import tabulate
 
 # Rename all column headings into user-friendly titles 
         column_map = {
@@ -90,12 +103,7 @@ class PilotInformation:
         pilot_id = input("Enter Pilot ID to view schedule: ").strip()
 
         # Check if pilot exists
-        self.cursor.execute("""
-            SELECT first_name, last_name
-            FROM pilot
-            WHERE pilot_id = ?
-        """, (pilot_id,))
-        pilot = self.cursor.fetchone()
+        pilot = self.find_pilot(pilot_id)
 
         if not pilot:
             print("Pilot not found.")
@@ -104,14 +112,7 @@ class PilotInformation:
         print(f"\n--- Flight Schedule for {pilot[0]} {pilot[1]} ---")
 
 # Retrieve flight schedule
-        self.cursor.execute("""
-            SELECT flight.flight_id, flight.flight_date, flight.flight_time, flight.origin_id, flight.destination_id, flight.status
-            FROM flight
-            JOIN flight_pilot ON flight.flight_id = flight_pilot.flight_id
-            WHERE flight_pilot.pilot_id = ?
-            ORDER BY flight.flight_date, flight.flight_time
-        """, (pilot_id,))
-        schedule = self.cursor.fetchall()
+        schedule = self.pilot_schedule(pilot_id)
 
         if schedule:
             from tabulate import tabulate
@@ -120,6 +121,126 @@ class PilotInformation:
         else:
             print("No scheduled flights found for this pilot.")
 
-    def close(self):
-        self.conn.close()
+#3. Search pilots as you type: matches the start of any word in the pilot's name, licence number or nationality
+    def search_pilot(self):
+        text = input("Search by pilot name, licence number or nationality (e.g. \"ali smi\"): ").strip()
+        matches = self.search_pilots(text)
 
+        if matches:
+            from tabulate import tabulate
+            headers = ["Pilot ID", "First Name", "Last Name", "License Number", "Nationality"]
+            print(tabulate(matches, headers=headers, tablefmt="grid"))
+        else:
+            print("No pilots match your search.")
+
+#4. Exports every pilot's schedule for a period, either to one combined file or to one file per pilot
+    def export_roster(self):
+        start_date = input("Enter the first date of the roster (DD/MM/YYYY): ").strip()
+        end_date = input("Enter the last date of the roster (DD/MM/YYYY) or press Enter for a single day: ").strip() or start_date
+        try:
+            start_date = normalise_date(start_date)
+            end_date = normalise_date(end_date)
+        except ValueError:
+            print("Invalid date format. Please enter as DD/MM/YYYY.")
+            return
+
+        file_format = "jsonl" if input("Choose a format: 1. CSV / 2. JSON Lines (press Enter for CSV): ").strip() == "2" else "csv"
+        per_pilot = input("One file per pilot? (Y/N): ").strip().upper() == "Y"
+        if per_pilot:
+            path = input("Enter the folder for the files (or press Enter for roster): ").strip() or "roster"
+        else:
+            path = input(f"Enter the file name (or press Enter for roster.{file_format}): ").strip() or f"roster.{file_format}"
+
+        try:
+            pilots, flights = self.export_rosters(start_date, end_date, path, file_format, per_pilot)
+            print(f"Roster from {start_date} to {end_date}: {flights} flights for {pilots} pilots exported to '{path}'.")
+        except (OSError, sqlite3.Error) as e:
+            print(f"Failed to export the roster: {e}")
+
+# Returns a pilot's (first_name, last_name), or None if there is no such pilot
+    def find_pilot(self, pilot_id):
+        return self.reference.pilot(pilot_id)
+
+# Returns every pilot as (pilot_id, first_name, last_name, experience_years) rows
+    def list_pilots(self):
+        self.cursor.execute("""
+            SELECT pilot_id, first_name, last_name, experience_years
+            FROM pilot
+            ORDER BY pilot_id
+        """)
+        return self.cursor.fetchall()
+
+# Returns the pilots whose words start with every word of text, best match first, as
+# (pilot_id, first_name, last_name, license_number, nationality) rows. Uses the pilot_search full-text index.
+    def search_pilots(self, text, limit=SEARCH_LIMIT):
+        query = prefix_query(text)
+        if query is None:
+            return []
+        self.cursor.execute("""
+            SELECT pilot.pilot_id, pilot.first_name, pilot.last_name, pilot.license_number, pilot.nationality
+            FROM (SELECT rowid, rank FROM pilot_search WHERE pilot_search MATCH ? LIMIT ?) AS match
+            JOIN pilot ON pilot.pilot_id = match.rowid
+            ORDER BY match.rank
+            LIMIT ?
+        """, (query, SEARCH_CANDIDATES, limit))
+        return self.cursor.fetchall()
+
+# Returns a pilot's flights in departure order as (flight_id, date, time, origin, destination, status) rows
+    def pilot_schedule(self, pilot_id):
+        self.cursor.execute(PILOT_SCHEDULE_SQL, (pilot_id,))
+        return self.cursor.fetchall()
+
+# Streams the schedule of every pilot flying between two DD/MM/YYYY dates (inclusive) into a CSV or JSON Lines file.
+# With per_pilot, path is a folder and each pilot gets their own roster_<pilot_id> file; otherwise every pilot's flights
+# go into the one file at path, pilot by pilot. Returns (number of pilots, number of flights) written.
+#
+# The whole fleet is read with a single query ordered by pilot and departure. CROSS JOIN makes SQLite walk flight_pilot
+# in pilot order (idx_flight_pilot_pilot) and look each flight up, so it only ever sorts one pilot's flights by departure
+# at a time. Rows are fetched in batches and written straight out, so memory use does not grow with the fleet.
+    def export_rosters(self, start_date, end_date, path, file_format="csv", per_pilot=False, batch_size=EXPORT_BATCH_SIZE):
+        range_start, range_end = date_range_bounds(start_date, end_date)
+        export_cursor = self.conn.cursor() #a separate cursor so the export is not disturbed by other queries
+        export_cursor.execute("""
+            SELECT flight_pilot.pilot_id, pilot.first_name, pilot.last_name, flight.flight_id, flight.flight_date, flight.flight_time,
+                flight.origin_id, flight.destination_id, flight.status, flight.block_minutes
+            FROM flight_pilot
+            CROSS JOIN flight ON flight.flight_id = flight_pilot.flight_id
+            JOIN pilot ON pilot.pilot_id = flight_pilot.pilot_id
+            WHERE flight.departure_at >= ? AND flight.departure_at < ?
+            ORDER BY flight_pilot.pilot_id, flight.departure_at, flight.flight_id
+        """, (range_start, range_end))
+
+        if per_pilot:
+            os.makedirs(path, exist_ok=True)
+        roster_file = None
+        current_pilot = None
+        pilots = flights = 0
+        try:
+            while rows := export_cursor.fetchmany(batch_size):
+                for row in rows:
+                    if row[0] != current_pilot:
+                        current_pilot = row[0]
+                        pilots += 1
+                        if per_pilot or roster_file is None:
+                            if roster_file is not None:
+                                roster_file.close()
+                            file_path = os.path.join(path, f"roster_{current_pilot}.{file_format}") if per_pilot else path
+                            roster_file = open(file_path, "w", newline="", encoding="utf-8")
+                            writer = csv.writer(roster_file)
+                            if file_format == "csv":
+                                writer.writerow(ROSTER_FIELDS)
+                    if file_format == "csv":
+                        writer.writerow(row)
+                    else:
+                        roster_file.write(json.dumps(dict(zip(ROSTER_FIELDS, row))) + "\n")
+                    flights += 1
+        finally:
+            if roster_file is not None:
+                roster_file.close()
+            export_cursor.close()
+
+        if not per_pilot and roster_file is None:
+            with open(path, "w", newline="", encoding="utf-8") as roster_file: #nobody is flying: write an empty roster
+                if file_format == "csv":
+                    csv.writer(roster_file).writerow(ROSTER_FIELDS)
+        return pilots, flights
@@ -0,0 +1,117 @@
+from datetime import date, datetime, timedelta
+
+import numpy as np
+
+from flight_dates import DATE_FORMAT
+
+# Crew planning limits used by the duty load report unless others are given
+MAX_FLIGHTS_7_DAYS = 6 #flights in any 7 days, including the day being checked
+MAX_FLIGHTS_28_DAYS = 20 #flights in any 28 days
+MAX_DAYS_WITHOUT_REST = 6 #consecutive days with at least one flight
+DUTY_WINDOW_DAYS = 28 #the longest rolling window, so the fewest days of flights the checks on one date need
+
+EPOCH = date(1970, 1, 1)
+
+# The (pilot, day number) of every flight flown in a window of days; its plan is checked by migrations.py
+DUTY_LOAD_SQL = """
+    SELECT flight_pilot.pilot_id, CAST(strftime('%s', flight.departure_at) AS INTEGER) / 86400
+    FROM flight
+    JOIN flight_pilot ON flight_pilot.flight_id = flight.flight_id
+    WHERE flight.departure_at >= ? AND flight.departure_at < ? AND flight.status != 'Cancelled'
+"""
+
+
+#Returns the day number (days since 1970-01-01) of a DD/MM/YYYY date or a date object
+def day_number(day):
+    if isinstance(day, str):
+        day = datetime.strptime(day, DATE_FORMAT).date()
+    return (day - EPOCH).days
+
+
+# Rolling duty metrics for every pilot on every day, worked out together with NumPy instead of a query per pilot.
+# It is built from one (pilot_id, day number) pair per flight flown. The flights are counted into a pilots x days grid
+# (np.unique sorts the pilot IDs, np.bincount fills the grid), then a cumulative sum along each pilot's row gives the
+# flights in any window as the difference of two columns, and a running maximum of the last day without a flight
+# gives the days since each pilot's last rest day.
+# The grid runs from first_day (default: the first flight) to last_day, so its size grows with the days it covers. The
+# loaders below start it window_days before the date being checked, which is all the rolling windows need; days since
+# the last rest day are then counted back to first_day at most.
+class DutyLoad:
+    def __init__(self, pilot_ids, flight_days, last_day=None, first_day=None):
+        pilot_ids = np.asarray(pilot_ids, dtype=np.int64)
+        flight_days = np.asarray(flight_days, dtype=np.int64)
+        if last_day is None:
+            last_day = int(flight_days.max()) if len(flight_days) else day_number(date.today())
+        in_range = flight_days <= last_day
+        if first_day is not None:
+            in_range &= flight_days >= first_day
+        pilot_ids, flight_days = pilot_ids[in_range], flight_days[in_range]
+
+        self.pilot_ids, pilot_index = np.unique(pilot_ids, return_inverse=True)
+        if first_day is None:
+            first_day = int(flight_days.min()) if len(flight_days) else last_day
+        self.first_day = first_day
+        self.last_day = last_day
+        days = self.last_day - self.first_day + 1
+
+        cells = pilot_index * days + (flight_days - self.first_day)
+        self.flights_per_day = np.bincount(cells, minlength=len(self.pilot_ids) * days).reshape(len(self.pilot_ids), days)
+
+        totals = np.zeros((len(self.pilot_ids), days + 1), dtype=np.int64)
+        np.cumsum(self.flights_per_day, axis=1, out=totals[:, 1:])
+        self.running_totals = totals #running_totals[:, d + 1] is the number of flights up to and including day d
+
+        day_index = np.arange(days)
+        last_rest = np.maximum.accumulate(np.where(self.flights_per_day == 0, day_index, -1), axis=1)
+        self.days_since_rest = day_index - last_rest #0 on a rest day; counts from the first day if there was no rest day before
+
+#1. Returns (pilot IDs, 7-day flights, 28-day flights, days since the last rest day) on a DD/MM/YYYY date
+    def metrics_on(self, day):
+        column = day_number(day) - self.first_day
+        if not 0 <= column < self.flights_per_day.shape[1]:
+            raise ValueError(f"{day} is outside the dates covered by the duty data.")
+
+        flights_7 = self.running_totals[:, column + 1] - self.running_totals[:, max(column + 1 - 7, 0)]
+        flights_28 = self.running_totals[:, column + 1] - self.running_totals[:, max(column + 1 - 28, 0)]
+        return self.pilot_ids, flights_7, flights_28, self.days_since_rest[:, column]
+
+#2. Returns the pilots over any of the limits on a date as (pilot_id, 7-day flights, 28-day flights, days since rest) rows,
+#busiest first
+    def flagged(self, day, max_7_days=MAX_FLIGHTS_7_DAYS, max_28_days=MAX_FLIGHTS_28_DAYS, max_days_without_rest=MAX_DAYS_WITHOUT_REST):
+        pilot_ids, flights_7, flights_28, days_since_rest = self.metrics_on(day)
+        over = (flights_7 > max_7_days) | (flights_28 > max_28_days) | (days_since_rest > max_days_without_rest)
+
+        order = np.lexsort((-days_since_rest[over], -flights_7[over], -flights_28[over]))
+        return [(int(pilot_id), int(week), int(month), int(rest)) for pilot_id, week, month, rest in
+                zip(pilot_ids[over][order], flights_7[over][order], flights_28[over][order], days_since_rest[over][order])]
+
+
+#Returns the number of days of flights needed to check the limits on one date: the longest rolling window, or enough
+#days to see a run of max_days_without_rest days without rest if that is longer
+def duty_window_days(max_days_without_rest=MAX_DAYS_WITHOUT_REST):
+    return max(DUTY_WINDOW_DAYS, max_days_without_rest + 1)
+
+
+#Loads the (pilot, day) pairs of every flight that is not cancelled and departs in the window_days up to and including
+#last_day (a DD/MM/YYYY date) in a single query and returns their DutyLoad
+def load_duty_load(cursor, last_day=None, window_days=DUTY_WINDOW_DAYS):
+    last_day = day_number(last_day or date.today())
+    first_day = last_day - window_days + 1
+    cursor.execute(DUTY_LOAD_SQL, ((EPOCH + timedelta(days=first_day)).isoformat(), (EPOCH + timedelta(days=last_day + 1)).isoformat()))
+    pairs = np.array(cursor.fetchall(), dtype=np.int64).reshape(-1, 2)
+    return DutyLoad(pairs[:, 0], pairs[:, 1], last_day, first_day)
+
+
+#Builds the DutyLoad from a columnar snapshot (see flight_snapshot.py) instead of the database
+def duty_load_from_snapshot(snapshot, last_day=None, window_days=DUTY_WINDOW_DAYS):
+    last_day = day_number(last_day or date.today())
+    first_day = last_day - window_days + 1
+    flight_ids = np.asarray(snapshot["flight_id"])
+    position = np.searchsorted(flight_ids, snapshot["pilot_flight_id"]) #flights are stored in flight_id order
+
+    statuses = snapshot.manifest["dictionaries"]["status"]
+    cancelled = statuses.index("Cancelled") if "Cancelled" in statuses else -1
+    flown = np.asarray(snapshot["status"])[position] != cancelled
+    flight_days = np.asarray(snapshot["departure"])[position] // (24 * 60)
+    keep = flown & (flight_days >= first_day) & (flight_days <= last_day)
+    return DutyLoad(np.asarray(snapshot["pilot_id"])[keep], flight_days[keep], last_day, first_day)
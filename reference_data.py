@@ -0,0 +1,78 @@
+import threading
+from collections import namedtuple
+
+from connection import ConnectionUser
+
+REFERENCE_TABLES = ("airport", "aircraft", "pilot") #every change to these is counted in reference_changes (migration 7)
+
+# The reference tables as dicts, in ID order:
+#   airports - iata_code -> (name, city, country)
+#   aircraft - aircraft_id -> (model, capacity, manufacturer, registration_number)
+#   pilots   - pilot_id -> (first_name, last_name)
+ReferenceTables = namedtuple("ReferenceTables", ("airports", "aircraft", "pilots"))
+
+
+#Returns an aircraft or pilot ID as the integer the tables are keyed by, or None if it is not a number
+def record_id(value):
+    value = str(value).strip()
+    return int(value) if value.isdigit() else None
+
+
+# An in-memory copy of the airport, aircraft and pilot tables, which the flight screens and the scheduling, assignment
+# and itinerary code check IDs against and list from, instead of querying them for every lookup. ConnectionFactory
+# keeps one per database, so every manager (and every thread of the HTTP service) shares it.
+#
+# It is read from the database in one go the first time it is needed, and read again after:
+#   - invalidate(), which DestinationManager, AircraftManager and DataLoader call after committing a change to the tables;
+#   - a change to the tables committed on another connection, by this process or another one. Before each use,
+#     PRAGMA data_version is checked on the calling thread's connection; it only changes when another connection
+#     commits. Most of those commits are bookings, so the reference_changes counter, which triggers on the three tables
+#     keep up to date, is then compared with the one read with the tables, and they are only read again if it moved.
+class ReferenceData(ConnectionUser):
+    def __init__(self, connections):
+        super().__init__(connections)
+        self.lock = threading.Lock()
+        self.tables = None #loaded on first use
+        self.changes = None #reference_changes when the tables were read
+        self.seen = threading.local() #the connection and data_version each thread last checked
+
+#1. Returns the current ReferenceTables, reading them again if they have changed
+    def current(self):
+        conn = self.conn
+        version = conn.execute("PRAGMA data_version").fetchone()[0]
+        tables = self.tables
+        #a thread's first check (or one on a new connection) has nothing to compare with, so it reads the counter
+        if tables is not None and getattr(self.seen, "connection", None) is conn and self.seen.version == version:
+            return tables
+
+        changes = conn.execute("SELECT changes FROM reference_changes").fetchone()[0] #read before the tables, never after
+        with self.lock:
+            self.seen.connection = conn
+            self.seen.version = version
+            if self.tables is None or self.changes != changes:
+                self.tables = self._load(conn)
+                self.changes = changes
+            return self.tables
+
+    def _load(self, conn):
+        airports = {row[0]: row[1:] for row in conn.execute("SELECT iata_code, name, city, country FROM airport ORDER BY iata_code")}
+        aircraft = {row[0]: row[1:] for row in conn.execute("""
+            SELECT aircraft_id, model, capacity, manufacturer, registration_number
+            FROM aircraft
+            ORDER BY aircraft_id
+        """)}
+        pilots = {row[0]: row[1:] for row in conn.execute("SELECT pilot_id, first_name, last_name FROM pilot ORDER BY pilot_id")}
+        return ReferenceTables(airports, aircraft, pilots)
+
+#2. Returns an airport's (name, city, country), or None if there is no such airport
+    def airport(self, iata_code):
+        return self.current().airports.get(iata_code)
+
+#3. Returns a pilot's (first_name, last_name), or None if there is no such pilot
+    def pilot(self, pilot_id):
+        return self.current().pilots.get(record_id(pilot_id))
+
+#4. Forgets the tables, so the next use reads them again. Call it after committing a change to any of them.
+    def invalidate(self):
+        with self.lock:
+            self.tables = None
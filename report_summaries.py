@@ -0,0 +1,63 @@
+import sqlite3
+import sys
+
+# Summary tables behind the flight report, kept up to date by triggers on the flight table (created by migration 4):
+#   flight_daily_status - number of flights per departure day (YYYY-MM-DD) and status
+#   route_count         - number of flights per origin/destination pair
+# The report reads these instead of rescanning every flight. This module can rebuild them from scratch and
+# check that the trigger-maintained copies still match. Flights without a departure timestamp (rows migration 1 could
+# not parse) have no day, so they are counted in route_count only.
+
+# For each summary table: (query that reads the stored summary, query that recomputes it from the flight table)
+SUMMARIES = {
+    "flight_daily_status": (
+        "SELECT flight_day, status, flight_count FROM flight_daily_status",
+        "SELECT substr(departure_at, 1, 10), status, COUNT(*) FROM flight WHERE departure_at IS NOT NULL GROUP BY 1, 2",
+    ),
+    "route_count": (
+        "SELECT origin_id, destination_id, flight_count FROM route_count",
+        "SELECT origin_id, destination_id, COUNT(*) FROM flight GROUP BY origin_id, destination_id",
+    ),
+}
+
+
+#1. Replaces the contents of the summary tables with counts recomputed from the flight table
+def rebuild_summaries(connection):
+    for table, (_, recompute_sql) in SUMMARIES.items():
+        connection.execute(f"DELETE FROM {table}")
+        connection.execute(f"INSERT INTO {table} {recompute_sql}")
+
+
+#2. Recomputes the summaries from scratch and compares them with the stored ones.
+#Returns {table: [(key, stored count, recomputed count), ...]} for every row that differs; empty if all match.
+def diff_summaries(connection):
+    differences = {}
+    for table, (stored_sql, recompute_sql) in SUMMARIES.items():
+        stored = {row[:-1]: row[-1] for row in connection.execute(stored_sql)}
+        recomputed = {row[:-1]: row[-1] for row in connection.execute(recompute_sql)}
+        rows = [(key, stored.get(key, 0), recomputed.get(key, 0))
+                for key in sorted(stored.keys() | recomputed.keys())
+                if stored.get(key, 0) != recomputed.get(key, 0)]
+        if rows:
+            differences[table] = rows
+    return differences
+
+
+if __name__ == "__main__":
+    from connection import ConnectionFactory
+    from migrations import run_migrations
+
+    conn = ConnectionFactory("flights.db").get()
+    run_migrations(conn)
+    differences = diff_summaries(conn)
+    for table, rows in differences.items():
+        print(f"{table}: {len(rows)} rows differ, e.g. {rows[:5]}")
+
+    if differences and "--repair" in sys.argv:
+        rebuild_summaries(conn)
+        conn.commit()
+        print("Summary tables rebuilt.")
+    elif differences:
+        sys.exit(1)
+    else:
+        print("Report summaries match the flight table.")
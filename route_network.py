@@ -0,0 +1,149 @@
+import heapq
+import threading
+from bisect import bisect_left, insort
+from collections import defaultdict
+from itertools import count
+
+from availability import DEFAULT_BLOCK_MINUTES
+from connection import ConnectionUser
+from flight_dates import departure_minutes, minutes_departure
+
+MIN_CONNECTION_MINUTES = 60 #shortest time between landing and the next leg's departure unless another is given
+MAX_ITINERARY_LEGS = 3
+SEARCH_WINDOW_HOURS = 48 #only flights departing this long after the earliest departure are considered
+
+# The flights as a time-dependent route graph: for each airport, its departures sorted by time as
+# (departure, arrival, flight_id, destination), with times in minutes. Cancelled flights are left out.
+#
+# Itineraries are found with a time-dependent Dijkstra search. Each label is an airport reached at a time with a number
+# of legs, and labels are taken from a heap in order of arrival time. Because of that order, once an airport has been
+# reached with some number of legs, any later arrival there with as many legs or more cannot lead anywhere better and is
+# skipped, so each airport is expanded at most once per leg count. Expanding a label is a bisect into the airport's
+# departures, followed by the flights that leave after the connection time.
+#
+# The index is loaded from the database the first time it is searched, and FlightManager keeps it up to date after
+# every insert, update and delete, so it never has to be rebuilt. A lock lets the HTTP service search it on its reader
+# threads while the writer thread changes it.
+class RouteIndex(ConnectionUser):
+    def __init__(self, connections):
+        super().__init__(connections)
+        self.lock = threading.Lock()
+        self.departures = None #loaded on first use
+
+#1. Rebuilds the index from the flight table
+    def reload(self):
+        with self.lock:
+            self._load()
+
+    def _load(self):
+        self.departures = defaultdict(list) #origin -> sorted [(departure, arrival, flight_id, destination)]
+        self.flights = {} #flight_id -> (origin, departure tuple), to find a flight's entry again when it changes
+        rows = self.conn.execute("""
+            SELECT flight_id, origin_id, destination_id, CAST(strftime('%s', departure_at) AS INTEGER) / 60, block_minutes
+            FROM flight
+            WHERE departure_at IS NOT NULL AND status != 'Cancelled'
+            ORDER BY origin_id, departure_at
+        """) #SQLite works out the minutes, which is much quicker than parsing every timestamp in Python
+        for flight_id, origin, destination, start, block_minutes in rows:
+            departure = (start, start + block_minutes, flight_id, destination)
+            self.departures[origin].append(departure)
+            self.flights[flight_id] = (origin, departure)
+        for departures in self.departures.values():
+            departures.sort() #rows with the same departure time are only ordered by timestamp, not flight_id
+
+#2. Adds a flight, or replaces what was recorded for it before (used after inserts and updates). Cancelled flights are
+#only removed. Does nothing until the index has been loaded, as the load reads the database as it is then.
+    def record_flight(self, flight_id, origin, destination, departure_at, block_minutes, status):
+        with self.lock:
+            if self.departures is None:
+                return
+            self._forget(flight_id)
+            if status == "Cancelled" or departure_at is None:
+                return
+            start = departure_minutes(departure_at)
+            departure = (start, start + int(block_minutes or DEFAULT_BLOCK_MINUTES), flight_id, destination)
+            insort(self.departures[origin], departure)
+            self.flights[flight_id] = (origin, departure)
+
+#3. Removes a flight (used after deletes)
+    def forget_flight(self, flight_id):
+        with self.lock:
+            if self.departures is not None:
+                self._forget(flight_id)
+
+    def _forget(self, flight_id):
+        previous = self.flights.pop(flight_id, None)
+        if previous is None:
+            return
+        origin, departure = previous
+        departures = self.departures[origin]
+        position = bisect_left(departures, departure)
+        if position < len(departures) and departures[position] == departure:
+            del departures[position]
+
+#4. Returns the fastest itineraries from origin to destination that leave at or after earliest_departure
+#('YYYY-MM-DD HH:MM'), with at most max_legs flights and at least min_connection minutes between landing and the next
+#departure. The result holds the earliest-arriving itinerary, then any that arrive later but need fewer legs, so each
+#one is the fastest for its number of legs. Each itinerary is a dict with departure_at, arrival_at, duration_minutes,
+#legs and flights (a list of flight dicts).
+    def find_itineraries(self, origin, destination, earliest_departure, min_connection=MIN_CONNECTION_MINUTES,
+                         max_legs=MAX_ITINERARY_LEGS, window_hours=SEARCH_WINDOW_HOURS):
+        if origin == destination:
+            raise ValueError("The origin and destination must be different airports.")
+        earliest = departure_minutes(earliest_departure)
+        latest = earliest + window_hours * 60
+        with self.lock:
+            if self.departures is None:
+                self._load()
+            labels = self._search(origin, destination, earliest, latest, min_connection, max_legs)
+        return [self._itinerary(label) for label in labels]
+
+    def _search(self, origin, destination, earliest, latest, min_connection, max_legs):
+        fewest_legs = {} #airport -> fewest legs it has been expanded with so far
+        found = []
+        sequence = count() #tie-breaker, so the heap never compares labels
+        #(arrival, legs, tie-breaker, airport, label); a label is (departure tuple, origin, previous label) or None
+        heap = [(earliest, 0, next(sequence), origin, None)]
+        while heap:
+            arrival, legs, _, airport, label = heapq.heappop(heap)
+            if fewest_legs.get(airport, max_legs + 1) <= legs:
+                continue #reached earlier with as few legs
+            fewest_legs[airport] = legs
+            if airport == destination:
+                found.append(label)
+                continue
+            if legs == max_legs:
+                continue
+
+            departures = self.departures.get(airport, [])
+            ready = arrival if label is None else arrival + min_connection
+            position = bisect_left(departures, (ready,))
+            while position < len(departures) and departures[position][0] <= latest:
+                departure = departures[position]
+                next_airport = departure[3]
+                if fewest_legs.get(next_airport, max_legs + 1) > legs + 1:
+                    heapq.heappush(heap, (departure[1], legs + 1, next(sequence), next_airport, (departure, airport, label)))
+                position += 1
+        return found
+
+    def _itinerary(self, label):
+        flights = []
+        arrival = label[0][1] #the last leg's arrival
+        while label is not None:
+            (start, end, flight_id, destination), origin, label = label
+            flights.append({
+                "flight_id": flight_id,
+                "origin_id": origin,
+                "destination_id": destination,
+                "departure_at": minutes_departure(start),
+                "arrival_at": minutes_departure(end),
+            })
+            first_departure = start
+        flights.reverse()
+        return {
+            "departure_at": flights[0]["departure_at"],
+            "arrival_at": flights[-1]["arrival_at"],
+            "duration_minutes": arrival - first_departure,
+            "legs": len(flights),
+            "flights": flights,
+        }
@@ -0,0 +1,215 @@
+import json
+import re
+import sqlite3
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from functools import lru_cache
+
+SQL_PROFILE_VARIABLE = "FLIGHTS_SQL_PROFILE" #set this environment variable (to anything) to profile from start-up
+PROFILE_SAMPLES = 1000 #latencies kept per statement for the p95, the most recent ones
+EXPLAINED_STATEMENTS = ("SELECT", "WITH", "INSERT", "UPDATE", "DELETE", "REPLACE")
+
+# Opt-in profiling of every SQL statement the managers run. When a ConnectionFactory is given an SQLProfiler, its
+# connections are opened as ProfilingConnection, whose cursors time each execute and the fetches that follow it, count
+# the rows returned (or changed, for writes), and record them under the statement's normalised text: literals become ?,
+# lists of placeholders become (?, ...) and whitespace is collapsed, so the same query with different values or IN list
+# lengths is counted once. The first time a statement is seen, its EXPLAIN QUERY PLAN is captured as well.
+#
+# Without a profiler, connections are plain sqlite3.Connection objects and nothing is measured.
+# Results are shown by the SQL Profile entry of the Analytics menu, and can be saved as JSON from there or with
+#   python main.py --profile profile.json <command>
+
+
+#Returns the text a statement is recorded under
+@lru_cache(maxsize=4096)
+def normalise_sql(sql):
+    sql = re.sub(r"'(?:[^']|'')*'", "?", sql)
+    sql = re.sub(r"(?<![\w?:$@.])\d+(?:\.\d+)?", "?", sql)
+    sql = " ".join(sql.split())
+    return re.sub(r"\(\?(?:, ?\?)+\)", "(?, ...)", sql)
+
+
+# Everything recorded for one normalised statement
+class StatementStats:
+    def __init__(self, statement, plan, full_scan):
+        self.statement = statement
+        self.plan = plan #EXPLAIN QUERY PLAN details, or None if the statement cannot be explained
+        self.full_scan = full_scan #True if the plan reads a whole table without an index
+        self.calls = 0
+        self.total = 0.0
+        self.rows = 0
+        self.samples = deque(maxlen=PROFILE_SAMPLES)
+
+    def p95(self):
+        samples = sorted(self.samples)
+        return samples[min(len(samples) - 1, int(len(samples) * 0.95))] if samples else 0.0
+
+    def as_dict(self):
+        return {
+            "statement": self.statement,
+            "calls": self.calls,
+            "total_ms": round(self.total * 1000, 3),
+            "mean_ms": round(self.total * 1000 / self.calls, 3) if self.calls else 0.0,
+            "p95_ms": round(self.p95() * 1000, 3),
+            "rows": self.rows,
+            "full_scan": self.full_scan,
+            "plan": self.plan,
+        }
+
+
+class SQLProfiler:
+    def __init__(self):
+        self.lock = threading.Lock() #connections on different threads share the profiler
+        self.statements = {} #normalised statement -> StatementStats
+        self.started = datetime.now()
+
+#1. Returns the stats for a statement, creating them (and capturing the query plan) the first time it is seen
+    def statement(self, connection, sql, parameters):
+        key = normalise_sql(sql)
+        stats = self.statements.get(key)
+        if stats is None:
+            stats = StatementStats(key, *self.explain(connection, sql, parameters))
+            with self.lock:
+                stats = self.statements.setdefault(key, stats)
+        return stats
+
+#Returns (plan details, whether the plan scans a whole table). A plain cursor is used, so the EXPLAIN is not profiled.
+    def explain(self, connection, sql, parameters):
+        if sql.lstrip().split(None, 1)[0].upper() not in EXPLAINED_STATEMENTS:
+            return None, False
+        cursor = sqlite3.Cursor(connection)
+        try:
+            plan = [row[3] for row in cursor.execute(f"EXPLAIN QUERY PLAN {sql}", parameters)]
+            tables = {row[0] for row in cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        except (sqlite3.Error, ValueError) as e:
+            return [f"(no plan: {e})"], False
+        #"SCAN flight" reads every row of the table; "SCAN flight USING INDEX ..." or a scan of a subquery does not
+        return plan, any(detail.split() in (["SCAN", table] for table in tables) for detail in plan)
+
+#2. Adds one call of a statement
+    def record(self, stats, elapsed, rows):
+        with self.lock:
+            stats.calls += 1
+            stats.total += elapsed
+            stats.rows += rows
+            stats.samples.append(elapsed)
+
+#3. Returns every statement's figures as dicts, the most total time first
+    def report(self):
+        with self.lock:
+            statements = [stats.as_dict() for stats in self.statements.values()]
+        return sorted(statements, key=lambda stats: stats["total_ms"], reverse=True)
+
+#4. Writes the report to a JSON file
+    def dump(self, path):
+        with open(path, "w", encoding="utf-8") as profile_file:
+            json.dump({"started": self.started.isoformat(timespec="seconds"),
+                       "saved": datetime.now().isoformat(timespec="seconds"),
+                       "statements": self.report()}, profile_file, indent=2)
+
+#5. Forgets everything recorded so far
+    def reset(self):
+        with self.lock:
+            self.statements = {}
+            self.started = datetime.now()
+
+
+# A cursor that records each statement it runs. A call lasts from execute until its rows have been fetched (or the
+# next execute, or the cursor is closed), so the time SQLite spends stepping through the results is included.
+class ProfilingCursor(sqlite3.Cursor):
+    current = None #[profiler, stats, elapsed seconds, rows fetched, rows changed] of the call in progress
+
+    def execute(self, sql, parameters=()):
+        return self._run(super().execute, sql, parameters, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        if not isinstance(seq_of_parameters, (list, tuple)):
+            seq_of_parameters = list(seq_of_parameters) #so the first set can be used for the query plan
+        return self._run(super().executemany, sql, seq_of_parameters, seq_of_parameters[0] if seq_of_parameters else ())
+
+    def executescript(self, sql_script):
+        return self._run(super().executescript, sql_script, None, ())
+
+    def _run(self, run, sql, parameters, plan_parameters):
+        self._finish()
+        profiler = self.connection.profiler
+        if profiler is None:
+            return run(sql) if parameters is None else run(sql, parameters)
+        stats = profiler.statement(self.connection, sql, plan_parameters)
+        started = time.perf_counter()
+        try:
+            return run(sql) if parameters is None else run(sql, parameters)
+        finally:
+            #the profiler and rows changed are kept now, so finishing the call never touches the connection, which
+            #may have been closed by the time the cursor is closed or garbage collected
+            self.current = [profiler, stats, time.perf_counter() - started, 0, self.rowcount]
+
+    def _fetched(self, started, rows, done):
+        if self.current is not None:
+            self.current[2] += time.perf_counter() - started
+            self.current[3] += rows
+            if done:
+                self._finish()
+
+    def _finish(self):
+        current, self.current = self.current, None
+        if current is not None:
+            profiler, stats, elapsed, rows, changed = current
+            if not rows and changed > 0:
+                rows = changed #rows changed by an INSERT, UPDATE or DELETE
+            profiler.record(stats, elapsed, rows)
+
+    def fetchone(self):
+        started = time.perf_counter()
+        row = super().fetchone()
+        self._fetched(started, row is not None, row is None)
+        return row
+
+    def fetchmany(self, size=None):
+        started = time.perf_counter()
+        size = self.arraysize if size is None else size
+        rows = super().fetchmany(size)
+        self._fetched(started, len(rows), len(rows) < size)
+        return rows
+
+    def fetchall(self):
+        started = time.perf_counter()
+        rows = super().fetchall()
+        self._fetched(started, len(rows), True)
+        return rows
+
+    def __next__(self):
+        started = time.perf_counter()
+        try:
+            row = super().__next__()
+        except StopIteration:
+            self._fetched(started, 0, True)
+            raise
+        self._fetched(started, 1, False)
+        return row
+
+    def close(self):
+        self._finish()
+        super().close()
+
+    def __del__(self):
+        self._finish()
+
+
+# A connection whose cursors are ProfilingCursors, including those created by its execute shortcuts
+class ProfilingConnection(sqlite3.Connection):
+    profiler = None #set by ConnectionFactory once the connection settings have been applied
+
+    def cursor(self, factory=ProfilingCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def executescript(self, sql_script):
+        return self.cursor().executescript(sql_script)
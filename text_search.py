@@ -0,0 +1,86 @@
+import re
+import sqlite3
+import sys
+
+# Full-text indexes for the typeahead searches, created by migration 6 as FTS5 tables over the airport and pilot tables:
+#   airport_search - iata_code, name, city and country of each airport
+#   pilot_search   - first_name, last_name, license_number and nationality of each pilot
+# pilot_search is an external-content table: the text is only stored in pilot, and the index is keyed by pilot_id (the
+# table's rowid). airport has a TEXT primary key and an implicit rowid that a VACUUM can renumber, so airport_search is
+# a regular FTS5 table that keeps its own copy of the columns and is matched to airport by iata_code (migration 10).
+# Triggers on the source tables keep both in sync.
+# Prefix indexes for 1 to 3 characters make short typeahead queries as quick as whole words.
+
+# For each index: (source table, key column of the source, indexed columns, bm25 weight of each column, True if the index
+# is an external-content table keyed by the source's rowid). The key of a regular index must be one of its columns.
+SEARCH_INDEXES = {
+    "airport_search": ("airport", "iata_code", ("iata_code", "name", "city", "country"), (10.0, 2.0, 3.0, 1.0), False),
+    "pilot_search": ("pilot", "pilot_id", ("first_name", "last_name", "license_number", "nationality"), (3.0, 4.0, 5.0, 1.0), True),
+}
+SEARCH_LIMIT = 20 #matches returned by a search unless another limit is given
+#Most matches that are ranked. A short prefix like "a" can match most rows, and scoring every one of them takes far longer
+#than finding them, so only the first SEARCH_CANDIDATES matches (in rowid order) are scored and sorted. A search that
+#matches fewer rows than this, which is any search a few letters long, is ranked in full.
+SEARCH_CANDIDATES = 1000
+
+
+#1. Returns the FTS5 query for what the user has typed so far: every word must match the start of a word in the row,
+#e.g. "heath lon" finds London Heathrow. Returns None if there are no words to search for.
+def prefix_query(text):
+    words = re.findall(r"\w+", text)
+    if not words:
+        return None
+    return " ".join(f'"{word}"*' for word in words)
+
+
+#2. Rebuilds one search index from its source table. A regular index is emptied and refilled with a copy of the rows.
+def rebuild_search_index(connection, index):
+    table, key, columns, weights, external = SEARCH_INDEXES[index]
+    if external:
+        connection.execute(f"INSERT INTO {index} ({index}) VALUES ('rebuild')")
+    else:
+        column_list = ", ".join(columns)
+        connection.execute(f"DELETE FROM {index}")
+        connection.execute(f"INSERT INTO {index} ({column_list}) SELECT {column_list} FROM {table}")
+
+
+#3. Rebuilds every search index from its source table
+def rebuild_search_indexes(connection):
+    for index in SEARCH_INDEXES:
+        rebuild_search_index(connection, index)
+
+
+#4. Runs the FTS5 integrity check on every index, which also compares an external-content index with its source table.
+#A regular index is compared with its source row by row. Returns the names of the indexes that are out of step.
+def check_search_indexes(connection):
+    broken = []
+    for index, (table, key, columns, weights, external) in SEARCH_INDEXES.items():
+        try:
+            connection.execute(f"INSERT INTO {index} ({index}, rank) VALUES ('integrity-check', 1)")
+        except sqlite3.DatabaseError:
+            broken.append(index)
+            continue
+        if not external:
+            column_list = ", ".join(columns)
+            differs = connection.execute(f"""
+                SELECT (SELECT COUNT(*) FROM {table}) != (SELECT COUNT(*) FROM {index})
+                    OR EXISTS (SELECT {column_list} FROM {table} EXCEPT SELECT {column_list} FROM {index})
+            """).fetchone()[0]
+            if differs:
+                broken.append(index)
+    return broken
+
+
+if __name__ == "__main__":
+    from connection import ConnectionFactory
+    from migrations import run_migrations
+
+    conn = ConnectionFactory("flights.db").get()
+    run_migrations(conn)
+    broken = check_search_indexes(conn)
+    if broken or "--rebuild" in sys.argv:
+        rebuild_search_indexes(conn)
+        conn.commit()
+        print(f"Search indexes rebuilt{' (' + ', '.join(broken) + ' did not match)' if broken else ''}.")
+    else:
+        print("Search indexes match the airport and pilot tables.")